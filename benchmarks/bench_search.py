@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 搜索性能基准测试
+生成合成的开始菜单和桌面目录树，测量冷启动建索引、热启动加载索引以及
+SearchWindow.perform_search 的逐键延迟，结果以 JSON 输出便于跨提交比较
+
+用法:
+    python benchmarks/bench_search.py --sizes 1000,10000,100000 --depth 3 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+# 无界面运行
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# 配置和日志写到临时目录，不修改工作区和真实的 Config 目录 (必须在导入 log 之前设置)
+RUNTIME_DIR = tempfile.mkdtemp(prefix="betterexplorer_bench_env_")
+os.environ["BETTEREXPLORER_CONFIG_DIR"] = os.path.join(RUNTIME_DIR, "Config")
+os.environ["BETTEREXPLORER_LOG_DIR"] = os.path.join(RUNTIME_DIR, "logs")
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEventLoop, QTimer
+from log import get_logger
+
+logger = get_logger()
+import frecency
+from search_index import SearchIndex
+from search import SearchWindow
+
+# 合成名称使用的词汇，包含中文、带重音的字母和常见应用名
+WORDS = [
+    "Google", "Chrome", "Visual", "Studio", "Code", "Microsoft", "Office", "Word", "Excel",
+    "PowerPoint", "Notepad", "Terminal", "Steam", "Python", "Setup", "Uninstall", "Help",
+    "微信", "网易云音乐", "腾讯", "文档", "设置", "工具", "游戏", "视频", "浏览器",
+    "Café", "Überblick", "Ñandú", "Zürich", "日本語", "한국어",
+]
+DESKTOP_EXTS = [".txt", ".docx", ".pdf", ".png", ".zip", ".lnk", ""]
+SHORTCUT_EXTS = [".lnk", ".lnk", ".lnk", ".url"]
+
+# 默认的逐键输入查询
+DEFAULT_QUERIES = ["chrome", "visual studio", "微信", "setup"]
+
+
+def random_name(rng):
+    """生成一个由 2-4 个词组成的名称"""
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+
+
+def make_tree(root, count, depth, exts, rng, fanout=8):
+    """在 root 下生成 count 个文件，最多嵌套 depth 层目录"""
+    os.makedirs(root, exist_ok=True)
+    directories = [root]
+    for level in range(depth):
+        for parent in list(directories):
+            if parent.count(os.sep) - root.count(os.sep) != level:
+                continue
+            for i in range(fanout):
+                directory = os.path.join(parent, f"{random_name(rng)} {level}-{i}")
+                os.makedirs(directory, exist_ok=True)
+                directories.append(directory)
+    for i in range(count):
+        directory = rng.choice(directories)
+        path = os.path.join(directory, f"{random_name(rng)} {i}{rng.choice(exts)}")
+        with open(path, "w", encoding="utf-8"):
+            pass
+
+
+def make_fixture(base, size, depth, seed):
+    """生成桌面 + 两个开始菜单根目录，返回 (desktop, [start_menu_paths])"""
+    rng = random.Random(seed)
+    desktop = os.path.join(base, "Desktop")
+    start_menus = [os.path.join(base, "ProgramData", "Programs"),
+                   os.path.join(base, "AppData", "Programs")]
+    desktop_count = size // 10
+    common_count = size * 6 // 10
+    make_tree(desktop, desktop_count, 0, DESKTOP_EXTS, rng)
+    make_tree(start_menus[0], common_count, depth, SHORTCUT_EXTS, rng)
+    make_tree(start_menus[1], size - desktop_count - common_count, depth, SHORTCUT_EXTS, rng)
+    return desktop, start_menus
+
+
+def wait_for_search(window, query, timeout_ms=10000):
+    """调用 perform_search 并等待该查询完成，返回耗时(毫秒)"""
+    loop = QEventLoop()
+    done = {}
+
+    def on_finished(generation, count):
+        if generation == window.generation:
+            done["count"] = count
+            loop.quit()
+
+    window.worker.search_finished.connect(on_finished)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    start = time.perf_counter()
+    window.perform_search(query)
+    if "count" not in done:
+        loop.exec_()
+    elapsed = (time.perf_counter() - start) * 1000
+    window.worker.search_finished.disconnect(on_finished)
+    return elapsed, done.get("count")
+
+
+def summarize(samples):
+    """计算延迟分布"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def bench_size(base, size, depth, queries, seed):
+    """对一种规模运行全部测量"""
+    fixture_dir = os.path.join(base, f"tree_{size}")
+    start = time.perf_counter()
+    desktop, start_menus = make_fixture(fixture_dir, size, depth, seed)
+    generate_ms = (time.perf_counter() - start) * 1000
+    index_file = os.path.join(fixture_dir, "search_index.json")
+    options = {"desktop_path": desktop, "start_menu_paths": start_menus, "index_file": index_file}
+
+    # 冷启动：没有缓存文件，完整扫描并保存
+    start = time.perf_counter()
+    index = SearchIndex.load_or_build(**options)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    # 热启动：从缓存加载并校验目录修改时间
+    start = time.perf_counter()
+    index = SearchIndex.load_or_build(**options)
+    warm_ms = (time.perf_counter() - start) * 1000
+
+    window = SearchWindow(index=index)
+    keystrokes = []
+    per_query = {}
+    for query in queries:
+        samples = []
+        for end in range(1, len(query) + 1):
+            elapsed, count = wait_for_search(window, query[:end])
+            samples.append(elapsed)
+        # 清空输入，开始下一轮输入 (空查询不会产生结果信号，无需等待)
+        window.perform_search("")
+        keystrokes.extend(samples)
+        per_query[query] = summarize(samples)
+    window.worker.stop()
+
+    return {
+        "size": size,
+        "entries": len(index.names),
+        "depth": depth,
+        "generate_ms": round(generate_ms, 3),
+        "cold_index_ms": round(cold_ms, 3),
+        "warm_index_ms": round(warm_ms, 3),
+        "keystroke": summarize(keystrokes),
+        "queries": per_query,
+    }
+
+
+def git_revision():
+    """当前提交号，便于比较不同提交的结果"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BetterExplorer 搜索性能基准测试")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="逗号分隔的条目数量")
+    parser.add_argument("--depth", type=int, default=3, help="开始菜单目录的嵌套深度")
+    parser.add_argument("--queries", default=",".join(DEFAULT_QUERIES), help="逗号分隔的逐键输入查询")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("--output", help="结果 JSON 文件路径，默认输出到标准输出")
+    parser.add_argument("--keep", action="store_true", help="保留生成的目录树")
+    args = parser.parse_args()
+
+    # 关闭日志输出，避免干扰测量和 JSON 输出
+    logger.remove()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    base = tempfile.mkdtemp(prefix="betterexplorer_bench_")
+    # 使用独立的启动记录，避免真实的常用度数据影响排序耗时
+    frecency._store = frecency.FrecencyStore(os.path.join(base, "launches.log"))
+
+    results = []
+    try:
+        for size in [int(value) for value in args.sizes.split(",") if value]:
+            results.append(bench_size(base, size, args.depth, args.queries.split(","), args.seed))
+    finally:
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+            shutil.rmtree(RUNTIME_DIR, ignore_errors=True)
+
+    report = {
+        "benchmark": "search",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 文件内容搜索模块
+在线程池中用内存映射读取索引目录下的文本文件，查找字面量或正则并逐个文件返回带行预览的结果；
+可选的持久化词索引记住每个文件包含的词，重复查询时跳过不可能匹配的文件
+"""
+
+import os
+import re
+import json
+import mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from search_query import QueryError
+from pattern_search import regex_literals
+from document_text import DocumentExtractor, DOCUMENT_EXTENSIONS
+
+CONTENT_INDEX_VERSION = 1
+# 默认跳过大于该值的文件
+DEFAULT_MAX_FILE_SIZE = 8 * 1024 * 1024
+# 检查文件开头多少字节来判断是否为二进制文件
+BINARY_SNIFF_SIZE = 8192
+# 每个文件最多返回的匹配行数
+MAX_MATCHES_PER_FILE = 3
+# 行预览最多读取的字节数
+PREVIEW_BYTES = 240
+# 扫描线程数
+CONTENT_WORKERS = 4
+# 词索引中的词
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def get_content_roots():
+    """从设置读取内容搜索的目录 (多个目录用分号分隔)，默认为桌面"""
+    roots = Settings.get_setting("content_search_roots", "")
+    if isinstance(roots, str):
+        roots = [root.strip() for root in roots.split(";")]
+    roots = [root for root in roots if root]
+    if not roots:
+        from search_index import get_desktop_path
+        roots = [get_desktop_path()]
+    return roots
+
+
+def iter_files(roots, max_size, cancelled=None):
+    """递归列举目录下不超过 max_size 的文件，产生 (路径, 大小, 修改时间)；每个目录之前检查 cancelled()"""
+    stack = list(roots)
+    while stack:
+        if cancelled is not None and cancelled():
+            return
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if 0 < stat.st_size <= max_size:
+                        yield entry.path, stat.st_size, stat.st_mtime
+        except OSError as e:
+            logger.debug(f"跳过无法访问的目录 '{directory}': {e}")
+
+
+def is_binary(data):
+    """开头含有 NUL 字节的文件视为二进制文件 (UTF-16 文本也会被跳过)"""
+    return b'\0' in data[:BINARY_SNIFF_SIZE]
+
+
+def find_matches(data, regex, max_matches):
+    """在字节数据(或内存映射)中查找匹配，返回 [(行号, 预览)]，同一行只返回一次"""
+    matches = []
+    line = 1
+    last = 0
+    for match in regex.finditer(data):
+        start = match.start()
+        line += data[last:start].count(b'\n')
+        last = start
+        if matches and matches[-1][0] == line:
+            continue
+        line_start = data.rfind(b'\n', 0, start) + 1
+        line_end = data.find(b'\n', start)
+        if line_end < 0:
+            line_end = len(data)
+        preview = data[line_start:min(line_end, line_start + PREVIEW_BYTES)]
+        matches.append((line, preview.decode('utf-8', 'replace').strip()))
+        if len(matches) >= max_matches:
+            break
+    return matches
+
+
+def tokenize(text):
+    """返回文本中的小写词集合"""
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def scan_file(path, regex, max_matches, want_tokens):
+    """
+    在工作线程中扫描一个文件
+    返回 ([(行号, 预览)], 词集合或 None)，二进制文件没有匹配且词集合为空，无法读取时返回 None
+    """
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if is_binary(data):
+                    return [], (set() if want_tokens else None)
+                matches = find_matches(data, regex, max_matches)
+                tokens = tokenize(data[:].decode('utf-8', 'ignore')) if want_tokens else None
+                return matches, tokens
+    except (OSError, ValueError) as e:
+        # 空文件无法映射时抛出 ValueError
+        logger.debug(f"无法读取文件 '{path}': {e}")
+        return None
+
+
+def compile_content_pattern(pattern, is_regex):
+    """把字面量或正则编译为忽略大小写的字节正则，返回 (正则, 查询中必须出现的词)"""
+    if is_regex:
+        try:
+            regex = re.compile(pattern.encode('utf-8'), re.IGNORECASE)
+        except re.error as e:
+            raise QueryError(f"无效的正则表达式: {e}")
+        literals = regex_literals(pattern)
+    else:
+        regex = re.compile(re.escape(pattern.encode('utf-8')), re.IGNORECASE)
+        literals = [pattern.lower()]
+    tokens = {token for literal in literals for token in TOKEN_PATTERN.findall(literal.lower())}
+    return regex, tokens
+
+
+class ContentTokenIndex:
+    """
+    持久化的词索引：词 -> 包含该词的文件编号
+    文件内容变化时分配新编号，旧编号在保存时从倒排表中清除；
+    匹配文本中的每个词一定是文件中某个词的子串，因此可以用它排除不可能匹配的文件
+    多个搜索线程同时读取，所有读写都持有 lock；save() 另外持有 save_lock，保证同一时间只有一个线程写文件
+    """
+
+    def __init__(self, index_file=None):
+        self.index_file = index_file or Settings.get_config_path("content_index.json")
+        self.files = {}      # 路径 -> [文件编号, 大小, 修改时间]
+        self.postings = {}   # 词 -> 文件编号集合
+        self.next_id = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.load()
+
+    def lookup(self, path, size, mtime):
+        """文件未变化时返回其编号，否则返回 None"""
+        with self.lock:
+            record = self.files.get(path)
+        if record and record[1] == size and record[2] == mtime:
+            return record[0]
+        return None
+
+    def update(self, path, size, mtime, tokens):
+        """记录文件的新内容"""
+        with self.lock:
+            file_id = self.next_id
+            self.next_id += 1
+            self.files[path] = [file_id, size, mtime]
+            for token in tokens:
+                self.postings.setdefault(token, set()).add(file_id)
+            self.dirty = True
+
+    def retain(self, paths):
+        """删除已不存在的文件记录"""
+        with self.lock:
+            removed = [path for path in self.files if path not in paths]
+            for path in removed:
+                del self.files[path]
+            if removed:
+                self.dirty = True
+
+    def candidates(self, tokens):
+        """返回包含所有查询词(作为某个词的子串)的文件编号集合"""
+        result = None
+        with self.lock:
+            for query_token in tokens:
+                file_ids = set()
+                for token, posting in self.postings.items():
+                    if query_token in token:
+                        file_ids |= posting
+                result = file_ids if result is None else result & file_ids
+                if not result:
+                    break
+        return result if result is not None else set()
+
+    def load(self):
+        """从磁盘加载词索引"""
+        try:
+            if not os.path.exists(self.index_file):
+                return
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != CONTENT_INDEX_VERSION:
+                return
+            self.files = data["files"]
+            self.postings = {token: set(file_ids) for token, file_ids in data["postings"].items()}
+            self.next_id = data["next_id"]
+            logger.info(f"已加载内容词索引: {len(self.files)} 个文件, {len(self.postings)} 个词")
+        except Exception as e:
+            logger.error(f"加载内容词索引失败: {e}")
+            self.files = {}
+            self.postings = {}
+            self.next_id = 0
+
+    def save(self):
+        """清除失效的文件编号后保存；在 lock 中生成快照，写文件时不阻塞其他线程的查找"""
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                live = {record[0] for record in self.files.values()}
+                postings = {}
+                for token, file_ids in self.postings.items():
+                    # 集合交集生成新集合，快照中的集合之后不会被 update() 修改
+                    file_ids = file_ids & live
+                    if file_ids:
+                        postings[token] = file_ids
+                self.postings = postings
+                data = {
+                    "version": CONTENT_INDEX_VERSION,
+                    "files": {path: list(record) for path, record in self.files.items()},
+                    "postings": {token: sorted(file_ids) for token, file_ids in postings.items()},
+                    "next_id": self.next_id,
+                }
+                self.dirty = False
+            try:
+                os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+                tmp_file = self.index_file + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_file, self.index_file)
+            except Exception as e:
+                logger.error(f"保存内容词索引失败: {e}")
+                with self.lock:
+                    self.dirty = True
+
+
+class ContentSearch:
+    """文件内容搜索，每个匹配文件扫描完成后立即通过回调返回结果"""
+
+    def __init__(self, roots=None, token_index=None):
+        self.roots = roots if roots is not None else get_content_roots()
+        self.max_file_size = Settings.get_setting("content_max_file_size", DEFAULT_MAX_FILE_SIZE)
+        if token_index is None and Settings.get_setting("content_index_enabled", False):
+            token_index = ContentTokenIndex()
+        self.token_index = token_index
+        # 同一时间只有一个搜索更新词索引，超时后仍在运行的旧搜索不会与新搜索同时写入，
+        # 也不会用旧的文件列表 retain() 掉新搜索刚加入的记录
+        self.index_writer = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=CONTENT_WORKERS, thread_name_prefix="content")
+        # Office/OpenDocument 文档先提取文本再查找
+        self.documents = DocumentExtractor(Settings.get_config_path("document_text"))
+        # shutdown() 之后正在进行的搜索 (包括已超过时间预算的) 也停止
+        self.closed = False
+
+    def scan_document(self, path, size, mtime, regex, max_matches, want_tokens):
+        """在工作线程中扫描文档提取出的文本，每个段落算一行"""
+        if self.closed:
+            # shutdown() 之后不再重新创建文档提取进程池
+            return None
+        text = self.documents.get_text(path, size, mtime)
+        if text is None:
+            return None
+        matches = find_matches(text.encode('utf-8', 'surrogatepass'), regex, max_matches)
+        return matches, (tokenize(text) if want_tokens else None)
+
+    def search(self, pattern, is_regex, limit, on_matches, cancelled, name_filter=None):
+        """
+        搜索内容包含 pattern 的文件
+        on_matches(路径, [(行号, 预览)]) 按文件扫描完成的顺序调用，cancelled() 返回 True 或 shutdown() 之后停止
+        返回匹配行总数
+        """
+        regex, tokens = compile_content_pattern(pattern, is_regex)
+        token_index = self.token_index
+
+        def stopped():
+            return self.closed or cancelled()
+
+        all_files = list(iter_files(self.roots, self.max_file_size, stopped))
+        if stopped():
+            # 文件列表不完整，不能用来扫描或 retain()
+            return 0
+        files = [item for item in all_files if name_filter is None or name_filter(item[0])]
+        allowed = token_index.candidates(tokens) if token_index is not None and tokens else None
+        # 另一个搜索正在更新词索引时，本次搜索只读取索引
+        writer = token_index is not None and self.index_writer.acquire(blocking=False)
+
+        futures = {}
+        for path, size, mtime in files:
+            if self.closed:
+                break
+            file_id = token_index.lookup(path, size, mtime) if token_index is not None else None
+            if file_id is not None and allowed is not None and file_id not in allowed:
+                continue
+            want_tokens = writer and file_id is None
+            try:
+                if os.path.splitext(path)[1][1:].lower() in DOCUMENT_EXTENSIONS:
+                    future = self.executor.submit(self.scan_document, path, size, mtime, regex,
+                                                  MAX_MATCHES_PER_FILE, want_tokens)
+                else:
+                    future = self.executor.submit(scan_file, path, regex, MAX_MATCHES_PER_FILE, want_tokens)
+            except RuntimeError:
+                # shutdown() 之后不能再提交任务
+                break
+            futures[future] = (path, size, mtime)
+        logger.debug(f"内容搜索 '{pattern}': {len(files)} 个文件, 扫描 {len(futures)} 个")
+
+        total = 0
+        try:
+            for future in as_completed(futures):
+                if stopped():
+                    break
+                if future.cancelled():
+                    continue
+                result = future.result()
+                if result is None:
+                    continue
+                path, size, mtime = futures[future]
+                matches, file_tokens = result
+                if file_tokens is not None:
+                    token_index.update(path, size, mtime, file_tokens)
+                if matches and total < limit:
+                    on_matches(path, matches)
+                    total += len(matches)
+                # 使用词索引时继续扫描以补全索引，否则达到上限即停止
+                if total >= limit and not writer:
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+            if writer:
+                try:
+                    token_index.retain({path for path, size, mtime in all_files})
+                    token_index.save()
+                finally:
+                    self.index_writer.release()
+        return total
+
+    def shutdown(self):
+        """停止扫描线程和文档提取进程，取消排队的任务"""
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.documents.shutdown()
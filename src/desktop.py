@@ -19,6 +19,8 @@ from log import get_logger
 logger = get_logger()
 from settings import Settings
 from file_manager import FileManager
+from saved_search import SAVED_SEARCH_EXT, add_saved_search, write_search_file
+from shortcut import launch
 
 class Desktop(QMainWindow):
     """桌面管理类，负责显示和管理桌面"""
@@ -77,6 +79,8 @@ class Desktop(QMainWindow):
             file_model.setFilter(QDir.AllEntries | QDir.NoDotAndDotDot)
             file_model.setOption(QFileSystemModel.DontUseCustomDirectoryIcons)
             file_model.setOption(QFileSystemModel.DontWatchForChanges)
+            # 不解析快捷方式，否则 .lnk 会显示为目标的名称
+            file_model.setResolveSymlinks(False)
             self.file_models.append(file_model)
             
             # 创建文件视图
@@ -167,7 +171,11 @@ class Desktop(QMainWindow):
             paste_action = QAction("粘贴", self)
             paste_action.triggered.connect(self.paste_file)
             
+            new_saved_search_action = QAction("新建虚拟文件夹", self)
+            new_saved_search_action.triggered.connect(self.create_saved_search)
+            
             context_menu.addAction(new_folder_action)
+            context_menu.addAction(new_saved_search_action)
             context_menu.addAction(refresh_action)
             context_menu.addAction(open_file_manager_action)
             context_menu.addAction(paste_action)
@@ -194,6 +202,23 @@ class Desktop(QMainWindow):
                 self.logger.error(f"创建文件夹失败: {str(e)}")
                 QMessageBox.warning(self, "错误", f"创建文件夹失败: {str(e)}")
     
+    def create_saved_search(self):
+        """在桌面创建虚拟文件夹 (保存的搜索)"""
+        query, ok = QInputDialog.getText(self, "新建虚拟文件夹", "查询条件 (例如 ext:log modified:<1d under:D:\\services):")
+        if not ok or not query.strip():
+            return
+        name, ok = QInputDialog.getText(self, "新建虚拟文件夹", "名称:")
+        if not ok or not name.strip():
+            return
+        try:
+            add_saved_search(name, query)
+            write_search_file(self.desktop_path, name, query)
+            self.logger.info(f"创建虚拟文件夹: {name}")
+            self.refresh_desktop()
+        except Exception as e:
+            self.logger.error(f"创建虚拟文件夹失败: {str(e)}")
+            QMessageBox.warning(self, "错误", f"创建虚拟文件夹失败: {str(e)}")
+    
     def refresh_desktop(self):
         """刷新桌面"""
         # 强制刷新文件系统模型
@@ -280,9 +305,15 @@ class Desktop(QMainWindow):
             file_manager.navigate_to(file_path)
             file_manager.show()
             self.file_manager_instance = file_manager
+        elif file_path.lower().endswith(SAVED_SEARCH_EXT):
+            # 虚拟文件夹在文件管理器中打开
+            file_manager = FileManager()
+            file_manager.open_search_file(file_path)
+            file_manager.show()
+            self.file_manager_instance = file_manager
         else:
             try:
-                os.startfile(file_path)
+                launch(file_path)
                 self.logger.info(f"打开文件: {file_path}")
             except Exception as e:
                 self.logger.error(f"打开文件失败: {file_path}, 错误: {str(e)}")
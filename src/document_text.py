@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 文档文本提取模块
+从 .docx/.xlsx/.pptx 和 OpenDocument 文件中提取纯文本：用 zipfile 逐个读取 XML 部件并用 iterparse 增量解析，
+提取在后台进程池中执行，结果按 (路径, 大小, 修改时间) 缓存到磁盘
+"""
+
+import os
+import re
+import sys
+import time
+import hashlib
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from log import get_logger
+
+logger = get_logger()
+
+# XML 命名空间
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+ODF_TEXT_NS = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+# 每种格式需要读取的部件 (正则匹配 ZIP 内的路径)
+OOXML_PARTS = {
+    "docx": re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$'),
+    "xlsx": re.compile(r'^xl/(sharedStrings|worksheets/sheet\d+)\.xml$'),
+    "pptx": re.compile(r'^ppt/(slides/slide|notesSlides/notesSlide)\d+\.xml$'),
+}
+ODF_EXTENSIONS = {"odt", "ods", "odp", "odg"}
+DOCUMENT_EXTENSIONS = set(OOXML_PARTS) | ODF_EXTENSIONS
+
+# 单个 XML 部件解压后的大小上限，防止压缩炸弹
+MAX_PART_SIZE = 256 * 1024 * 1024
+# 每个文档最多提取的字符数
+MAX_TEXT_CHARS = 4 * 1024 * 1024
+# 等待单个文档提取的最长时间(秒)
+EXTRACT_TIMEOUT = 30
+# 进程池大小上限
+MAX_EXTRACT_WORKERS = 4
+# 文本缓存目录的总大小上限(字节)，超出时删除最久未使用的缓存
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def part_order(name):
+    """按部件名中的数字排序，保证 slide10 排在 slide9 之后"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def iter_ooxml_paragraphs(f, text_tag, block_tags):
+    """
+    增量解析 OOXML 部件，每个段落/单元格结束时产生其文本
+    文本在元素结束时已经取出，因此每个结束的元素都从父元素中移除，内存占用不随段落数增长
+    """
+    pieces = []
+    # 尚未结束的元素 (从根到当前位置)
+    stack = []
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag == text_tag:
+            if elem.text:
+                pieces.append(elem.text)
+        elif elem.tag in block_tags:
+            if pieces:
+                yield "".join(pieces)
+                pieces = []
+        if stack:
+            stack[-1].remove(elem)
+    if pieces:
+        yield "".join(pieces)
+
+
+def iter_odf_paragraphs(f):
+    """
+    增量解析 OpenDocument 的 content.xml，段落和标题中嵌套的 span 等文本一并取出
+    段落结束时才读取其文本，所以段落内的元素保留到段落结束，其余结束的元素立即从父元素中移除
+    """
+    paragraph_tags = (ODF_TEXT_NS + 'p', ODF_TEXT_NS + 'h')
+    stack = []
+    open_paragraphs = 0
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag in paragraph_tags:
+                open_paragraphs += 1
+            continue
+        stack.pop()
+        if elem.tag in paragraph_tags:
+            open_paragraphs -= 1
+            text = "".join(elem.itertext())
+            if text:
+                yield text
+        if stack and not open_paragraphs:
+            stack[-1].remove(elem)
+
+
+def iter_document_paragraphs(archive, ext):
+    """按格式选择要读取的部件，逐段产生文本"""
+    if ext in ODF_EXTENSIONS:
+        parts = [("content.xml", None)]
+    else:
+        pattern = OOXML_PARTS[ext]
+        parts = [(name, ext) for name in sorted(archive.namelist(), key=part_order) if pattern.match(name)]
+    for name, part_ext in parts:
+        try:
+            info = archive.getinfo(name)
+        except KeyError:
+            continue
+        if info.file_size > MAX_PART_SIZE:
+            logger.warning(f"跳过过大的文档部件 '{name}': {info.file_size} 字节")
+            continue
+        with archive.open(info) as f:
+            if part_ext is None:
+                yield from iter_odf_paragraphs(f)
+            elif part_ext == "docx":
+                yield from iter_ooxml_paragraphs(f, WORD_NS + 't', {WORD_NS + 'p'})
+            elif part_ext == "xlsx":
+                yield from iter_ooxml_paragraphs(f, SHEET_NS + 't', {SHEET_NS + 'si', SHEET_NS + 'c', SHEET_NS + 'row'})
+            else:
+                yield from iter_ooxml_paragraphs(f, DRAWING_NS + 't', {DRAWING_NS + 'p'})
+
+
+def init_worker():
+    """
+    进程池工作进程的初始化：移除导入 log 时添加的日志文件 handler，只把警告输出到 stderr
+    多个进程同时写入和轮转同一个日志文件在 Windows 上会失败
+    """
+    logger.remove()
+    if sys.stderr is not None:
+        logger.add(sys.stderr, level="WARNING")
+
+
+def extract_text(path):
+    """
+    提取文档的纯文本，每个段落一行
+    在进程池中运行，因此只依赖标准库；无法解析时返回空字符串
+    """
+    ext = os.path.splitext(path)[1][1:].lower()
+    if ext not in DOCUMENT_EXTENSIONS:
+        return ""
+    lines = []
+    length = 0
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for paragraph in iter_document_paragraphs(archive, ext):
+                lines.append(paragraph)
+                length += len(paragraph) + 1
+                if length > MAX_TEXT_CHARS:
+                    break
+    except (OSError, zipfile.BadZipFile, ET.ParseError, RuntimeError) as e:
+        # RuntimeError: 加密的 ZIP 部件
+        logger.debug(f"无法提取文档文本 '{path}': {e}")
+    return "\n".join(lines)
+
+
+class DocumentExtractor:
+    """
+    在后台进程池中提取文档文本，并按 (路径, 大小, 修改时间) 缓存到磁盘
+    创建时在后台线程中清理缓存目录：源文件已删除或已变化的缓存，以及超出 max_cache_bytes 的最久未使用的缓存
+    """
+
+    def __init__(self, cache_dir, max_cache_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.pool = None  # 首次需要提取时创建
+        self.lock = threading.Lock()
+        threading.Thread(target=self.prune_cache, name="document-cache-prune", daemon=True).start()
+
+    def executor(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=min(MAX_EXTRACT_WORKERS, os.cpu_count() or 1),
+                                                initializer=init_worker)
+            return self.pool
+
+    def cache_file(self, path):
+        """缓存文件名由规范化路径的哈希得到，文档变化后覆盖同一个缓存文件"""
+        digest = hashlib.sha1(os.path.normcase(path).encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".txt")
+
+    @staticmethod
+    def cache_header(path, size, mtime):
+        """缓存文件的第一行：大小、修改时间和源文件路径 (清理缓存时用来检查源文件)"""
+        return f"{size}\t{mtime!r}\t{path}\n"
+
+    def cached_text(self, path, size, mtime):
+        """缓存文件第一行与当前文件一致时返回缓存的文本"""
+        cache_file = self.cache_file(path)
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                if f.readline() != self.cache_header(path, size, mtime):
+                    return None
+                text = f.read()
+            # 更新修改时间，清理时按它判断最近使用
+            os.utime(cache_file)
+            return text
+        except OSError:
+            return None
+
+    def store_text(self, path, size, mtime, text):
+        cache_file = self.cache_file(path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(self.cache_header(path, size, mtime))
+                f.write(text)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.error(f"写入文档文本缓存失败: {e}")
+
+    def prune_cache(self):
+        """删除源文件已不存在或已变化的缓存，总大小仍超出上限时按最近使用时间删除最旧的缓存"""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                entries = [entry for entry in it if entry.is_file()]
+        except OSError:
+            return
+        kept = []
+        removed = 0
+        for entry in entries:
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(".txt") and self.source_unchanged(entry.path):
+                    kept.append((stat.st_mtime, stat.st_size, entry.path))
+                    continue
+                # 源文件已变化、格式不认识的缓存和中断写入留下的临时文件 (超过一小时)
+                if not entry.name.endswith(".tmp") or stat.st_mtime < time.time() - 3600:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        kept.sort(reverse=True)
+        total = 0
+        for mtime, size, cache_file in kept:
+            total += size
+            if total > self.max_cache_bytes:
+                try:
+                    os.remove(cache_file)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.debug(f"文档文本缓存删除了 {removed} 个文件")
+
+    def source_unchanged(self, cache_file):
+        """缓存记录的源文件仍存在且大小和修改时间未变"""
+        with open(cache_file, 'r', encoding='utf-8', errors='replace') as f:
+            header = f.readline()
+        fields = header.rstrip("\n").split("\t", 2)
+        if len(fields) != 3 or not header.endswith("\n"):
+            return False
+        path = fields[2]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return header == self.cache_header(path, stat.st_size, stat.st_mtime)
+
+    def get_text(self, path, size, mtime):
+        """返回文档文本，只有文档变化后才重新提取；提取失败时返回 None"""
+        text = self.cached_text(path, size, mtime)
+        if text is not None:
+            return text
+        try:
+            text = self.executor().submit(extract_text, path).result(timeout=EXTRACT_TIMEOUT)
+        except BrokenProcessPool as e:
+            logger.error(f"文档提取进程异常退出: {e}")
+            with self.lock:
+                self.pool = None
+            return None
+        except Exception as e:
+            logger.error(f"提取文档文本 '{path}' 失败: {e}")
+            return None
+        self.store_text(path, size, mtime, text)
+        return text
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
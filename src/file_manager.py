@@ -13,11 +13,16 @@ import subprocess
 from PyQt5.QtWidgets import (QMainWindow, QListView, QFileSystemModel,
                              QVBoxLayout, QWidget, QToolBar, 
                              QAction, QMenu, QInputDialog, QMessageBox,
-                             QComboBox)
+                             QComboBox, QToolButton)
 from PyQt5.QtCore import Qt, QDir
 from log import get_logger
 
 logger = get_logger()
+from saved_search import (SAVED_SEARCH_EXT, LiveFolder, LiveFolderModel, load_saved_searches,
+                          add_saved_search, write_search_file, read_search_file)
+from tag_store import get_tag_store
+from shortcut import launch
+from search_query import QueryError
 
 
 class FileManager(QMainWindow):
@@ -26,6 +31,9 @@ class FileManager(QMainWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_path = os.path.expanduser("~")
+        # 当前打开的虚拟文件夹及其模型，浏览普通目录时为 None
+        self.live_folder = None
+        self.live_model = None
         
         # 初始化日志记录器
         self.logger = logger
@@ -62,6 +70,8 @@ class FileManager(QMainWindow):
         self.model.setRootPath(QDir.rootPath())
         self.model.setOption(QFileSystemModel.DontUseCustomDirectoryIcons)
         self.model.setOption(QFileSystemModel.DontWatchForChanges)
+        # 不解析快捷方式，否则 .lnk 会显示为目标的名称
+        self.model.setResolveSymlinks(False)
         
         # 创建列表视图
         self.list_view = QListView()
@@ -117,21 +127,112 @@ class FileManager(QMainWindow):
         refresh_action.triggered.connect(self.refresh)
         toolbar.addAction(refresh_action)
         
+        # 保存搜索按钮
+        save_search_action = QAction("保存搜索", self)
+        save_search_action.triggered.connect(self.save_search)
+        toolbar.addAction(save_search_action)
+        
+        # 虚拟文件夹菜单，每次打开时重新读取保存的搜索
+        self.saved_search_menu = QMenu(self)
+        self.saved_search_menu.aboutToShow.connect(self.update_saved_search_menu)
+        saved_search_button = QToolButton()
+        saved_search_button.setText("虚拟文件夹")
+        saved_search_button.setPopupMode(QToolButton.InstantPopup)
+        saved_search_button.setMenu(self.saved_search_menu)
+        toolbar.addWidget(saved_search_button)
+        
     def on_list_view_double_clicked(self, index):
         """处理列表视图双击事件"""
-        path = self.model.filePath(index)
+        path = self.list_view.model().filePath(index)
         if os.path.isdir(path):
             self.navigate_to(path)
+        elif path.lower().endswith(SAVED_SEARCH_EXT):
+            self.open_search_file(path)
         else:
-            # 打开文件(这里可以根据文件类型选择不同的打开方式)
-            os.startfile(path)
+            # 打开文件(快捷方式直接启动解析出的目标)
+            launch(path)
     
     def navigate_to(self, path):
         """导航到指定路径"""
+        self.close_live_folder()
         self.current_path = path
         self.list_view.setRootIndex(self.model.index(path))
         self.setWindowTitle(f"BetterExplorer - {path}")
     
+    def save_search(self):
+        """把查询保存为虚拟文件夹，可选择同时在桌面创建"""
+        query, ok = QInputDialog.getText(self, "保存搜索", "查询条件 (例如 ext:log modified:<1d):",
+                                         text=f'under:"{self.current_path}" ')
+        if not ok or not query.strip():
+            return
+        name, ok = QInputDialog.getText(self, "保存搜索", "虚拟文件夹名称:")
+        if not ok or not name.strip():
+            return
+        try:
+            add_saved_search(name, query)
+        except QueryError as e:
+            QMessageBox.warning(self, "保存搜索", str(e))
+            return
+        reply = QMessageBox.question(self, "保存搜索", "是否在桌面上创建该虚拟文件夹？",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            from search_index import get_desktop_path
+            try:
+                write_search_file(get_desktop_path(), name, query)
+            except Exception as e:
+                self.logger.error(f"在桌面创建虚拟文件夹失败: {str(e)}")
+                QMessageBox.warning(self, "错误", f"在桌面创建虚拟文件夹失败: {str(e)}")
+        self.open_saved_search(name, query)
+    
+    def update_saved_search_menu(self):
+        """重建虚拟文件夹菜单"""
+        self.saved_search_menu.clear()
+        searches = load_saved_searches()
+        if not searches:
+            empty_action = self.saved_search_menu.addAction("(没有保存的搜索)")
+            empty_action.setEnabled(False)
+            return
+        for search in searches:
+            action = self.saved_search_menu.addAction(search["name"])
+            action.setToolTip(search["query"])
+            action.triggered.connect(lambda checked, s=search: self.open_saved_search(s["name"], s["query"]))
+    
+    def open_search_file(self, path):
+        """打开桌面等位置的虚拟文件夹文件"""
+        try:
+            name, query = read_search_file(path)
+        except Exception as e:
+            self.logger.error(f"读取虚拟文件夹失败: {path}, 错误: {str(e)}")
+            QMessageBox.warning(self, "错误", f"无法打开虚拟文件夹: {str(e)}")
+            return
+        self.open_saved_search(name, query)
+    
+    def open_saved_search(self, name, query):
+        """在列表视图中显示虚拟文件夹，内容随文件系统变化实时更新"""
+        try:
+            live_folder = LiveFolder(name, query, self)
+        except QueryError as e:
+            self.logger.warning(f"无法打开虚拟文件夹 '{name}': {e}")
+            QMessageBox.warning(self, "错误", f"无法打开虚拟文件夹: {e}")
+            return
+        self.close_live_folder()
+        self.live_folder = live_folder
+        self.live_model = LiveFolderModel(self.live_folder, self)
+        self.list_view.setModel(self.live_model)
+        self.live_folder.start()
+        self.setWindowTitle(f"BetterExplorer - 虚拟文件夹: {name}")
+    
+    def close_live_folder(self):
+        """关闭虚拟文件夹，恢复普通目录视图"""
+        if self.live_folder is None:
+            return
+        self.live_folder.stop()
+        self.list_view.setModel(self.model)
+        self.live_folder.deleteLater()
+        self.live_model.deleteLater()
+        self.live_folder = None
+        self.live_model = None
+    
     def go_back(self):
         """返回上一个访问的目录"""
         # 这里需要实现历史记录功能
@@ -150,6 +251,9 @@ class FileManager(QMainWindow):
     
     def refresh(self):
         """刷新当前视图"""
+        if self.live_folder is not None:
+            # 虚拟文件夹由文件系统事件实时更新，不需要刷新
+            return
         # 强制刷新文件系统模型
         self.model.setRootPath('')
         self.model.setRootPath(QDir.rootPath())
@@ -162,7 +266,7 @@ class FileManager(QMainWindow):
         if not index.isValid():
             return
         
-        file_path = self.model.filePath(index)
+        file_path = self.list_view.model().filePath(index)
         
         context_menu = QMenu()
         
@@ -185,6 +289,8 @@ class FileManager(QMainWindow):
         rename_action = QAction("重命名", self)
         rename_action.triggered.connect(lambda: self.rename_file(file_path))
         
+        tag_menu = self.create_tag_menu(file_path, context_menu)
+        
         # 将动作添加到菜单
         context_menu.addAction(open_action)
         context_menu.addSeparator()
@@ -194,17 +300,82 @@ class FileManager(QMainWindow):
         context_menu.addSeparator()
         context_menu.addAction(delete_action)
         context_menu.addAction(rename_action)
+        context_menu.addSeparator()
+        context_menu.addMenu(tag_menu)
         
         # 显示菜单
         context_menu.exec_(self.list_view.mapToGlobal(position))
     
+    def create_tag_menu(self, file_path, parent):
+        """创建标签子菜单：已有标签可以勾选切换，也可以添加新标签和编辑自定义属性"""
+        tag_menu = QMenu("标签", parent)
+        store = get_tag_store()
+        file_tags = {tag.casefold() for tag in store.get_tags(file_path)}
+        for tag, count in store.all_tags():
+            tag_action = tag_menu.addAction(f"{tag} ({count})")
+            tag_action.setCheckable(True)
+            tag_action.setChecked(tag.casefold() in file_tags)
+            tag_action.toggled.connect(lambda checked, tag=tag: self.set_file_tag(file_path, tag, checked))
+        if not tag_menu.isEmpty():
+            tag_menu.addSeparator()
+        add_tag_action = tag_menu.addAction("添加标签...")
+        add_tag_action.triggered.connect(lambda: self.add_file_tag(file_path))
+        edit_metadata_action = tag_menu.addAction("编辑属性...")
+        edit_metadata_action.triggered.connect(lambda: self.edit_file_metadata(file_path))
+        return tag_menu
+    
+    def set_file_tag(self, file_path, tag, checked):
+        """给文件添加或移除标签"""
+        try:
+            if checked:
+                get_tag_store().add_tag(file_path, tag)
+            else:
+                get_tag_store().remove_tag(file_path, tag)
+        except Exception as e:
+            self.logger.error(f"修改标签失败: {file_path}, 错误: {str(e)}")
+    
+    def add_file_tag(self, file_path):
+        """添加新标签，多个标签用逗号分隔"""
+        text, ok = QInputDialog.getText(self, "添加标签", "标签 (多个标签用逗号分隔):")
+        if not ok:
+            return
+        for tag in text.replace("，", ",").split(","):
+            if tag.strip():
+                self.set_file_tag(file_path, tag.strip(), True)
+    
+    def edit_file_metadata(self, file_path):
+        """以 "键=值" 每行一项的形式编辑自定义属性"""
+        store = get_tag_store()
+        metadata = store.get_metadata(file_path)
+        current = "\n".join(f"{key}={value}" for key, value in metadata.items())
+        text, ok = QInputDialog.getMultiLineText(self, "编辑属性",
+                                                 f"{os.path.basename(file_path)} 的属性 (每行一项: 键=值):", current)
+        if not ok:
+            return
+        new_metadata = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition("=")
+            if sep and key.strip():
+                new_metadata[key.strip()] = value.strip()
+        try:
+            for key in metadata:
+                if key not in new_metadata:
+                    store.set_metadata(file_path, key, "")
+            for key, value in new_metadata.items():
+                if metadata.get(key) != value:
+                    store.set_metadata(file_path, key, value)
+        except Exception as e:
+            self.logger.error(f"保存属性失败: {file_path}, 错误: {str(e)}")
+    
     def open_file(self, file_path):
         """打开文件或目录"""
         if os.path.isdir(file_path):
             self.navigate_to(file_path)
+        elif file_path.lower().endswith(SAVED_SEARCH_EXT):
+            self.open_search_file(file_path)
         else:
             try:
-                os.startfile(file_path)
+                launch(file_path)
                 self.logger.info(f"打开文件: {file_path}")
             except Exception as e:
                 self.logger.error(f"打开文件失败: {file_path}, 错误: {str(e)}")
@@ -236,6 +407,7 @@ class FileManager(QMainWindow):
                     shutil.copy2(source_path, target_path)
             elif self.clipboard_action == "cut":
                 shutil.move(source_path, target_path)
+                get_tag_store().move_path(source_path, target_path)
                 self.clipboard_file = None
                 self.clipboard_action = None
             
@@ -255,6 +427,7 @@ class FileManager(QMainWindow):
                     shutil.rmtree(file_path)
                 else:
                     os.remove(file_path)
+                get_tag_store().remove_path(file_path)
                 self.logger.info(f"删除文件: {file_path}")
                 self.refresh()
             except Exception as e:
@@ -270,6 +443,7 @@ class FileManager(QMainWindow):
             try:
                 new_path = os.path.join(os.path.dirname(file_path), new_name)
                 os.rename(file_path, new_path)
+                get_tag_store().move_path(file_path, new_path)
                 self.refresh()
             except Exception as e:
                 QMessageBox.warning(self, "错误", f"重命名失败: {str(e)}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 启动频率(frecency)模块
+用只追加的启动日志记录用户打开的程序，并在内存中维护指数衰减的常用度得分
+"""
+
+import os
+import math
+import time
+import threading
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+
+# 得分半衰期：7 天前的一次启动只相当于现在的一半
+HALF_LIFE = 7 * 24 * 3600
+# 日志行数超过该值时压缩为每个路径一行
+COMPACT_THRESHOLD = 2000
+# 当前得分低于该值(约为半年前的一次启动)的路径在压缩时丢弃
+MIN_SCORE = 2 ** -26
+# 搜索排序时常用度加分的上限
+MAX_BONUS = 32
+
+
+def normalize_path(path):
+    """统一路径写法，保证同一文件只对应一个键"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+class FrecencyStore:
+    """
+    常用度存储类
+    每个路径保存 sum(2^((t_i - epoch) / HALF_LIFE))，读取时只需乘以一个与路径无关的衰减系数，
+    因此记录和查询都是 O(1)，也不需要定期衰减所有条目
+    """
+
+    def __init__(self, log_file=None):
+        self.log_file = log_file or Settings.get_config_path("launches.log")
+        self.epoch = time.time()
+        self.values = {}      # 规范化路径 -> 累计值(以 epoch 为基准)
+        self.paths = {}       # 规范化路径 -> 最近一次记录的原始路径
+        self.missing = set()  # 后台检查发现已不存在的规范化路径，常用应用中不显示
+        self.line_count = 0
+        # 每次记录启动或发现路径不存在后递增，界面据此判断常用应用是否需要刷新
+        self.revision = 0
+        self.lock = threading.Lock()
+        self.load()
+        self.check_paths()
+
+    def _add(self, path, timestamp):
+        key = normalize_path(path)
+        self.values[key] = self.values.get(key, 0.0) + 2 ** ((timestamp - self.epoch) / HALF_LIFE)
+        self.paths[key] = path
+
+    def load(self):
+        """回放启动日志"""
+        if not os.path.exists(self.log_file):
+            return
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    timestamp, _, path = line.rstrip('\n').partition('\t')
+                    if not path:
+                        continue
+                    try:
+                        self._add(path, float(timestamp))
+                    except ValueError:
+                        continue
+                    self.line_count += 1
+        except Exception as e:
+            logger.error(f"加载启动日志失败: {e}")
+        if self.line_count > COMPACT_THRESHOLD:
+            self.compact()
+
+    def record_launch(self, path):
+        """记录一次启动，追加写入日志"""
+        if not path:
+            return
+        timestamp = time.time()
+        with self.lock:
+            self._add(path, timestamp)
+            self.missing.discard(normalize_path(path))
+            self.revision += 1
+            try:
+                os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(f"{timestamp:.0f}\t{path}\n")
+                self.line_count += 1
+            except Exception as e:
+                logger.error(f"写入启动日志失败: {e}")
+            if self.line_count > COMPACT_THRESHOLD:
+                self.compact()
+
+    def check_paths(self):
+        """在后台线程中检查记录的路径是否仍然存在，结果供 top() 使用，避免在界面线程中访问磁盘"""
+        threading.Thread(target=self._check_paths, name="frecency-check", daemon=True).start()
+
+    def _check_paths(self):
+        with self.lock:
+            items = [(key, path, self.values[key]) for key, path in self.paths.items()]
+        missing = {key: value for key, path, value in items if not os.path.exists(path)}
+        with self.lock:
+            # 检查期间启动过的路径 (累计值已变化) 以 record_launch 的结果为准
+            missing = {key for key, value in missing.items() if self.values.get(key) == value}
+            if missing != self.missing:
+                self.missing = missing
+                self.revision += 1
+
+    def mark_missing(self, path):
+        """启动时发现路径已不存在，不再显示在常用应用中"""
+        key = normalize_path(path)
+        with self.lock:
+            if key in self.paths and key not in self.missing:
+                self.missing.add(key)
+                self.revision += 1
+
+    def compact(self):
+        """
+        把日志压缩为每个路径一行
+        每行使用一个等效时间戳：在该时刻启动一次所得的得分与原来所有启动的累计得分相同
+        """
+        now = time.time()
+        lines = []
+        for key, value in self.values.items():
+            if value * self.decay(now) < MIN_SCORE:
+                continue
+            equivalent_time = self.epoch + HALF_LIFE * math.log2(value)
+            lines.append(f"{equivalent_time:.0f}\t{self.paths[key]}\n")
+        try:
+            tmp_file = self.log_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(tmp_file, self.log_file)
+        except Exception as e:
+            logger.error(f"压缩启动日志失败: {e}")
+            return
+        # 以当前时间为新基准重建内存数据，避免累计值无限增大
+        self.epoch = now
+        self.values = {}
+        old_paths = self.paths
+        self.paths = {}
+        self.line_count = 0
+        for line in lines:
+            timestamp, _, path = line.rstrip('\n').partition('\t')
+            self._add(path, float(timestamp))
+            self.line_count += 1
+        logger.debug(f"启动日志已压缩: {len(old_paths)} -> {len(self.paths)} 个路径")
+
+    def decay(self, now=None):
+        """所有路径共用的衰减系数"""
+        if now is None:
+            now = time.time()
+        return 2 ** ((self.epoch - now) / HALF_LIFE)
+
+    def score(self, path, decay=None):
+        """返回路径当前的常用度得分(约等于最近一次启动折算后的次数)"""
+        value = self.values.get(normalize_path(path))
+        if not value:
+            return 0.0
+        return value * (self.decay() if decay is None else decay)
+
+    def bonus(self, path, decay=None):
+        """把常用度得分换算为搜索排序加分"""
+        score = self.score(path, decay)
+        if not score:
+            return 0
+        return min(MAX_BONUS, int(8 * math.log2(1 + score)))
+
+    def bonus_snapshot(self):
+        """
+        返回 原始路径 -> 排序加分 的字典，每次查询只计算一次
+        查询时按条目路径直接查字典，不需要再规范化路径
+        """
+        decay = self.decay()
+        with self.lock:
+            items = list(self.paths.items())
+        snapshot = {}
+        for key, path in items:
+            value = self.bonus(path, decay)
+            if value:
+                snapshot[path] = value
+        return snapshot
+
+    def top(self, count):
+        """返回常用度最高的路径，跳过后台检查或启动时发现已不存在的路径 (不访问磁盘)"""
+        with self.lock:
+            ranked = sorted((item for item in self.values.items() if item[0] not in self.missing),
+                            key=lambda item: item[1], reverse=True)
+            return [self.paths[key] for key, value in ranked[:count]]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_frecency_store():
+    """获取全局共用的常用度存储实例"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FrecencyStore()
+        return _store
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 模糊匹配模块
+参照 fzf 的打分方式实现子序列模糊匹配，并用有界堆选出得分最高的前 k 个结果
+"""
+
+import heapq
+import unicodedata
+
+# 打分常量 (取值参考 fzf)
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = SCORE_MATCH // 2
+BONUS_CAMEL = BONUS_BOUNDARY + SCORE_GAP_EXTENSION
+BONUS_CONSECUTIVE = -(SCORE_GAP_START + SCORE_GAP_EXTENSION)
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+
+# 视为单词分隔符的字符
+DELIMITERS = frozenset(' _-.,/\\:;()[]{}+&')
+
+# 得分相同时的类型优先级，应用排在普通文件之前
+TYPE_RANK = {"app": 1, "file": 0}
+
+# 默认返回的结果数量上限
+DEFAULT_LIMIT = 200
+
+
+def normalize_key(text):
+    """生成匹配键：NFKC 规范化(全角转半角等)后做大小写折叠"""
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def char_mask(text):
+    """
+    字符集合的 64 位掩码 (按码位低 6 位分桶)
+    query 是 key 的子序列时 char_mask(query) 一定被 char_mask(key) 包含，可以用一次位运算排除大部分条目
+    """
+    mask = 0
+    for ch in set(text):
+        mask |= 1 << (ord(ch) & 63)
+    return mask
+
+
+def char_bonus(name, i):
+    """计算名称中第 i 个字符作为匹配位置的加分(单词开头、驼峰边界)"""
+    if i == 0:
+        return BONUS_BOUNDARY
+    prev = name[i - 1]
+    cur = name[i]
+    if prev in DELIMITERS:
+        return BONUS_BOUNDARY
+    if prev.islower() and cur.isupper():
+        return BONUS_CAMEL
+    if cur.isdigit() and not prev.isdigit():
+        return BONUS_CAMEL
+    return 0
+
+
+def is_subsequence(query, text):
+    """判断 query 是否为 text 的子序列"""
+    pos = -1
+    for ch in query:
+        pos = text.find(ch, pos + 1)
+        if pos < 0:
+            return False
+    return True
+
+
+def fuzzy_score(query, key, name=None):
+    """
+    计算查询在匹配键上的得分，不是子序列时返回 None
+    query 和 key 都应已经过 normalize_key；name 为原始名称，用于识别驼峰边界
+    """
+    # 前向扫描：找到子序列匹配的结束位置
+    pos = -1
+    for ch in query:
+        pos = key.find(ch, pos + 1)
+        if pos < 0:
+            return None
+    end = pos
+
+    # 反向扫描：从结束位置往回找最短的匹配区间起点
+    qi = len(query) - 1
+    start = end
+    i = end
+    while qi >= 0:
+        if key[i] == query[qi]:
+            start = i
+            qi -= 1
+        i -= 1
+
+    # 规范化改变了长度时无法对齐原始名称，只按匹配键判断边界
+    if name is None or len(name) != len(key):
+        name = key
+
+    # 在最短区间内计算得分
+    score = 0
+    qi = 0
+    in_gap = False
+    consecutive = 0
+    chunk_bonus = 0
+    query_len = len(query)
+    for i in range(start, end + 1):
+        if qi < query_len and key[i] == query[qi]:
+            bonus = char_bonus(name, i)
+            if consecutive == 0:
+                chunk_bonus = bonus
+            else:
+                # 连续匹配继承所在片段开头的加分
+                if bonus >= BONUS_BOUNDARY and bonus > chunk_bonus:
+                    chunk_bonus = bonus
+                bonus = max(bonus, chunk_bonus, BONUS_CONSECUTIVE)
+            if qi == 0:
+                score += SCORE_MATCH + bonus * BONUS_FIRST_CHAR_MULTIPLIER
+            else:
+                score += SCORE_MATCH + bonus
+            consecutive += 1
+            in_gap = False
+            qi += 1
+        else:
+            score += SCORE_GAP_EXTENSION if in_gap else SCORE_GAP_START
+            in_gap = True
+            consecutive = 0
+            chunk_bonus = 0
+    return score
+
+
+def top_k(query, candidates, keys, names, types, k=DEFAULT_LIMIT, matched=None, bonus=None, alt_keys=None):
+    """
+    对候选条目打分并返回得分最高的 k 个条目编号(从高到低)
+    使用大小为 k 的最小堆，复杂度为 O(n log k)
+    传入 matched 列表时，所有匹配的条目编号(不限于前 k 个)会按候选顺序追加到其中
+    传入 bonus(条目编号) 时，其返回值会加到匹配条目的得分上(例如常用度加分)
+    传入 alt_keys 时，每个条目的备用匹配键 (连接键, [(键, 名称)]) (例如拼音) 也参与打分，取最高分
+    """
+    query = normalize_key(query)
+    if not query or k <= 0:
+        return []
+    heap = []
+    for i in candidates:
+        key = keys[i]
+        score = fuzzy_score(query, key, names[i])
+        if alt_keys is not None:
+            alternatives = alt_keys[i]
+            # 先用连接键做一次子序列检查，绝大多数条目在这里就被排除
+            if alternatives and is_subsequence(query, alternatives[0]):
+                for alt_key, alt_name in alternatives[1]:
+                    alt_score = fuzzy_score(query, alt_key, alt_name)
+                    if alt_score is not None and (score is None or alt_score > score):
+                        score = alt_score
+        if score is None:
+            continue
+        if matched is not None:
+            matched.append(i)
+        if bonus is not None:
+            score += bonus(i)
+        # 得分相同时：应用优先，其次名称较短者优先，最后按索引顺序
+        item = (score, TYPE_RANK.get(types[i], 0), -len(key), -i)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    heap.sort(reverse=True)
+    return [-item[3] for item in heap]
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 图标服务模块
+在工作线程中提取快捷方式和可执行文件的图标 (QImage 可以在非界面线程中创建)，
+快捷方式解析为目标 (或自定义图标文件)，界面线程中按 (目标路径, 图标序号, 修改时间, 大小, 设备像素比)
+保存在有上限的 LRU 中，并持久化为磁盘上的 PNG 缓存；指向同一程序的快捷方式共用一个图标
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import Qt, QObject, QCoreApplication, pyqtSignal
+from PyQt5.QtGui import QIcon, QImage, QPixmap
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from shortcut import get_shortcut_cache
+
+# 内存中最多保存的图标数量
+MAX_CACHED_ICONS = 512
+# 提取图标的线程数
+ICON_WORKERS = 2
+# 磁盘缓存最多保留的 PNG 数量，启动时按最近使用时间清理
+MAX_CACHE_FILES = 2048
+# 超过该时间(秒)未使用的 PNG 在启动时删除 (目标修改时间变化后旧的 PNG 不会再被使用)
+MAX_CACHE_AGE = 30 * 24 * 3600
+
+# 每个工作线程只初始化一次 COM
+_thread_state = threading.local()
+
+
+def icon_source(path):
+    """
+    返回提取图标的 (文件, 图标序号或 None)
+    快捷方式有自定义图标时使用图标文件，否则使用存在的目标文件；无法解析 (例如 MSI 广告快捷方式) 时使用快捷方式本身
+    """
+    if not path.lower().endswith((".lnk", ".url")):
+        return path, None
+    info = get_shortcut_cache().resolve(path)
+    if info is None:
+        return path, None
+    if info.icon_location and os.path.exists(info.icon_location):
+        return info.icon_location, info.icon_index
+    if info.target and not info.url and os.path.exists(info.target):
+        return info.target, None
+    return path, None
+
+
+def hicon_to_image(hicon):
+    """把 HICON 转换为 QImage，只支持 32 位颜色位图 (现代系统上的图标都是 32 位)"""
+    import win32gui
+    import win32ui
+    _, _, _, hbm_mask, hbm_color = win32gui.GetIconInfo(hicon)
+    try:
+        if not hbm_color:
+            return None
+        bitmap = win32gui.GetObject(hbm_color)
+        if bitmap.bmBitsPixel != 32:
+            return None
+        width, height = bitmap.bmWidth, bitmap.bmHeight
+        bits = win32ui.CreateBitmapFromHandle(hbm_color).GetBitmapBits(True)
+        # 旧式图标的 alpha 通道全为 0，按不透明处理
+        image_format = QImage.Format_ARGB32 if any(bits[3::4]) else QImage.Format_RGB32
+        # copy() 让 QImage 拥有自己的数据，不再引用 bits
+        return QImage(bits, width, height, width * 4, image_format).copy()
+    finally:
+        if hbm_mask:
+            win32gui.DeleteObject(hbm_mask)
+        if hbm_color:
+            win32gui.DeleteObject(hbm_color)
+
+
+def extract_icon_image(path, size, icon_index=None):
+    """
+    在工作线程中提取文件图标，返回 size x size 的 QImage
+    icon_index 为 None 时用 SHGetFileInfo 取文件的外壳图标，否则用 ExtractIconEx 取图标文件中的第 icon_index 个图标
+    pywin32 只在工作线程中导入；无法提取时返回 None
+    """
+    import pythoncom
+    import win32gui
+    from win32com.shell import shell, shellcon
+    if not getattr(_thread_state, "com_initialized", False):
+        pythoncom.CoInitialize()
+        _thread_state.com_initialized = True
+    if icon_index is None:
+        flags = shellcon.SHGFI_ICON | (shellcon.SHGFI_LARGEICON if size > 16 else shellcon.SHGFI_SMALLICON)
+        result, info = shell.SHGetFileInfo(path, 0, flags)
+        hicon = info[0]
+        if not result or not hicon:
+            return None
+    else:
+        large, small = win32gui.ExtractIconEx(path, icon_index, 1)
+        icons = large if size > 16 else small
+        for unused in (small if size > 16 else large):
+            win32gui.DestroyIcon(unused)
+        if not icons:
+            return None
+        hicon = icons[0]
+    try:
+        image = hicon_to_image(hicon)
+    finally:
+        win32gui.DestroyIcon(hicon)
+    if image is not None and (image.width() != size or image.height() != size):
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+class IconService(QObject):
+    """
+    异步图标服务
+    icon() 立即返回已缓存的图标或 None (调用方先显示占位图标)，提取完成后发出 icon_ready(路径)
+    请求按快捷方式路径发出，缓存按解析出的目标保存
+    """
+
+    icon_ready = pyqtSignal(str)
+    # 工作线程 -> 界面线程: (请求, 缓存键, QImage)
+    _image_loaded = pyqtSignal(object)
+
+    def __init__(self, cache_dir=None, max_icons=MAX_CACHED_ICONS, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir or Settings.get_config_path("icon_cache")
+        self.max_icons = max_icons
+        # 缓存键 (目标的规范化路径, 图标序号, 修改时间, 大小, 设备像素比) -> QIcon，按最近使用排序
+        self.icons = OrderedDict()
+        # 请求 (路径, 大小, 设备像素比) -> 缓存键；目标和修改时间由工作线程解析和 stat 得到，界面线程不访问磁盘
+        self.keys = {}
+        # invalidate() 之前的缓存键，重新检查期间继续显示旧图标，避免闪烁
+        self.stale_keys = {}
+        self.pending = set()
+        self.failed = set()
+        self.executor = ThreadPoolExecutor(max_workers=ICON_WORKERS, thread_name_prefix="icon")
+        self._image_loaded.connect(self.on_image_loaded)
+        self.executor.submit(self.prune_cache)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def icon(self, path, size, dpr=1.0):
+        """返回缓存的图标；没有时提交后台提取并返回 None (或 invalidate() 之前的旧图标)"""
+        request = (path, size, dpr)
+        key = self.keys.get(request)
+        if key is not None:
+            icon = self.icons.get(key)
+            if icon is not None:
+                self.icons.move_to_end(key)
+                return icon
+        if request not in self.pending and request not in self.failed:
+            self.pending.add(request)
+            self.executor.submit(self.load, request)
+        return self.icons.get(self.stale_keys.get(request))
+
+    def cache_file(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".png")
+
+    def load(self, request):
+        """在工作线程中读取磁盘缓存或提取图标"""
+        path, size, dpr = request
+        key = image = None
+        try:
+            source, icon_index = icon_source(path)
+            stat = os.stat(source)
+            key = (os.path.normcase(source), icon_index, stat.st_mtime, size, dpr)
+            cache_file = self.cache_file(key)
+            image = QImage(cache_file)
+            if image.isNull():
+                image = extract_icon_image(source, round(size * dpr), icon_index)
+                if image is not None:
+                    self.store(cache_file, image)
+            else:
+                # 更新修改时间，启动清理时按它判断最近使用
+                os.utime(cache_file)
+        except Exception as e:
+            logger.debug(f"提取图标 '{path}' 失败: {e}")
+            image = None
+        self._image_loaded.emit((request, key, image))
+
+    def store(self, cache_file, image):
+        """写入 PNG 缓存，先写临时文件再替换"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            if image.save(tmp_file, "PNG"):
+                os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.error(f"写入图标缓存失败: {e}")
+
+    def prune_cache(self):
+        """在工作线程中清理磁盘缓存: 删除长时间未使用的 PNG，并只保留最近使用的 MAX_CACHE_FILES 个"""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                files = [(entry.stat().st_mtime, entry.path) for entry in it
+                         if entry.is_file() and entry.name.endswith(".png")]
+        except OSError:
+            return
+        files.sort(reverse=True)
+        expire = time.time() - MAX_CACHE_AGE
+        removed = 0
+        for i, (mtime, cache_file) in enumerate(files):
+            if i >= MAX_CACHE_FILES or mtime < expire:
+                try:
+                    os.remove(cache_file)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.debug(f"图标缓存删除了 {removed} 个文件")
+
+    def on_image_loaded(self, result):
+        """在界面线程中把 QImage 转换为图标并放入 LRU"""
+        request, key, image = result
+        self.pending.discard(request)
+        if key is None or image is None or image.isNull():
+            # 记录失败，继续显示占位图标，直到 invalidate()
+            self.failed.add(request)
+            return
+        path, size, dpr = request
+        # 指向同一目标的快捷方式共用同一个图标 (第二个快捷方式的图像来自磁盘缓存)
+        icon = self.icons.get(key)
+        if icon is None:
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(dpr)
+            icon = QIcon(pixmap)
+        self.keys[request] = key
+        self.stale_keys.pop(request, None)
+        self.icons[key] = icon
+        self.icons.move_to_end(key)
+        while len(self.icons) > self.max_icons:
+            self.icons.popitem(last=False)
+        self.icon_ready.emit(path)
+
+    def invalidate(self):
+        """文件可能已变化 (例如开始菜单目录树更新)：下次请求时重新 stat，修改时间变化的图标会重新提取"""
+        self.stale_keys.update(self.keys)
+        self.keys = {}
+        self.failed.clear()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
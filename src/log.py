@@ -10,8 +10,8 @@ from loguru import logger
 import os
 import sys
 
-# 配置日志
-log_dir = os.path.join(os.path.abspath(os.path.dirname(sys.argv[0])), 'logs')
+# 配置日志 (环境变量 BETTEREXPLORER_LOG_DIR 可以指定其他目录)
+log_dir = os.environ.get('BETTEREXPLORER_LOG_DIR') or os.path.join(os.path.abspath(os.path.dirname(sys.argv[0])), 'logs')
 os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, 'log.txt')
 
@@ -25,6 +25,7 @@ logger.add(
     retention="7 days", # 最多保留5天的日志文件
     compression="zip",  # 压缩旧的日志文件
     encoding='utf-8',   # 设置编码
+    delay=True,         # 第一次写入时才打开文件 (文档提取等子进程在初始化时移除该 handler，不会打开日志文件)
     level="DEBUG"       # 设置日志级别
 )
 
@@ -8,14 +8,16 @@ BetterExplorer - 一个增强型文件资源管理器
 
 import sys
 import signal
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtWidgets import QPushButton # 导入 QPushButton
+from PyQt5.QtCore import QTimer
 from desktop import Desktop
 from file_manager import FileManager
 from alt_tab import AltTabSwitcher
 from display_manager import DisplayManager
 from taskbar import TaskBar
-from start_menu import StartMenu
+from start_menu import StartMenu, PREWARM_DELAY_MS
 from hotkey import HotkeyManager
 from log import get_logger
 
@@ -92,6 +94,9 @@ class BetterExplorer:
         # 启动Alt+Tab监听
         self.alt_tab.start_monitoring()
         
+        # 桌面和任务栏绘制完成后，在空闲时预热开始菜单，第一次打开不再需要布局和扫描
+        QTimer.singleShot(PREWARM_DELAY_MS, self.start_menu.prewarm)
+        
         # 连接应用程序退出信号
         self.app.aboutToQuit.connect(self.cleanup)
         
@@ -113,6 +118,8 @@ class BetterExplorer:
 
 
 if __name__ == "__main__":
+    # 打包后文档提取进程池需要此调用才能启动子进程
+    multiprocessing.freeze_support()
     # 创建并运行应用程序
     explorer = BetterExplorer()
     sys.exit(explorer.run())
\ No newline at end of file
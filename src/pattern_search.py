@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 正则/通配符搜索模块
+把 re:^setup 或 *.iso 这样的模式编译为匹配函数，并提取名称中必须出现的字面量，用于先通过索引缩小候选
+"""
+
+import re
+import fnmatch
+from log import get_logger
+
+logger = get_logger()
+from search_query import QueryError
+
+try:
+    # Python 3.11 起 sre_parse 已弃用，改为 re 的内部模块
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+# 通配符模式中的特殊部分: *、? 和 [...] 字符集
+GLOB_SPECIAL = re.compile(r'\*|\?|\[[^\]]*\]')
+
+
+def is_glob(text):
+    """文本中含有 * 或 ? 时按通配符模式处理"""
+    return '*' in text or '?' in text
+
+
+def collect_literals(parsed, literals):
+    """
+    遍历正则语法树，收集每一段连续的必需字面量
+    只进入一定会匹配的结构 (分组、至少重复一次)，分支、字符集等都视为字面量的分隔
+    """
+    run = []
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            literals.append("".join(run))
+            run = []
+        if op is sre_constants.SUBPATTERN:
+            collect_literals(av[-1], literals)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            collect_literals(av[2], literals)
+    if run:
+        literals.append("".join(run))
+
+
+def regex_literals(pattern):
+    """返回正则中必须出现的字面量(已小写)"""
+    literals = []
+    try:
+        collect_literals(sre_parse.parse(pattern), literals)
+    except Exception as e:
+        logger.debug(f"无法分析正则 '{pattern}': {e}")
+        return []
+    return [literal.casefold() for literal in literals]
+
+
+def glob_literals(pattern):
+    """返回通配符模式中通配符之间的字面量(已小写)"""
+    return [part.casefold() for part in GLOB_SPECIAL.split(pattern) if part]
+
+
+class PatternQuery:
+    """编译后的正则/通配符查询"""
+
+    def __init__(self, match, literals):
+        self.match = match          # match(匹配键) -> 是否命中
+        self.literals = literals    # 匹配键中必须包含的字面量
+
+    @classmethod
+    def from_regex(cls, pattern):
+        """正则模式，按 re.search 语义匹配，需要时用 ^ 和 $ 锚定"""
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise QueryError(f"无效的正则表达式: {e}")
+        return cls(regex.search, regex_literals(pattern))
+
+    @classmethod
+    def from_glob(cls, pattern):
+        """通配符模式，与 fnmatch 一样需要匹配整个名称"""
+        regex = re.compile(fnmatch.translate(pattern), re.IGNORECASE)
+        return cls(regex.match, glob_literals(pattern))
+
+
+def compile_pattern(parsed):
+    """
+    根据解析后的查询生成 PatternQuery，普通查询返回 None
+    正则模式下其余文本的每个词都作为必需的子串
+    """
+    if parsed.regex is not None:
+        pattern = PatternQuery.from_regex(parsed.regex)
+        pattern.literals.extend(word.casefold() for word in parsed.text.split())
+        return pattern
+    if is_glob(parsed.text):
+        return PatternQuery.from_glob(parsed.text)
+    return None
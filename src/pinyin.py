@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 拼音匹配模块
+为包含汉字的名称生成全拼和首字母匹配键，例如 "微信" -> "weixin" / "wx"
+"""
+
+import itertools
+from pinyin_table import PINYIN_TABLE, PINYIN_POLYPHONES
+
+# 每个名称最多生成的读音组合数量 (多音字会产生多种组合)
+MAX_VARIANTS = 4
+
+# 汉字 -> ((全拼, 首字母), ...)，最常用读音在前，音节首字母已大写；首次使用时由对照表展开
+_char_pinyin = None
+
+
+def char_pinyin_map():
+    """返回汉字到读音元组的字典"""
+    global _char_pinyin
+    if _char_pinyin is None:
+        mapping = {}
+        for syllable, chars in PINYIN_TABLE.items():
+            reading = (syllable.capitalize(), syllable[0].upper())
+            for char in chars:
+                mapping[char] = (reading,)
+        for syllable, chars in PINYIN_POLYPHONES.items():
+            reading = (syllable.capitalize(), syllable[0].upper())
+            for char in chars:
+                if char in mapping:
+                    mapping[char] = mapping[char] + (reading,)
+        _char_pinyin = mapping
+    return _char_pinyin
+
+
+def has_hanzi(text):
+    """判断文本中是否含有汉字"""
+    return any('一' <= char <= '龥' or char == '〇' for char in text)
+
+
+def pinyin_keys(name):
+    """
+    返回名称的拼音匹配键列表 [(小写键, 用于计算边界加分的名称), ...]，不含汉字时返回 None
+    全拼的每个音节首字母大写 (WeiXin)，让模糊匹配把音节开头当作驼峰边界加分；
+    非汉字部分原样保留，例如 "QQ音乐" -> ("qqyinyue", "QQYinYue") 和 ("qqyy", "QQYY")；
+    多音字最多展开 MAX_VARIANTS 种读音组合
+    """
+    if not has_hanzi(name):
+        return None
+    mapping = char_pinyin_map()
+    choices = [mapping.get(char) or ((char, char),) for char in name]
+    keys = []
+    seen = set()
+    for combination in itertools.islice(itertools.product(*choices), MAX_VARIANTS):
+        full_name = "".join([reading[0] for reading in combination])
+        initials_name = "".join([reading[1] for reading in combination])
+        for alt_name in (full_name, initials_name):
+            alt_key = alt_name.casefold()
+            if alt_key not in seen:
+                seen.add(alt_key)
+                keys.append((alt_key, alt_name))
+    return keys
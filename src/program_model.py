@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 程序列表模型模块
+开始菜单的程序、文件夹和 UWP 应用列表模型，配合图标模式的 QListView 只绘制可见的格子
+"""
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class ProgramListModel(QAbstractListModel):
+    """
+    程序列表模型
+    条目类型为 "folder"、"program" 或 "uwp"；目标分别是目录树中的文件夹键、快捷方式路径和 AppID
+    """
+
+    def __init__(self, icon_for, parent=None):
+        super().__init__(parent)
+        # icon_for(名称, 类型, 目标) -> QIcon，由开始菜单提供 (共用的占位图标或图标服务中已提取的图标)
+        self.icon_for = icon_for
+        # 并列数组保存条目，避免为每一项创建 Qt 对象
+        self.names = []
+        self.types = []
+        self.targets = []
+        # 目标 -> 行号，图标提取完成后只更新对应的行
+        self.rows = {}
+        # 最近一次 set_items()/apply_items() 重置、插入、删除或更新的行数
+        self.changed_rows = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.names[row]
+        if role == Qt.DecorationRole:
+            return self.icon_for(self.names[row], self.types[row], self.targets[row])
+        if role == Qt.ToolTipRole:
+            return self.names[row] if self.types[row] == "folder" else self.targets[row]
+        if role == Qt.UserRole:
+            return {"name": self.names[row], "type": self.types[row], "target": self.targets[row]}
+        return None
+
+    def set_items(self, items):
+        """用 [(名称, 类型, 目标)] 替换全部条目"""
+        self.beginResetModel()
+        self.names = []
+        self.types = []
+        self.targets = []
+        for name, item_type, target in items:
+            self.names.append(name)
+            self.types.append(item_type)
+            self.targets.append(target)
+        self.rows = {target: row for row, target in enumerate(self.targets)}
+        self.changed_rows = len(self.targets)
+        self.endResetModel()
+
+    def apply_items(self, items):
+        """
+        把条目更新为 [(名称, 类型, 目标)]，只删除、插入或更新变化的行，视图保留滚动位置和选择
+        保留的条目顺序发生变化或目标有重复时退回到 set_items()
+        """
+        new_targets = [target for _, _, target in items]
+        new_set = set(new_targets)
+        if len(new_set) != len(new_targets):
+            self.set_items(items)
+            return
+        changed = 0
+        # 从后往前删除不再存在的行
+        for row in range(len(self.targets) - 1, -1, -1):
+            if self.targets[row] not in new_set:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.names[row]
+                del self.types[row]
+                del self.targets[row]
+                self.endRemoveRows()
+                changed += 1
+        old_set = set(self.targets)
+        if self.targets != [target for target in new_targets if target in old_set]:
+            self.set_items(items)
+            return
+        for row, (name, item_type, target) in enumerate(items):
+            if target not in old_set:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.names.insert(row, name)
+                self.types.insert(row, item_type)
+                self.targets.insert(row, target)
+                self.endInsertRows()
+                changed += 1
+            elif self.names[row] != name or self.types[row] != item_type:
+                self.names[row] = name
+                self.types[row] = item_type
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                changed += 1
+        self.rows = {target: row for row, target in enumerate(self.targets)}
+        self.changed_rows = changed
+
+    def update_icon(self, target):
+        """目标的图标已更新，通知视图重绘该行 (不在当前列表中时忽略)"""
+        row = self.rows.get(target)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
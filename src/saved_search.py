@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 保存的搜索(虚拟文件夹)模块
+把查询保存为虚拟文件夹，首次打开时在后台线程扫描一次，之后根据 QFileSystemWatcher 的目录变化事件只重新列举变化的目录
+"""
+
+import os
+import json
+import time
+import threading
+from PyQt5.QtCore import Qt, QObject, QTimer, QFileInfo, QFileSystemWatcher, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt5.QtWidgets import QFileIconProvider
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from search_query import parse_query, QueryError
+# 导入时注册 tag:/meta: 过滤词，否则 validate_query 会把它们当作普通文本
+import tag_store
+
+# 桌面上的虚拟文件夹文件扩展名，内容为 {"name": ..., "query": ...}
+SAVED_SEARCH_EXT = ".bxsearch"
+# 每个虚拟文件夹最多监视的目录数量
+MAX_WATCHED_DIRS = 2000
+# 重新计算时间条件 (如 modified:<1d) 的间隔(毫秒)，只检查内存中的条目，不访问磁盘
+RECHECK_INTERVAL = 60 * 1000
+
+
+def get_saved_searches_file():
+    return Settings.get_config_path("saved_searches.json")
+
+
+def load_saved_searches():
+    """返回保存的搜索列表 [{"name": 名称, "query": 查询}]"""
+    try:
+        with open(get_saved_searches_file(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"加载保存的搜索失败: {e}")
+        return []
+
+
+def validate_query(query):
+    """
+    检查查询能否用作虚拟文件夹，返回解析结果；不支持时抛出 QueryError
+    虚拟文件夹逐个文件判断是否匹配 (ParsedQuery.match_file)，依赖标签数据库的 tag:/meta: 和
+    需要读取文件内容的 content: 无法随文件变化实时更新
+    """
+    parsed = parse_query(query)
+    unsupported = [f"{name}:" for name in dict.fromkeys(name for name, value in parsed.extra_filters)]
+    if parsed.content is not None:
+        unsupported.append("content:")
+    if unsupported:
+        raise QueryError(f"虚拟文件夹不支持过滤词 {', '.join(unsupported)}")
+    return parsed
+
+
+def add_saved_search(name, query):
+    """保存搜索，同名的搜索会被替换；查询不能用作虚拟文件夹时抛出 QueryError"""
+    validate_query(query)
+    searches = [search for search in load_saved_searches() if search.get("name") != name]
+    searches.append({"name": name, "query": query})
+    try:
+        saved_searches_file = get_saved_searches_file()
+        os.makedirs(os.path.dirname(saved_searches_file), exist_ok=True)
+        with open(saved_searches_file, 'w', encoding='utf-8') as f:
+            json.dump(searches, f, ensure_ascii=False, indent=4)
+        logger.info(f"已保存搜索: {name} ({query})")
+    except Exception as e:
+        logger.error(f"保存搜索失败: {e}")
+
+
+def write_search_file(directory, name, query):
+    """在目录(通常是桌面)中创建虚拟文件夹文件，返回其路径；查询不能用作虚拟文件夹时抛出 QueryError"""
+    validate_query(query)
+    path = os.path.join(directory, name + SAVED_SEARCH_EXT)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"name": name, "query": query}, f, ensure_ascii=False, indent=4)
+    return path
+
+
+def read_search_file(path):
+    """读取虚拟文件夹文件，返回 (名称, 查询)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("name") or os.path.splitext(os.path.basename(path))[0], data["query"]
+
+
+class LiveFolder(QObject):
+    """
+    实时虚拟文件夹
+    entries 保存扫描过的所有条目 (包括暂不匹配的，时间条件变化后可能开始匹配)，
+    matched 是满足查询的路径集合；目录变化时只重新列举该目录的直接子项并比较差异，
+    新出现的目录在后台线程中扫描
+    查询包含不支持的过滤词时抛出 QueryError (见 validate_query)
+    """
+
+    item_added = pyqtSignal(str)
+    item_removed = pyqtSignal(str)
+    # 后台扫描线程 -> 界面线程: [(目录, 列举结果)]
+    _scan_finished = pyqtSignal(object)
+    # 后台扫描线程 -> 界面线程: (新目录, 扫描编号, [(目录, 列举结果)])
+    _subtree_scanned = pyqtSignal(str, int, object)
+
+    def __init__(self, name, query, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.query = query
+        self.parsed = validate_query(query)
+        if self.parsed.under:
+            self.roots = [directory.rstrip(os.sep) or os.sep for directory in self.parsed.under]
+        else:
+            from search_index import get_desktop_path
+            self.roots = [get_desktop_path()]
+        self.entries = {}     # 路径 -> (名称, 是否目录, 大小, 修改时间)
+        self.children = {}    # 目录 -> 直接子项路径集合
+        self.matched = set()
+        # 已监视的目录，避免每次都复制 watcher.directories()
+        self.watched = set()
+        self.watch_limit_logged = False
+        self.stopped = False
+        self.scan_started = 0
+        # 正在后台扫描的新目录 -> 扫描编号；目录在扫描期间被删除 (或删除后重建) 时丢弃旧的扫描结果
+        self.pending_scans = {}
+        self.scan_count = 0
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self._scan_finished.connect(self.on_scan_finished)
+        self._subtree_scanned.connect(self.on_subtree_scanned)
+        self.recheck_timer = QTimer(self)
+        self.recheck_timer.setInterval(RECHECK_INTERVAL)
+        self.recheck_timer.timeout.connect(self.recheck)
+
+    def start(self):
+        """在后台线程中扫描所有根目录，完成后在界面线程中添加条目并开始监视"""
+        self.scan_started = time.perf_counter()
+        threading.Thread(target=self.scan_roots, name="live-folder", daemon=True).start()
+
+    def scan_roots(self):
+        """在工作线程中列举所有根目录，不修改任何状态"""
+        listings = []
+        for root in self.roots:
+            if self.stopped:
+                return
+            listings.extend(self.walk_tree(root))
+        try:
+            self._scan_finished.emit(listings)
+        except RuntimeError:
+            # 扫描期间虚拟文件夹已被关闭并删除
+            pass
+
+    def on_scan_finished(self, listings):
+        if self.stopped:
+            return
+        self.apply_listings(listings)
+        self.recheck_timer.start()
+        logger.info(f"虚拟文件夹 '{self.name}': {len(self.matched)} 个匹配, 扫描 {len(self.entries)} 个条目, "
+                    f"监视 {len(self.watched)} 个目录, 耗时 {time.perf_counter() - self.scan_started:.2f} 秒")
+
+    def stop(self):
+        """停止监视"""
+        self.stopped = True
+        self.recheck_timer.stop()
+        if self.watched:
+            self.watcher.removePaths(list(self.watched))
+            self.watched.clear()
+
+    def list_directory(self, directory):
+        """列举目录的直接子项，返回 {路径: (名称, 是否目录, 大小, 修改时间)}，无法访问时返回 None"""
+        listing = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    listing[entry.path] = (entry.name, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime)
+        except OSError as e:
+            logger.debug(f"无法列举目录 '{directory}': {e}")
+            return None
+        return listing
+
+    def walk_tree(self, root):
+        """列举目录树，返回 [(目录, 列举结果)]"""
+        listings = []
+        stack = [root]
+        while stack and not self.stopped:
+            directory = stack.pop()
+            listing = self.list_directory(directory)
+            if listing is None:
+                continue
+            listings.append((directory, listing))
+            for path, entry in listing.items():
+                if entry[1]:
+                    stack.append(path)
+        return listings
+
+    def apply_listings(self, listings):
+        """记录列举结果并监视其中的目录"""
+        for directory, listing in listings:
+            self.watch(directory)
+            self.children[directory] = set(listing)
+            for path, entry in listing.items():
+                self.set_entry(path, entry)
+
+    def scan_subtree(self, root):
+        """在后台线程中扫描变化事件中新出现的目录，完成后在界面线程中添加条目并开始监视"""
+        self.scan_count += 1
+        self.pending_scans[root] = self.scan_count
+        threading.Thread(target=self.walk_subtree, args=(root, self.scan_count),
+                         name="live-folder-subtree", daemon=True).start()
+
+    def walk_subtree(self, root, scan_id):
+        """在工作线程中列举新目录，不修改任何状态"""
+        listings = self.walk_tree(root)
+        try:
+            self._subtree_scanned.emit(root, scan_id, listings)
+        except RuntimeError:
+            pass
+
+    def on_subtree_scanned(self, root, scan_id, listings):
+        if self.stopped or self.pending_scans.get(root) != scan_id:
+            return
+        del self.pending_scans[root]
+        entry = self.entries.get(root)
+        if entry is None or not entry[1]:
+            # 扫描期间目录已被删除或被同名文件替换
+            return
+        self.apply_listings(listings)
+
+    def watch(self, directory):
+        if directory in self.watched:
+            return
+        if len(self.watched) < MAX_WATCHED_DIRS:
+            if self.watcher.addPath(directory):
+                self.watched.add(directory)
+        elif not self.watch_limit_logged:
+            self.watch_limit_logged = True
+            logger.warning(f"虚拟文件夹 '{self.name}' 的目录数超过 {MAX_WATCHED_DIRS}，其余目录不会实时更新")
+
+    def set_entry(self, path, entry):
+        """记录条目并根据查询更新匹配集合"""
+        self.entries[path] = entry
+        name, is_dir, size, mtime = entry
+        if self.parsed.match_file(name, path, is_dir, size, mtime):
+            if path not in self.matched:
+                self.matched.add(path)
+                self.item_added.emit(path)
+        elif path in self.matched:
+            self.matched.discard(path)
+            self.item_removed.emit(path)
+
+    def remove_tree(self, path):
+        """移除条目及其所有子项"""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            self.entries.pop(current, None)
+            self.pending_scans.pop(current, None)
+            if current in self.matched:
+                self.matched.discard(current)
+                self.item_removed.emit(current)
+            children = self.children.pop(current, None)
+            if children is not None:
+                if current in self.watched:
+                    self.watched.discard(current)
+                    self.watcher.removePath(current)
+                stack.extend(children)
+
+    def on_directory_changed(self, directory):
+        """目录变化时只重新列举该目录，比较差异后更新"""
+        listing = self.list_directory(directory)
+        if listing is None:
+            # 目录已被删除，由父目录的变化事件或这里直接移除
+            self.remove_tree(directory)
+            return
+        old_children = self.children.get(directory, set())
+        for path in old_children - set(listing):
+            self.remove_tree(path)
+        for path, entry in listing.items():
+            old_entry = self.entries.get(path)
+            if old_entry == entry:
+                continue
+            if old_entry is not None and old_entry[1] != entry[1]:
+                # 文件与目录互相替换
+                self.remove_tree(path)
+            self.set_entry(path, entry)
+            if entry[1] and path not in self.children and path not in self.pending_scans:
+                self.scan_subtree(path)
+        self.children[directory] = set(listing)
+        # 监视可能因目录被删除后重建而失效 (QFileSystemWatcher 会自动移除已删除的目录)，只在变化事件中检查
+        if directory not in self.watcher.directories():
+            self.watched.discard(directory)
+            self.watch(directory)
+
+    def recheck(self):
+        """重新解析查询以更新 modified: 等相对时间条件，并重新判断内存中的条目"""
+        if not self.parsed.time_filters:
+            return
+        self.parsed = parse_query(self.query)
+        for path, entry in list(self.entries.items()):
+            self.set_entry(path, entry)
+
+
+class LiveFolderModel(QAbstractListModel):
+    """虚拟文件夹的列表模型，按 LiveFolder 的增删事件逐行更新"""
+
+    def __init__(self, folder, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.paths = []
+        self.icon_provider = QFileIconProvider()
+        folder.item_added.connect(self.on_item_added)
+        folder.item_removed.connect(self.on_item_removed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.paths):
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.ToolTipRole:
+            return path
+        if role == Qt.DecorationRole:
+            return self.icon_provider.icon(QFileInfo(path))
+        if role == Qt.UserRole:
+            return path
+        return None
+
+    def filePath(self, index):
+        """与 QFileSystemModel 相同的接口，便于文件管理器复用右键菜单等逻辑"""
+        return self.data(index, Qt.UserRole) or ""
+
+    def on_item_added(self, path):
+        row = len(self.paths)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.paths.append(path)
+        self.endInsertRows()
+
+    def on_item_removed(self, path):
+        try:
+            row = self.paths.index(path)
+        except ValueError:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.paths[row]
+        self.endRemoveRows()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 目录扫描模块
+在有界线程池中用 os.scandir 并行扫描多个根目录，每个根目录有独立的时间预算
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from log import get_logger
+
+logger = get_logger()
+
+# 默认每个根目录的时间预算(秒)
+DEFAULT_ROOT_BUDGET = 2.0
+# 默认线程池大小上限
+DEFAULT_MAX_WORKERS = 4
+
+
+class RootScan:
+    """单个根目录的扫描任务及其结果"""
+
+    def __init__(self, path, recursive=True, extensions=None, include_dirs=False, with_stat=False):
+        self.path = path
+        self.recursive = recursive
+        # 只收集这些扩展名(小写，带点)的文件，None 表示全部收集
+        self.extensions = tuple(extensions) if extensions else None
+        # 是否把子目录本身也作为条目收集
+        self.include_dirs = include_dirs
+        # 是否收集大小和修改时间 (Windows 上 DirEntry.stat() 直接使用目录枚举返回的数据)
+        self.with_stat = with_stat
+
+        # 扫描结果: [(名称, 完整路径, 是否目录, 大小, 修改时间)]，未收集时大小和时间为 0
+        self.entries = []
+        # 扫描过的目录 -> 修改时间
+        self.dir_mtimes = {}
+        self.complete = False
+        self.timed_out = False
+        self.elapsed = 0.0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """通知扫描线程尽快停止"""
+        self._cancelled.set()
+
+    def run(self, budget):
+        """在工作线程中执行扫描，超过时间预算或被取消时提前返回"""
+        start = time.monotonic()
+        deadline = start + budget
+        stack = [self.path]
+        extensions = self.extensions
+        with_stat = self.with_stat
+        # 绑定到局部变量：超时后主线程会换成副本，后台线程继续写入的内容不会混入结果
+        entries = self.entries
+        dir_mtimes = self.dir_mtimes
+        try:
+            while stack:
+                if self._cancelled.is_set() or time.monotonic() > deadline:
+                    self.timed_out = True
+                    return
+                directory = stack.pop()
+                try:
+                    dir_mtimes[directory] = os.stat(directory).st_mtime
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            # DirEntry 自带类型信息，不需要额外的 stat 调用
+                            try:
+                                is_dir = entry.is_dir(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            if is_dir:
+                                if self.recursive:
+                                    stack.append(entry.path)
+                                if not self.include_dirs:
+                                    continue
+                            elif extensions is not None and not entry.name.lower().endswith(extensions):
+                                continue
+                            size = mtime = 0
+                            if with_stat:
+                                try:
+                                    stat = entry.stat(follow_symlinks=False)
+                                    size = 0 if is_dir else stat.st_size
+                                    mtime = stat.st_mtime
+                                except OSError:
+                                    pass
+                            entries.append((entry.name, entry.path, is_dir, size, mtime))
+                except OSError as e:
+                    # 根目录本身无法访问时放弃整个根目录，子目录出错则跳过
+                    if directory == self.path:
+                        logger.warning(f"无法访问根目录 '{directory}': {e}")
+                        return
+                    logger.debug(f"跳过无法访问的目录 '{directory}': {e}")
+            self.complete = True
+        except Exception as e:
+            logger.error(f"扫描 '{self.path}' 时出错: {e}")
+        finally:
+            self.elapsed = time.monotonic() - start
+
+
+def scan_roots(scans, root_budget=DEFAULT_ROOT_BUDGET, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    并行扫描多个根目录，每个根目录最多扫描 root_budget 秒
+    超时的根目录保留已经收集到的部分结果并标记为 timed_out，
+    卡死的线程会在后台自行结束，不会阻塞其他根目录的结果
+    """
+    # 根目录是否存在也在工作线程中检查，因为挂起的网络路径连 stat 都可能卡住
+    scans = [scan for scan in scans if scan.path]
+    if not scans:
+        return scans
+
+    workers = max(1, min(max_workers, len(scans)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scanner")
+    futures = {executor.submit(scan.run, root_budget): scan for scan in scans}
+    # 根目录多于线程数时需要分几轮执行，总等待时间按轮数放宽
+    waves = (len(scans) + workers - 1) // workers
+    done, not_done = wait(futures, timeout=root_budget * waves + 0.1)
+    for future in not_done:
+        scan = futures[future]
+        scan.cancel()
+        scan.timed_out = True
+        # 复制一份，避免与仍在运行的扫描线程共享容器 (list/dict 的复制在持有 GIL 时一次完成)
+        scan.entries = list(scan.entries)
+        scan.dir_mtimes = dict(scan.dir_mtimes)
+        logger.warning(f"扫描 '{scan.path}' 超出时间预算 {root_budget} 秒，使用部分结果")
+    # 不等待超时的线程，它们在取消标志或系统调用返回后退出
+    executor.shutdown(wait=False)
+    return scans
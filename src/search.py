@@ -6,23 +6,45 @@ BetterExplorer - 搜索模块
 实现全局搜索功能，支持应用程序和文件搜索
 """
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QListWidget,
-                             QListWidgetItem)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
-import os
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QListView,
+                             QApplication)
+from PyQt5.QtCore import Qt, QTimer
 from log import get_logger
 
 logger = get_logger()
-from settings import Settings # 导入 Settings
+from settings import Settings
+from search_worker import SearchWorker
+from search_model import SearchResultModel
+from frecency import get_frecency_store
+from shortcut import launch
 
 class SearchWindow(QWidget):
     """搜索主界面类"""
 
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, index=None):
         super().__init__(parent)
         self.logger = logger
+        # 搜索代号，每次输入变化递增，用于丢弃过期结果
+        self.generation = 0
+        # 结果列表当前显示的代号
+        self.shown_generation = 0
+
+        # 搜索工作线程，索引只在启动时扫描一次(或从磁盘缓存加载)，按键时不再遍历文件系统
+        self.worker = SearchWorker(index)
+        self.worker.results_ready.connect(self.on_results_ready)
+        self.worker.search_finished.connect(self.on_search_finished)
+        self.worker.start()
+        app = QApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.worker.stop)
+
+        # 输入防抖定时器，停止输入一段时间后才提交查询
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(Settings.get_setting("search_debounce_ms", 80))
+        self.debounce_timer.timeout.connect(lambda: self.perform_search(self.search_input.text()))
+
         self.init_ui()
 
     def init_ui(self):
@@ -37,6 +59,11 @@ class SearchWindow(QWidget):
         # 搜索输入框
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("搜索应用、文件和设置")
+        self.search_input.setToolTip("支持过滤词: ext:pdf  kind:app  size:>100MB  modified:<7d\n"
+                                     "正则: re:^setup.*\\.exe$    通配符: *.iso\n"
+                                     "文件内容: content:关键字  content:re:正则\n"
+                                     "标签: tag:工作  tag:a,b  属性: meta:作者=张三\n"
+                                     "目录: under:\"C:\\Program Files\"  (含空格的值加双引号)")
         self.search_input.setStyleSheet(
             "QLineEdit {background-color: #3E3E42; border: 1px solid #555555;"
             "border-radius: 3px; padding: 8px;}"
@@ -45,80 +72,72 @@ class SearchWindow(QWidget):
         main_layout.addWidget(self.search_input)
 
         # 连接信号
-        self.search_input.textChanged.connect(self.perform_search)
-
-        # 搜索结果列表
-        self.result_list = QListWidget()
+        self.search_input.textChanged.connect(self.on_text_changed)
+
+        # 搜索结果列表 (模型/视图，只绘制滚动到可见区域的行)
+        self.result_model = SearchResultModel(self)
+        self.result_list = QListView()
+        self.result_list.setModel(self.result_model)
+        self.result_list.setUniformItemSizes(True)
+        self.result_list.setEditTriggers(QListView.NoEditTriggers)
         self.result_list.setStyleSheet(
-            "QListWidget {background-color: #1E1E1E; border: none;}"
-            "QListWidget::item {height: 40px; padding: 5px;}"
-            "QListWidget::item:hover {background-color: #3E3E42;}"
-            "QListWidget::item:selected {background-color: #0078D7;}"
+            "QListView {background-color: #1E1E1E; border: none;}"
+            "QListView::item {height: 40px; padding: 5px;}"
+            "QListView::item:hover {background-color: #3E3E42;}"
+            "QListView::item:selected {background-color: #0078D7;}"
         )
         main_layout.addWidget(self.result_list)
         # 连接双击信号
-        self.result_list.itemDoubleClicked.connect(self.open_item)
+        self.result_list.doubleClicked.connect(self.open_item)
+
+    def on_text_changed(self, query):
+        """输入变化时重新开始防抖计时"""
+        if not query:
+            # 清空输入时立即清空结果，不必等待
+            self.debounce_timer.stop()
+            self.perform_search(query)
+            return
+        self.debounce_timer.start()
 
     def perform_search(self, query):
-        """执行搜索操作"""
-        self.result_list.clear()
+        """执行搜索操作，查询在后台线程中进行"""
+        self.generation += 1
         if not query:
+            self.result_model.clear()
+            self.shown_generation = self.generation
+        else:
+            self.logger.info(f"开始搜索: {query}")
+        self.worker.submit(self.generation, query)
+
+    def on_results_ready(self, generation, batch):
+        """接收一批搜索结果并追加到结果列表"""
+        if generation != self.generation:
+            return
+        # 新查询的第一批结果到达时才清空旧结果，避免列表闪烁
+        if self.shown_generation != generation:
+            self.result_model.clear()
+            self.shown_generation = generation
+        self.result_model.append_results(batch)
+
+    def on_search_finished(self, generation, count):
+        """查询完成时清除没有结果的旧列表"""
+        if generation != self.generation:
             return
+        if self.shown_generation != generation:
+            self.result_model.clear()
+            self.shown_generation = generation
+        self.logger.debug(f"搜索完成: {count} 个结果")
 
-        self.logger.info(f"开始搜索: {query}")
-        query_lower = query.lower()
-
-        # 获取桌面路径 (优先从设置读取，否则使用默认路径)
-        desktop_path = Settings.get_setting("desktop_path", os.path.expanduser("~\Desktop"))
-        
-        # 搜索桌面文件/文件夹
-        try:
-            if os.path.exists(desktop_path):
-                for item_name in os.listdir(desktop_path):
-                    if query_lower in item_name.lower():
-                        item_path = os.path.join(desktop_path, item_name)
-                        item = QListWidgetItem(item_name)
-                        # 可以根据是文件还是文件夹设置不同图标
-                        # icon_path = "icons/file_icon.svg" if os.path.isfile(item_path) else "icons/folder_icon.svg"
-                        # item.setIcon(QIcon(icon_path)) # 需要准备相应图标文件
-                        item.setIcon(QIcon("icons/search_icon.svg")) # 暂时使用通用图标
-                        item.setData(Qt.UserRole, {"type": "file", "path": item_path}) # 存储类型和完整路径
-                        self.result_list.addItem(item)
-            else:
-                self.logger.warning(f"桌面路径不存在: {desktop_path}")
-        except Exception as e:
-            self.logger.error(f"搜索桌面时出错: {e}")
-
-        # 搜索应用程序 (开始菜单)
-        start_menu_paths = [
-            os.path.join(os.environ.get('PROGRAMDATA', 'C:\ProgramData'), 'Microsoft\Windows\Start Menu\Programs'),
-            os.path.join(os.environ.get('APPDATA', ''), 'Microsoft\Windows\Start Menu\Programs')
-        ]
-
-        for path in start_menu_paths:
-            if os.path.exists(path):
-                try:
-                    for root, dirs, files in os.walk(path):
-                        for file in files:
-                            if file.lower().endswith(('.lnk', '.url')) and query_lower in file.lower().replace('.lnk', '').replace('.url', ''):
-                                app_name = os.path.splitext(file)[0]
-                                app_path = os.path.join(root, file)
-                                item = QListWidgetItem(app_name)
-                                item.setIcon(QIcon("icons/search_icon.svg")) # 暂时使用通用图标, 后续可尝试提取快捷方式图标
-                                item.setData(Qt.UserRole, {"type": "app", "path": app_path})
-                                self.result_list.addItem(item)
-                except Exception as e:
-                    self.logger.error(f"搜索开始菜单 '{path}' 时出错: {e}")
-
-    def open_item(self, item):
+    def open_item(self, index):
         """双击打开选中的项目"""
-        item_data = item.data(Qt.UserRole)
+        item_data = index.data(Qt.UserRole)
         if item_data and 'path' in item_data:
             item_path = item_data['path']
             item_type = item_data.get('type', 'file') # 默认为文件
             self.logger.info(f"尝试打开 {item_type}: {item_path}")
             try:
-                os.startfile(item_path)
+                launch(item_path)
+                get_frecency_store().record_launch(item_path)
                 # self.close() # 打开后关闭搜索窗口 - Removed, closeEvent will handle signal
                 # Instead of closing directly, let the OS handle the focus shift.
                 # The window might close itself or the user might close it.
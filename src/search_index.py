@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 搜索索引模块
+为桌面项目和开始菜单快捷方式建立三元组(trigram)倒排索引，并持久化到磁盘
+"""
+
+import os
+import json
+import time
+import heapq
+import unicodedata
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from fuzzy_match import top_k, normalize_key, char_mask, DEFAULT_LIMIT, TYPE_RANK
+from pinyin import pinyin_keys
+from frecency import get_frecency_store
+from scanner import RootScan, scan_roots, DEFAULT_ROOT_BUDGET
+from search_query import parse_query, QueryError
+from pattern_search import compile_pattern
+from typo import TypoIndex
+from shortcut import ShortcutCache, get_shortcut_cache
+
+# 索引文件格式版本，格式变化时递增以丢弃旧缓存
+INDEX_VERSION = 4
+# 开始菜单中被索引的快捷方式扩展名
+SHORTCUT_EXTS = ('.lnk', '.url')
+# 增量查询最多保留的历史前缀数量
+MAX_QUERY_HISTORY = 32
+# 匹配结果少于该数量时启用容错搜索
+TYPO_MIN_RESULTS = 3
+# 每次容错搜索的时间预算(毫秒)
+TYPO_BUDGET_MS = 15
+
+
+def get_desktop_path():
+    """获取桌面路径 (优先从设置读取，否则使用默认路径)"""
+    return Settings.get_setting("desktop_path", "") or os.path.join(os.path.expanduser("~"), "Desktop")
+
+
+def get_start_menu_paths():
+    """获取公共和当前用户的开始菜单程序目录"""
+    return [
+        os.path.join(os.environ.get('PROGRAMDATA', 'C:\\ProgramData'), 'Microsoft', 'Windows', 'Start Menu', 'Programs'),
+        os.path.join(os.environ.get('APPDATA', ''), 'Microsoft', 'Windows', 'Start Menu', 'Programs')
+    ]
+
+
+def trigrams(text):
+    """返回字符串中所有不重复的三元组"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """搜索索引类，保存条目列表和三元组到条目编号的倒排表"""
+
+    def __init__(self, desktop_path=None, start_menu_paths=None, index_file=None, shortcut_cache=None):
+        self.desktop_path = desktop_path if desktop_path is not None else get_desktop_path()
+        self.start_menu_paths = start_menu_paths if start_menu_paths is not None else get_start_menu_paths()
+        self.index_file = index_file or Settings.get_config_path("search_index.json")
+        # 快捷方式解析缓存：只有索引默认的桌面和开始菜单时才使用 (并保存) 全局缓存，
+        # 其他根目录 (例如基准测试的合成目录) 使用只在内存中的缓存
+        if shortcut_cache is None:
+            default_roots = (self.desktop_path == get_desktop_path()
+                             and list(self.start_menu_paths) == get_start_menu_paths())
+            shortcut_cache = get_shortcut_cache() if default_roots else ShortcutCache(persistent=False)
+        self.shortcut_cache = shortcut_cache
+
+        # 条目按编号存放在并列的列表中
+        self.names = []
+        self.keys = []   # 规范化(NFKC + 大小写折叠)的匹配键，每个条目只计算一次
+        # 备用匹配键(拼音全拼/首字母): (用 \0 连接的全部键, [(键, 名称)])，不含汉字的条目为 None
+        # 连接后的键用于一次性排除不可能匹配的条目，只有通过时才逐个打分
+        self.alt_keys = []
+        self.paths = []
+        self.types = []  # app / folder / file
+        # 过滤用的列: 扩展名编号、大小(字节)、修改时间
+        self.ext_ids = []
+        self.sizes = []
+        self.mtimes = []
+        # 匹配键和拼音键中字符的掩码 (见 fuzzy_match.char_mask)，没有可复用的前缀结果时用来排除不可能匹配的条目
+        self.masks = []
+        # 扩展名表: 编号 -> 扩展名(小写，不带点)，以及反查字典
+        self.ext_names = []
+        self.ext_lookup = {}
+        # 三元组 -> 升序的条目编号列表
+        self.postings = {}
+        # 扫描过的目录 -> 修改时间，用于判断索引是否过期
+        self.dir_mtimes = {}
+        # 索引内容的修订号，每次重建或加载后递增，供增量查询判断缓存是否失效
+        self.revision = 0
+
+    @classmethod
+    def load_or_build(cls, **kwargs):
+        """优先从磁盘加载索引，缺失或过期时重新扫描并保存"""
+        index = cls(**kwargs)
+        if index.load() and not index.is_stale():
+            logger.info(f"从缓存加载搜索索引: {len(index.names)} 个条目")
+            return index
+        index.build()
+        index.save()
+        return index
+
+    def ext_id(self, ext):
+        """返回扩展名的编号，不存在时分配新编号"""
+        ext_id = self.ext_lookup.get(ext)
+        if ext_id is None:
+            ext_id = len(self.ext_names)
+            self.ext_names.append(ext)
+            self.ext_lookup[ext] = ext_id
+        return ext_id
+
+    def add_entry(self, name, key, path, item_type, size=0, mtime=0, alternatives=None, has_alternatives=False):
+        """
+        添加一个条目并更新倒排表和过滤列
+        拼音键在建索引时计算一次；从缓存加载时传入已保存的 alternatives，避免重复计算
+        """
+        entry_id = len(self.names)
+        self.names.append(name)
+        self.keys.append(key)
+        self.paths.append(path)
+        self.types.append(item_type)
+        if not has_alternatives:
+            alternatives = pinyin_keys(unicodedata.normalize('NFKC', name))
+        if alternatives:
+            alternatives = [tuple(pair) for pair in alternatives]
+            self.alt_keys.append(("\0".join(alt_key for alt_key, alt_name in alternatives), alternatives))
+        else:
+            self.alt_keys.append(None)
+        ext = "" if item_type == "folder" else os.path.splitext(path)[1][1:].lower()
+        self.ext_ids.append(self.ext_id(ext))
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        grams = trigrams(key)
+        chars = set(key)
+        if alternatives:
+            for alt_key, alt_name in alternatives:
+                grams |= trigrams(alt_key)
+                chars.update(alt_key)
+        self.masks.append(char_mask(chars))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(entry_id)
+
+    def clear(self):
+        """清空索引内容"""
+        self.names = []
+        self.keys = []
+        self.alt_keys = []
+        self.paths = []
+        self.types = []
+        self.ext_ids = []
+        self.sizes = []
+        self.mtimes = []
+        self.masks = []
+        self.ext_names = []
+        self.ext_lookup = {}
+        self.postings = {}
+        self.dir_mtimes = {}
+        self.revision += 1
+
+    def build(self):
+        """并行扫描桌面和开始菜单，重建索引"""
+        self.clear()
+
+        # 桌面只索引第一层的文件/文件夹，开始菜单递归索引快捷方式
+        desktop_scan = RootScan(self.desktop_path, recursive=False, include_dirs=True, with_stat=True)
+        start_menu_scans = [RootScan(path, extensions=SHORTCUT_EXTS, with_stat=True) for path in self.start_menu_paths]
+        scan_roots([desktop_scan] + start_menu_scans,
+                   root_budget=Settings.get_setting("scan_root_budget", DEFAULT_ROOT_BUDGET))
+
+        # 按根目录顺序合并结果，保证条目顺序稳定
+        for item_name, item_path, is_dir, size, mtime in desktop_scan.entries:
+            self.add_entry(item_name, normalize_key(item_name), item_path, "folder" if is_dir else "file", size, mtime)
+        # 批量解析快捷方式 (按修改时间缓存)，目标程序的文件名作为备用匹配键，例如输入 "chrome" 能找到 "Google Chrome"
+        shortcut_cache = self.shortcut_cache
+        for scan in start_menu_scans:
+            shortcuts = shortcut_cache.resolve_many([(file_path, mtime) for file, file_path, is_dir, size, mtime
+                                                     in scan.entries])
+            for file, file_path, is_dir, size, mtime in scan.entries:
+                app_name = os.path.splitext(file)[0]
+                key = normalize_key(app_name)
+                alternatives = pinyin_keys(unicodedata.normalize('NFKC', app_name)) or []
+                info = shortcuts.get(file_path)
+                if info and info.target and not info.url:
+                    target_name = os.path.splitext(os.path.basename(info.target.replace("\\", "/")))[0]
+                    target_key = normalize_key(target_name)
+                    if target_key and target_key != key:
+                        alternatives.append((target_key, target_name))
+                self.add_entry(app_name, key, file_path, "app", size, mtime, alternatives or None, True)
+        # 删除已被删除的快捷方式，缓存不会无限增长
+        shortcut_cache.prune(file_path for scan in start_menu_scans for file, file_path, is_dir, size, mtime
+                             in scan.entries)
+        shortcut_cache.save()
+
+        for scan in [desktop_scan] + start_menu_scans:
+            self.dir_mtimes.update(scan.dir_mtimes)
+            if scan.timed_out:
+                # 记录一个不可能的修改时间，下一轮搜索开始时会重新扫描该根目录
+                self.dir_mtimes[scan.path] = -1
+
+        logger.info(f"搜索索引已重建: {len(self.names)} 个条目, {len(self.postings)} 个三元组")
+
+    def is_stale(self):
+        """通过目录修改时间判断索引是否过期，只 stat 目录而不重新列举"""
+        if not self.dir_mtimes:
+            return True
+        for directory, mtime in self.dir_mtimes.items():
+            try:
+                if os.path.getmtime(directory) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def refresh_if_stale(self):
+        """索引过期时重建并保存，返回是否发生了重建"""
+        if not self.is_stale():
+            return False
+        self.build()
+        self.save()
+        return True
+
+    def load(self):
+        """从磁盘加载索引，成功返回 True"""
+        try:
+            if not os.path.exists(self.index_file):
+                return False
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return False
+            # 根目录配置变化时(例如修改了桌面路径)缓存不可用
+            if data.get("roots") != [self.desktop_path] + list(self.start_menu_paths):
+                return False
+            self.clear()
+            for name, key, path, item_type, size, mtime, alternatives in data["entries"]:
+                self.add_entry(name, key, path, item_type, size, mtime, alternatives, True)
+            self.dir_mtimes = data["dir_mtimes"]
+            return True
+        except Exception as e:
+            logger.error(f"加载搜索索引失败: {e}")
+            self.clear()
+            return False
+
+    def save(self):
+        """将索引保存到磁盘，倒排表在加载时由条目重建"""
+        data = {
+            "version": INDEX_VERSION,
+            "roots": [self.desktop_path] + list(self.start_menu_paths),
+            "dir_mtimes": self.dir_mtimes,
+            "entries": [list(entry) for entry in zip(self.names, self.keys, self.paths, self.types,
+                                                     self.sizes, self.mtimes,
+                                                     [alt and alt[1] for alt in self.alt_keys])]
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            logger.error(f"保存搜索索引失败: {e}")
+
+    def query(self, query):
+        """返回名称(或拼音)包含查询字符串的条目编号列表(按索引顺序)"""
+        query_lower = normalize_key(query)
+        if not query_lower:
+            return []
+
+        # 少于三个字符时无法使用三元组，直接扫描匹配键
+        if len(query_lower) < 3:
+            return [i for i in range(len(self.keys)) if self.contains(i, query_lower)]
+
+        # 三元组命中只是必要条件，最后用子串匹配确认
+        return [i for i in self.trigram_candidates(query_lower) if self.contains(i, query_lower)]
+
+    def trigram_candidates(self, text):
+        """返回匹配键或拼音键包含 text 的全部三元组的条目编号(升序)，text 至少三个字符"""
+        # 从最短的倒排表开始求交集
+        lists = []
+        for gram in trigrams(text):
+            posting = self.postings.get(gram)
+            if not posting:
+                return []
+            lists.append(posting)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for posting in lists[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return sorted(candidates)
+
+    def literal_candidates(self, literals):
+        """
+        返回匹配键包含全部字面量的条目编号，用于正则/通配符模式的预过滤
+        最长的字面量不少于三个字符时通过三元组倒排表查找，其余字面量逐个确认
+        """
+        literals = sorted({literal for literal in literals if literal}, key=len, reverse=True)
+        if not literals:
+            return range(len(self.keys))
+        keys = self.keys
+        if len(literals[0]) >= 3:
+            candidates = self.query(literals[0])
+        else:
+            candidates = range(len(keys))
+        return [i for i in candidates if all(literal in keys[i] for literal in literals)]
+
+    def contains(self, entry_id, text):
+        """判断条目的匹配键或拼音键是否包含 text"""
+        if text in self.keys[entry_id]:
+            return True
+        alternatives = self.alt_keys[entry_id]
+        return bool(alternatives) and any(text in alt_key for alt_key, alt_name in alternatives[1])
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """模糊匹配全部条目，返回按得分排序的前 limit 个条目编号"""
+        return top_k(query, range(len(self.keys)), self.keys, self.names, self.types, limit)
+
+
+class IncrementalSearch:
+    """
+    增量查询类，记住之前查询的匹配集合
+    新查询在旧查询末尾追加字符时，只需在旧的匹配集合中继续过滤；
+    删除字符回到之前的前缀时直接复用缓存，只有中间编辑或过滤条件变化才回退到全量索引
+    """
+
+    def __init__(self, index, frecency=None):
+        self.index = index
+        self.frecency = frecency if frecency is not None else get_frecency_store()
+        self.revision = index.revision
+        # [(过滤条件标识, 小写文本, 匹配的条目编号列表)]，同一过滤条件下每一项的文本都是后一项的前缀
+        self.history = []
+        # 容错搜索的删除字典，首次需要时建立，索引内容变化后重建
+        self.typo = TypoIndex(index)
+        self.typo_min_results = Settings.get_setting("typo_min_results", TYPO_MIN_RESULTS)
+        self.typo_budget = Settings.get_setting("typo_budget_ms", TYPO_BUDGET_MS) / 1000
+
+    def prepare(self):
+        """提前建立容错索引，避免第一次容错搜索时建立索引超出时间预算"""
+        if self.typo_min_results > 0:
+            self.typo.ensure_built()
+
+    def reset(self):
+        """清空缓存的匹配集合"""
+        self.history = []
+        self.revision = self.index.revision
+
+    def mask_candidates(self, text, candidates=None):
+        """
+        用字符掩码排除不可能匹配 text 的条目，返回剩下的条目编号 (保持原顺序)
+        candidates 为 None 时筛选全部条目；结果包含所有连续子串匹配和不连续的模糊匹配，
+        打分后的匹配集合是完整的，可以写入历史供后续输入继续过滤
+        """
+        query_mask = char_mask(text)
+        masks = self.index.masks
+        if candidates is None:
+            return [i for i, mask in enumerate(masks) if mask & query_mask == query_mask]
+        return [i for i in candidates if masks[i] & query_mask == query_mask]
+
+    def candidates_for(self, filter_key, text):
+        """返回需要打分的候选集合，以及它是否就是该查询的完整匹配集合"""
+        if self.revision != self.index.revision:
+            self.reset()
+        # 丢弃过滤条件不同或不再是当前文本前缀的历史
+        while self.history and (self.history[-1][0] != filter_key or not text.startswith(self.history[-1][1])):
+            self.history.pop()
+        if not self.history:
+            return None, False
+        previous_filter, previous_text, matched = self.history[-1]
+        return matched, previous_text == text
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """返回按得分排序的前 limit 个条目编号，并缓存完整匹配集合"""
+        if not query.strip() or limit <= 0:
+            return []
+        index = self.index
+        # 时间按分钟取整，保证连续输入时 modified: 过滤条件保持不变，可以复用匹配集合
+        parsed = parse_query(query, now=time.time() // 60 * 60)
+        try:
+            pattern = compile_pattern(parsed)
+        except QueryError as e:
+            # 正则输入到一半时经常无效，此时不返回结果
+            logger.debug(f"忽略查询 '{query}': {e}")
+            return []
+        if pattern is not None:
+            return self.pattern_search(pattern, parsed, limit)
+        text = normalize_key(parsed.text)
+        filter_key = parsed.filter_key
+        candidates, exact = self.candidates_for(filter_key, text)
+        if candidates is None:
+            # 没有可复用的集合时，先用字符掩码和过滤列缩小全量候选
+            candidates = self.mask_candidates(text) if text else range(len(index.keys))
+            predicate = parsed.compile(index)
+            if predicate is not None:
+                candidates = [i for i in candidates if predicate(i)]
+        elif text and not exact:
+            # 在上一次的匹配集合中继续过滤，新输入的字符先用掩码排除
+            candidates = self.mask_candidates(text, candidates)
+
+        if not text:
+            # 只有过滤条件时按修改时间从新到旧排列
+            matched = list(candidates)
+            result = heapq.nlargest(limit, matched, key=index.mtimes.__getitem__)
+        else:
+            matched = None if exact else []
+            # 常用度加分：每次查询生成一次加分字典，每个匹配条目只需一次字典查找
+            bonuses = self.frecency.bonus_snapshot()
+            paths = index.paths
+            bonus = (lambda i: bonuses.get(paths[i], 0)) if bonuses else None
+            result = top_k(text, candidates, index.keys, index.names, index.types, limit, matched, bonus,
+                           index.alt_keys)
+        if not exact:
+            self.history.append((filter_key, text, matched))
+            if len(self.history) > MAX_QUERY_HISTORY:
+                del self.history[0]
+        if text and len(result) < min(self.typo_min_results, limit):
+            result = result + self.typo_search(text, parsed, result, limit)
+        return result
+
+    def pattern_search(self, pattern, parsed, limit):
+        """
+        正则/通配符模式：先用必需的字面量通过索引缩小候选，只对剩下的条目执行正则
+        结果按常用度、类型和名称长度排序
+        """
+        index = self.index
+        candidates = index.literal_candidates(pattern.literals)
+        predicate = parsed.compile(index)
+        keys = index.keys
+        match = pattern.match
+        matched = [i for i in candidates if match(keys[i]) and (predicate is None or predicate(i))]
+        bonuses = self.frecency.bonus_snapshot()
+        paths = index.paths
+        types = index.types
+        return heapq.nsmallest(limit, matched, key=lambda i: (-bonuses.get(paths[i], 0),
+                                                              -TYPE_RANK.get(types[i], 0), len(keys[i]), i))
+
+    def typo_search(self, text, parsed, found, limit):
+        """
+        精确和模糊匹配结果太少时按编辑距离查找，例如 "chorme" -> "Chrome"
+        在固定时间预算内返回，追加在正常结果之后
+        """
+        deadline = time.perf_counter() + self.typo_budget
+        predicate = parsed.compile(self.index)
+        found = set(found)
+        entry_ids = self.typo.search(text, limit, deadline, predicate)
+        return [i for i in entry_ids if i not in found][:limit - len(found)]
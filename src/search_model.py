@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 搜索结果模型模块
+用紧凑的列表保存搜索结果，供 QListView 按需读取可见行
+"""
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QIcon
+
+# 搜索结果使用的通用图标路径
+SEARCH_ICON_PATH = "icons/search_icon.svg"
+
+
+class SearchResultModel(QAbstractListModel):
+    """搜索结果列表模型，只在视图请求时为可见行提供数据"""
+
+    _shared_icon = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 并列数组保存结果，避免为每一行创建 Qt 对象
+        self.names = []
+        self.types = []
+        self.paths = []
+
+    @classmethod
+    def shared_icon(cls):
+        """所有行共用一个图标，SVG 只解析一次"""
+        if cls._shared_icon is None:
+            cls._shared_icon = QIcon(SEARCH_ICON_PATH)
+        return cls._shared_icon
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.names[row]
+        if role == Qt.DecorationRole:
+            return self.shared_icon()
+        if role == Qt.ToolTipRole:
+            return self.paths[row]
+        if role == Qt.UserRole:
+            return {"type": self.types[row], "path": self.paths[row]} # 存储类型和完整路径
+        return None
+
+    def clear(self):
+        """清空所有结果"""
+        if not self.names:
+            return
+        self.beginResetModel()
+        self.names = []
+        self.types = []
+        self.paths = []
+        self.endResetModel()
+
+    def append_results(self, batch):
+        """追加一批 (名称, 类型, 路径) 结果"""
+        if not batch:
+            return
+        first = len(self.names)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for name, item_type, path in batch:
+            self.names.append(name)
+            self.types.append(item_type)
+            self.paths.append(path)
+        self.endInsertRows()
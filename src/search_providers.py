@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 搜索来源模块
+每个搜索来源实现为一个 provider，并声明自己的时间预算；搜索线程并发运行所有来源，
+结果按到达顺序合并，慢的来源不会拖慢快的来源
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from search_index import IncrementalSearch
+from search_query import QueryError
+from pattern_search import is_glob
+from volume_index import VolumeIndex
+from content_search import ContentSearch
+from fuzzy_match import normalize_key
+from tag_store import TAG_FILTERS, tagged_paths
+
+
+class SearchProvider(ABC):
+    """
+    搜索来源基类
+    search() 在线程池中运行，通过 emit([(名称, 类型, 路径), ...]) 随时发送结果，
+    并应经常检查 cancelled()：查询过期或超出 budget 秒后返回 True，之后发送的结果会被丢弃
+    结果默认按路径去重；同一路径可以有多条结果的来源把 dedupe_paths 设为 False
+    """
+
+    name = "provider"
+    budget = 1.0
+    dedupe_paths = True
+
+    def accepts(self, parsed):
+        """是否处理该查询"""
+        return True
+
+    def refresh(self):
+        """新一轮搜索开始前调用 (在搜索线程中)，可以在这里检查数据是否过期"""
+
+    @abstractmethod
+    def search(self, query, parsed, limit, emit, cancelled):
+        """执行查询，用 emit() 发送结果"""
+
+    def close(self):
+        """搜索线程停止时调用"""
+
+
+class IndexProvider(SearchProvider):
+    """桌面和开始菜单索引"""
+
+    name = "index"
+    budget = 0.5
+
+    def __init__(self, index):
+        self.index = index
+        # 增量查询会话，连续输入时只过滤上一次的匹配集合；会话不是线程安全的，用锁保护
+        self.session = IncrementalSearch(index)
+        self.session.prepare()
+        self.lock = threading.Lock()
+
+    def accepts(self, parsed):
+        return parsed.content is None
+
+    def refresh(self):
+        with self.lock:
+            if self.index.refresh_if_stale():
+                self.session.prepare()
+
+    def search(self, query, parsed, limit, emit, cancelled):
+        index = self.index
+        with self.lock:
+            entry_ids = self.session.search(query, limit)
+        emit([(index.names[i], index.types[i], index.paths[i]) for i in entry_ids])
+
+
+class VolumeProvider(SearchProvider):
+    """
+    可选的全盘文件索引，在单独的线程中加载，加载完成前不返回结果
+    带过滤词或正则/通配符的查询只搜索桌面和开始菜单
+    """
+
+    name = "volume"
+    budget = 0.5
+
+    def __init__(self, index):
+        self.volume = None
+        self.loader = VolumeIndex()
+        threading.Thread(target=self.load, name="volume-index", daemon=True).start()
+
+    def load(self):
+        """在后台线程中加载或建立全盘文件索引"""
+        try:
+            self.volume = self.loader.load_or_build()
+        except Exception as e:
+            logger.error(f"初始化全盘文件索引失败: {e}")
+
+    def accepts(self, parsed):
+        return (self.volume is not None and parsed.content is None and parsed.regex is None
+                and not parsed.has_filters and bool(parsed.text.strip()) and not is_glob(parsed.text))
+
+    def search(self, query, parsed, limit, emit, cancelled):
+        volume = self.volume
+        emit([(volume.name(entry_id), "folder" if volume.is_dir(entry_id) else "file", volume.path(entry_id))
+              for entry_id in volume.query(parsed.text, limit)])
+
+    def close(self):
+        self.loader.cancel()
+
+
+class ContentProvider(SearchProvider):
+    """
+    content: 查询：扫描文件内容，每个文件扫描完成后立即发送它的匹配行
+    其余文本和 ext: 过滤词用于限定文件名
+    """
+
+    name = "content"
+    budget = 30.0
+    # 每个文件最多 MAX_MATCHES_PER_FILE 个匹配行，每行一条结果
+    dedupe_paths = False
+
+    def __init__(self, index):
+        self.content = None  # 第一次使用 content: 时创建
+        # 不同代号的查询会在多个来源线程中同时运行，用锁保证只创建一个实例 (每个实例有自己的线程池和进程池)
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def accepts(self, parsed):
+        return parsed.content is not None
+
+    def search(self, query, parsed, limit, emit, cancelled):
+        with self.lock:
+            if self.closed:
+                return
+            if self.content is None:
+                self.content = ContentSearch()
+            content = self.content
+        name_text = normalize_key(parsed.text)
+        exts = parsed.exts
+
+        def name_filter(path):
+            name = os.path.basename(path)
+            if name_text and name_text not in normalize_key(name):
+                return False
+            return exts is None or os.path.splitext(name)[1][1:].lower() in exts
+
+        def on_matches(path, matches):
+            name = os.path.basename(path)
+            emit([(f"{name}:{line}  {preview}", "file", path) for line, preview in matches])
+
+        try:
+            content.search(parsed.content, parsed.content_regex, limit, on_matches, cancelled, name_filter)
+        except QueryError as e:
+            logger.debug(f"忽略内容查询 '{parsed.content}': {e}")
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            content = self.content
+        if content is not None:
+            content.shutdown()
+
+
+class TagProvider(SearchProvider):
+    """
+    tag:/meta: 查询：直接从标签数据库取出带标签的文件，包括不在桌面和开始菜单索引中的文件
+    其余文本和 ext: 过滤词用于限定文件名
+    """
+
+    name = "tags"
+    budget = 0.5
+
+    def __init__(self, index):
+        pass
+
+    def accepts(self, parsed):
+        return parsed.content is None and any(name in TAG_FILTERS for name, value in parsed.extra_filters)
+
+    def search(self, query, parsed, limit, emit, cancelled):
+        paths = None
+        for name, value in parsed.extra_filters:
+            if name not in TAG_FILTERS:
+                continue
+            # 多个 tag:/meta: 过滤词之间是"与"的关系
+            matched = {os.path.normcase(path): (path, is_dir) for path, is_dir in tagged_paths(name, value)}
+            paths = matched if paths is None else {key: path for key, path in paths.items() if key in matched}
+        words = normalize_key(parsed.text).split()
+        exts = parsed.exts
+        results = []
+        # 是否目录在写入标签时记录，查询时不访问文件系统 (网络路径离线时也不会卡住)
+        for path, is_dir in sorted((paths or {}).values()):
+            if cancelled() or len(results) >= limit:
+                break
+            name = os.path.basename(path)
+            key = normalize_key(name)
+            if not all(word in key for word in words):
+                continue
+            if exts is not None and os.path.splitext(name)[1][1:].lower() not in exts:
+                continue
+            results.append((name, "folder" if is_dir else "file", path))
+        emit(results)
+
+
+# 已注册的搜索来源：[(创建函数(index) -> SearchProvider, 是否启用的设置项)]
+PROVIDER_FACTORIES = []
+
+
+def register_provider(factory, setting=None):
+    """注册搜索来源，setting 不为空时只有该设置为 True 才启用"""
+    PROVIDER_FACTORIES.append((factory, setting))
+
+
+def create_providers(index):
+    """创建所有启用的搜索来源，预算可以用设置 search_budget_<名称> 覆盖"""
+    providers = []
+    for factory, setting in PROVIDER_FACTORIES:
+        if setting and not Settings.get_setting(setting, False):
+            continue
+        try:
+            provider = factory(index)
+        except Exception as e:
+            logger.error(f"创建搜索来源 {factory} 失败: {e}")
+            continue
+        provider.budget = Settings.get_setting(f"search_budget_{provider.name}", provider.budget)
+        providers.append(provider)
+    return providers
+
+
+register_provider(IndexProvider)
+register_provider(VolumeProvider, "volume_index_enabled")
+register_provider(ContentProvider)
+register_provider(TagProvider)
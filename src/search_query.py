@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 搜索查询语法模块
+解析 ext:、kind:、size:、modified:、under:、re:、content: 等过滤词，并编译为直接读取索引列的判断函数
+"""
+
+import os
+import re
+import time
+import fnmatch
+from log import get_logger
+
+logger = get_logger()
+from fuzzy_match import normalize_key
+
+# kind: 可用的类别，类别名 -> 扩展名集合 (app/folder/file 按条目类型判断)
+KIND_EXTENSIONS = {
+    "doc": {"txt", "md", "pdf", "doc", "docx", "xls", "xlsx", "ppt", "pptx", "odt", "ods", "odp", "rtf", "csv"},
+    "image": {"png", "jpg", "jpeg", "gif", "bmp", "webp", "svg", "ico", "tif", "tiff"},
+    "video": {"mp4", "mkv", "avi", "mov", "wmv", "flv", "webm"},
+    "audio": {"mp3", "wav", "flac", "aac", "ogg", "m4a", "wma"},
+    "archive": {"zip", "rar", "7z", "tar", "gz", "bz2", "xz", "iso"},
+    "exe": {"exe", "msi", "bat", "cmd", "ps1", "com"},
+}
+# kind: 的中文及常用别名
+KIND_ALIASES = {
+    "应用": "app", "程序": "app", "application": "app",
+    "文件夹": "folder", "目录": "folder", "dir": "folder",
+    "文件": "file",
+    "文档": "doc", "document": "doc",
+    "图片": "image", "img": "image", "picture": "image",
+    "视频": "video",
+    "音乐": "audio", "音频": "audio", "music": "audio",
+    "压缩包": "archive",
+    "可执行文件": "exe",
+}
+
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2,
+              "g": 1024 ** 3, "gb": 1024 ** 3, "t": 1024 ** 4, "tb": 1024 ** 4}
+AGE_UNITS = {"s": 1, "min": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+
+COMPARE_PATTERN = re.compile(r'^(<=|>=|<|>|=)?(.+)$')
+SIZE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([a-z]*)$')
+AGE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([a-z]+)$')
+
+
+class QueryError(ValueError):
+    """过滤词格式错误"""
+
+
+def parse_size(text):
+    """把 100MB、1.5g、4096 等转换为字节数"""
+    match = SIZE_PATTERN.match(text.lower())
+    if not match or match.group(2) not in SIZE_UNITS:
+        raise QueryError(f"无法识别的大小: {text}")
+    return float(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def parse_time(text, now):
+    """
+    把 7d、12h 等转换为时间戳 (now 减去该时长)，或把 2024-01-01 转换为当天零点
+    返回 (时间戳, 是否为时长)
+    """
+    match = AGE_PATTERN.match(text.lower())
+    if match and match.group(2) in AGE_UNITS:
+        return now - float(match.group(1)) * AGE_UNITS[match.group(2)], True
+    try:
+        return time.mktime(time.strptime(text, "%Y-%m-%d")), False
+    except ValueError:
+        raise QueryError(f"无法识别的时间: {text}")
+
+
+def split_tokens(query):
+    """
+    按空白拆分查询，双引号内的空白不拆分，例如 under:"C:\\Program Files" 是一个词
+    未闭合的引号 (输入到一半) 一直延续到查询末尾
+    """
+    tokens = []
+    current = []
+    in_quote = False
+    for ch in query:
+        if ch == '"':
+            in_quote = not in_quote
+            current.append(ch)
+        elif ch.isspace() and not in_quote:
+            if current:
+                tokens.append("".join(current))
+                current = []
+        else:
+            current.append(ch)
+    if current:
+        tokens.append("".join(current))
+    return tokens
+
+
+def unquote(value):
+    """去掉过滤值两端的双引号"""
+    if value.startswith('"'):
+        value = value[1:]
+        if value.endswith('"'):
+            value = value[:-1]
+    return value
+
+
+def normalize_dir(path):
+    """统一目录写法并以分隔符结尾，用于判断路径是否位于目录之下"""
+    path = os.path.normcase(os.path.normpath(path))
+    return path if path.endswith(os.sep) else path + os.sep
+
+
+def path_under(path, directories):
+    """判断路径是否位于任一目录之下 (directories 已经过 normalize_dir 处理)"""
+    path = os.path.normcase(path)
+    return any(path.startswith(directory) for directory in directories)
+
+
+def split_compare(value):
+    """拆分比较运算符和值，例如 '>100MB' -> ('>', '100MB')"""
+    match = COMPARE_PATTERN.match(value)
+    return match.group(1) or "", match.group(2)
+
+
+def compare(op, left, right):
+    """按运算符比较，空运算符视为 >= (用于 size:100MB 这种写法)"""
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    if op == "=":
+        return left == right
+    return left >= right
+
+
+class ParsedQuery:
+    """解析后的查询：自由文本 + 过滤条件"""
+
+    def __init__(self, text, exts=None, kinds=None, size_filters=None, time_filters=None, extra_filters=None,
+                 regex=None, content=None, content_regex=False, under=None):
+        self.text = text
+        self.exts = exts                      # 扩展名集合或 None
+        self.kinds = kinds                    # 类别集合或 None
+        self.size_filters = size_filters or []  # [(运算符, 字节数)]
+        self.time_filters = time_filters or []  # [(运算符, 时间戳)]，作用于修改时间
+        # 其他模块注册的过滤条件: [(名称, 值)]
+        self.extra_filters = extra_filters or []
+        self.regex = regex                    # re: 后的正则表达式或 None
+        self.content = content                # content: 后要在文件内容中查找的文本或 None
+        self.content_regex = content_regex    # content:re: 表示按正则查找内容
+        self.under = under or []              # under: 限定的目录列表 (已规范化)
+
+    @property
+    def has_filters(self):
+        return bool(self.exts or self.kinds or self.size_filters or self.time_filters or self.extra_filters
+                    or self.under)
+
+    @property
+    def filter_key(self):
+        """过滤条件的标识，过滤条件相同的查询才能复用增量匹配集合"""
+        return (tuple(sorted(self.exts or ())), tuple(sorted(self.kinds or ())),
+                tuple(self.size_filters), tuple(self.time_filters), tuple(self.extra_filters), tuple(self.under))
+
+    def compile(self, index):
+        """编译为 predicate(条目编号) -> bool，只读取索引中预先计算好的列"""
+        checks = []
+        if self.exts is not None:
+            ext_ids = {index.ext_lookup[ext] for ext in self.exts if ext in index.ext_lookup}
+            column = index.ext_ids
+            checks.append(lambda i: column[i] in ext_ids)
+        if self.kinds is not None:
+            checks.append(self._compile_kinds(index))
+        for op, size in self.size_filters:
+            column = index.sizes
+            checks.append(lambda i, op=op, size=size: compare(op, column[i], size))
+        for op, timestamp in self.time_filters:
+            column = index.mtimes
+            checks.append(lambda i, op=op, timestamp=timestamp: compare(op, column[i], timestamp))
+        if self.under:
+            column = index.paths
+            directories = tuple(self.under)
+            checks.append(lambda i: path_under(column[i], directories))
+        for name, value in self.extra_filters:
+            handler = EXTRA_FILTERS.get(name)
+            if handler:
+                checks.append(handler(index, value))
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        return lambda i: all(check(i) for check in checks)
+
+    def match_file(self, name, path, is_dir, size, mtime):
+        """
+        判断单个文件是否满足查询，供不经过索引的场景 (如虚拟文件夹) 使用
+        自由文本按词做子串匹配；其他模块注册的过滤词 (tag:/meta:) 和 content: 这里不处理，
+        使用方需要先拒绝这类查询 (见 saved_search.validate_query)
+        """
+        ext = "" if is_dir else os.path.splitext(name)[1][1:].lower()
+        if self.exts is not None and ext not in self.exts:
+            return False
+        if self.kinds is not None:
+            item_type = "folder" if is_dir else ("app" if ext in ("lnk", "url") else "file")
+            if item_type not in self.kinds and not any(ext in KIND_EXTENSIONS.get(kind, ()) for kind in self.kinds):
+                return False
+        size = 0 if is_dir else size
+        if not all(compare(op, size, value) for op, value in self.size_filters):
+            return False
+        if not all(compare(op, mtime, value) for op, value in self.time_filters):
+            return False
+        if self.under and not path_under(path, self.under):
+            return False
+        key = normalize_key(name)
+        if self.regex is not None:
+            try:
+                if not re.search(self.regex, key, re.IGNORECASE):
+                    return False
+            except re.error:
+                return False
+        if '*' in self.text or '?' in self.text:
+            return fnmatch.fnmatchcase(key, normalize_key(self.text))
+        return all(word in key for word in normalize_key(self.text).split())
+
+    def _compile_kinds(self, index):
+        types = index.types
+        ext_column = index.ext_ids
+        wanted_types = {kind for kind in self.kinds if kind in ("app", "folder", "file")}
+        ext_ids = set()
+        for kind in self.kinds:
+            for ext in KIND_EXTENSIONS.get(kind, ()):
+                if ext in index.ext_lookup:
+                    ext_ids.add(index.ext_lookup[ext])
+        return lambda i: types[i] in wanted_types or ext_column[i] in ext_ids
+
+
+# 其他模块注册的过滤词：名称 -> 编译函数(index, 值) -> predicate
+EXTRA_FILTERS = {}
+
+
+def register_filter(name, compile_filter):
+    """注册额外的过滤词，例如 tag:"""
+    EXTRA_FILTERS[name] = compile_filter
+
+
+def parse_query(query, now=None):
+    """
+    解析查询字符串，例如 "report ext:pdf,docx size:>1MB modified:<7d"
+    无法识别的过滤词按普通文本处理，保证不会因为输入到一半而报错
+    """
+    if now is None:
+        now = time.time()
+    text_parts = []
+    exts = None
+    kinds = None
+    size_filters = []
+    time_filters = []
+    extra_filters = []
+    regex = None
+    content = None
+    content_regex = False
+    under = []
+    for token in split_tokens(query):
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        value = unquote(value)
+        if not sep or not value:
+            text_parts.append(token)
+            continue
+        try:
+            if key == "re":
+                # 正则区分大小写的写法原样保留，匹配时忽略大小写
+                regex = value
+            elif key == "under":
+                under.append(normalize_dir(value))
+            elif key == "content":
+                content_regex = value.lower().startswith("re:")
+                content = value[3:] if content_regex else value
+            elif key == "ext":
+                exts = (exts or set()) | {ext.lstrip(".").lower() for ext in value.split(",") if ext}
+            elif key == "kind":
+                kinds = (kinds or set()) | {KIND_ALIASES.get(kind.lower(), kind.lower())
+                                            for kind in value.split(",") if kind}
+            elif key == "size":
+                op, amount = split_compare(value)
+                size_filters.append((op, parse_size(amount)))
+            elif key == "modified":
+                op, amount = split_compare(value)
+                timestamp, is_age = parse_time(amount, now)
+                # 时长表示"距今"：modified:<7d 是 7 天内修改过，即修改时间 > now-7d
+                if is_age:
+                    op = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "": ">="}.get(op, op)
+                    time_filters.append((op, timestamp))
+                elif op == "=":
+                    # 日期精确匹配表示当天
+                    time_filters.append((">=", timestamp))
+                    time_filters.append(("<", timestamp + 86400))
+                else:
+                    time_filters.append((op or ">=", timestamp))
+            elif key in EXTRA_FILTERS:
+                extra_filters.append((key, value))
+            else:
+                text_parts.append(token)
+        except QueryError as e:
+            logger.debug(f"忽略过滤词 '{token}': {e}")
+            text_parts.append(token)
+    return ParsedQuery(" ".join(text_parts), exts, kinds, size_filters, time_filters, extra_filters, regex,
+                       content or None, content_regex, under)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 搜索工作线程模块
+在后台线程中执行搜索，通过代号(generation)丢弃过期查询，并分批发送结果
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from search_index import SearchIndex
+from search_query import parse_query
+from search_providers import create_providers
+from fuzzy_match import DEFAULT_LIMIT
+
+# 每批发送给界面的结果数量
+BATCH_SIZE = 100
+# 同时运行的搜索来源数量上限
+MAX_PROVIDER_WORKERS = 4
+
+
+class SearchWorker(QThread):
+    """搜索工作线程，始终只处理最新提交的查询"""
+
+    # (代号, [(名称, 类型, 路径), ...])
+    results_ready = pyqtSignal(int, list)
+    # (代号, 结果总数)
+    search_finished = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, index=None, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self._condition = threading.Condition()
+        self._pending = None       # 等待处理的 (代号, 查询)
+        self._generation = 0       # 最新提交的代号
+        self._stopped = False
+        self.limit = Settings.get_setting("search_result_limit", DEFAULT_LIMIT)
+        self.providers = []
+        self.executor = ThreadPoolExecutor(max_workers=MAX_PROVIDER_WORKERS, thread_name_prefix="search-provider")
+
+    def submit(self, generation, query):
+        """提交新查询，旧的未完成查询会在下一个检查点被取消"""
+        with self._condition:
+            self._generation = generation
+            self._pending = (generation, query)
+            self._condition.notify()
+
+    def is_current(self, generation):
+        """判断代号是否仍是最新查询"""
+        return generation == self._generation and not self._stopped
+
+    def stop(self):
+        """停止线程并等待退出"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.wait()
+        for provider in self.providers:
+            provider.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        # 索引的加载/扫描也放在后台线程，避免阻塞界面启动
+        if self.index is None:
+            try:
+                self.index = SearchIndex.load_or_build()
+            except Exception as e:
+                logger.error(f"初始化搜索索引失败: {e}")
+                self.error.emit(str(e))
+                return
+        self.providers = create_providers(self.index)
+
+        last_query = ""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, query = self._pending
+                self._pending = None
+
+            try:
+                # 新一轮搜索开始时检查各来源的数据是否过期
+                if not last_query:
+                    for provider in self.providers:
+                        provider.refresh()
+                last_query = query
+                self.search(generation, query)
+            except Exception as e:
+                logger.error(f"搜索 '{query}' 时出错: {e}")
+                self.error.emit(str(e))
+
+    def search(self, generation, query):
+        """
+        并发运行所有接受该查询的来源，结果一到达就去重并分批发送
+        每个来源超出自己的时间预算后不再等待；有新查询提交时立即返回
+        """
+        if not query or not self.is_current(generation):
+            return
+        parsed = parse_query(query)
+        providers = [provider for provider in self.providers if provider.accepts(parsed)]
+        start = time.monotonic()
+        lock = threading.Lock()
+        # 按路径去重，同一文件来自多个来源时只显示一次；
+        # dedupe_paths 为 False 的来源 (内容搜索每个匹配行一条结果) 按 (路径, 显示文本) 去重
+        seen = set()
+        # reserved 按 limit 预留名额，total 只统计实际发送到界面的行
+        state = {"reserved": 0, "total": 0}
+
+        def run_provider(provider):
+            deadline = start + provider.budget
+
+            def cancelled():
+                return not self.is_current(generation) or time.monotonic() > deadline
+
+            def emit(batch):
+                if cancelled():
+                    return
+                with lock:
+                    fresh = []
+                    for item in batch:
+                        key = os.path.normcase(item[2])
+                        if not provider.dedupe_paths:
+                            key = (key, item[0])
+                        if key in seen or state["reserved"] >= self.limit:
+                            continue
+                        seen.add(key)
+                        fresh.append(item)
+                    state["reserved"] += len(fresh)
+                for offset in range(0, len(fresh), BATCH_SIZE):
+                    if not self.is_current(generation):
+                        return
+                    chunk = fresh[offset:offset + BATCH_SIZE]
+                    self.results_ready.emit(generation, chunk)
+                    with lock:
+                        state["total"] += len(chunk)
+
+            try:
+                provider.search(query, parsed, self.limit, emit, cancelled)
+            except Exception as e:
+                logger.error(f"搜索来源 {provider.name} 查询 '{query}' 时出错: {e}")
+
+        def notify(future):
+            with self._condition:
+                self._condition.notify()
+
+        futures = {}
+        for provider in providers:
+            future = self.executor.submit(run_provider, provider)
+            futures[future] = (provider, start + provider.budget)
+            future.add_done_callback(notify)
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                waiting = [deadline for future, (provider, deadline) in futures.items()
+                           if not future.done() and deadline > now]
+                if not waiting or self._pending is not None or self._stopped:
+                    break
+                self._condition.wait(timeout=min(waiting) - now)
+        if not self.is_current(generation):
+            logger.debug(f"取消过期查询: {query}")
+            return
+        for future, (provider, deadline) in futures.items():
+            if not future.done():
+                logger.debug(f"搜索来源 {provider.name} 查询 '{query}' 超出时间预算 {provider.budget} 秒")
+        with lock:
+            total = state["total"]
+        self.search_finished.emit(generation, total)
@@ -37,7 +37,7 @@ class Settings(QWidget):
             self.settings_file = os.path.join(sys._MEIPASS, "Config", "Config.json")
         else:
             # 如果是未打包的.py文件
-            self.settings_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Config", "Config.json")
+            self.settings_file = Settings.get_config_path("Config.json")
         
         # 加载设置
         self.load_settings()
@@ -160,6 +160,34 @@ class Settings(QWidget):
         desktop_path_layout.addWidget(self.desktop_path_edit)
         
         system_layout_group.addWidget(desktop_path_group)
+        
+        # 添加全盘文件索引设置
+        volume_index_group = QGroupBox("全盘文件索引")
+        volume_index_group.setStyleSheet(
+            "QGroupBox {border: 1px solid #3F3F46; border-radius: 5px; margin-top: 10px; padding-top: 10px;}"
+            "QGroupBox::title {subcontrol-origin: margin; subcontrol-position: top center; padding: 0 5px;}"
+        )
+        volume_index_layout = QVBoxLayout(volume_index_group)
+        
+        self.volume_index_checkbox = QCheckBox("搜索时包含整个磁盘或指定目录中的文件")
+        self.volume_index_checkbox.setChecked(self.settings.get("volume_index_enabled", False))
+        self.volume_index_checkbox.setStyleSheet(
+            "QCheckBox {padding: 5px;}"
+            "QCheckBox::indicator {width: 15px; height: 15px;}"
+            "QCheckBox::indicator:unchecked {background-color: #3E3E42; border: 1px solid #555555;}"
+            "QCheckBox::indicator:checked {background-color: #0078D7; border: 1px solid #0078D7;}"
+        )
+        volume_index_layout.addWidget(self.volume_index_checkbox)
+        
+        self.volume_index_roots_edit = QLineEdit()
+        self.volume_index_roots_edit.setPlaceholderText("索引目录，多个目录用分号分隔；留空则索引所有本地磁盘")
+        self.volume_index_roots_edit.setText(self.settings.get("volume_index_roots", ""))
+        self.volume_index_roots_edit.setStyleSheet(
+            "QLineEdit {background-color: #3E3E42; color: white; border: 1px solid #555555; padding: 5px;}"
+        )
+        volume_index_layout.addWidget(self.volume_index_roots_edit)
+        
+        system_layout_group.addWidget(volume_index_group)
 
                 # 添加系统设置组到布局
         system_layout.addWidget(system_group)
@@ -274,6 +302,8 @@ class Settings(QWidget):
             self.settings["auto_hide_taskbar"] = self.auto_hide_taskbar_checkbox.isChecked()
             self.settings["disable_system_explorer"] = self.disable_system_explorer_checkbox.isChecked()
             self.settings["desktop_path"] = self.desktop_path_edit.text()
+            self.settings["volume_index_enabled"] = self.volume_index_checkbox.isChecked()
+            self.settings["volume_index_roots"] = self.volume_index_roots_edit.text()
             
             # 确保配置文件目录存在
             os.makedirs(os.path.dirname(self.settings_file), exist_ok=True)
@@ -291,10 +321,20 @@ class Settings(QWidget):
             self.logger.error(f"保存设置时出错: {str(e)}")
             QMessageBox.warning(self, "保存失败", f"保存设置时出错: {str(e)}")
     
+    @staticmethod
+    def get_config_path(*parts):
+        """
+        获取配置目录(Config)下的文件路径，用于存放索引等缓存文件
+        环境变量 BETTEREXPLORER_CONFIG_DIR 可以指定其他目录 (例如基准测试使用临时目录)
+        """
+        config_dir = (os.environ.get("BETTEREXPLORER_CONFIG_DIR")
+                      or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Config"))
+        return os.path.join(config_dir, *parts)
+
     @staticmethod
     def get_setting(key, default=None):
         """获取设置值"""
-        settings_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Config", "Config.json")
+        settings_file = Settings.get_config_path("Config.json")
         try:
             if os.path.exists(settings_file):
                 with open(settings_file, 'r', encoding='utf-8') as f:
@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 快捷方式解析模块
+纯 Python 解析 .lnk (MS-SHLLINK 二进制格式) 和 .url (INI 格式) 文件，不依赖 COM 和 pywin32，
+可以整个文件夹批量解析，结果按 (路径, 修改时间) 缓存
+"""
+
+import os
+import json
+import locale
+import struct
+import threading
+import configparser
+from collections import namedtuple
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+
+SHORTCUT_CACHE_VERSION = 1
+
+# ShellLinkHeader 的大小和 LinkCLSID {00021401-0000-0000-C000-000000000046}
+LINK_HEADER_SIZE = 0x4C
+LINK_CLSID = bytes.fromhex("0114020000000000c000000000000046")
+
+# LinkFlags
+HAS_LINK_TARGET_ID_LIST = 0x00000001
+HAS_LINK_INFO = 0x00000002
+HAS_NAME = 0x00000004
+HAS_RELATIVE_PATH = 0x00000008
+HAS_WORKING_DIR = 0x00000010
+HAS_ARGUMENTS = 0x00000020
+HAS_ICON_LOCATION = 0x00000040
+IS_UNICODE = 0x00000080
+FORCE_NO_LINK_INFO = 0x00000100
+HAS_EXP_STRING = 0x00000200
+
+# LinkInfoFlags
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x1
+COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX = 0x2
+
+# ExtraData 块签名
+ENVIRONMENT_VARIABLE_DATA_BLOCK = 0xA0000001
+ICON_ENVIRONMENT_DATA_BLOCK = 0xA0000007
+
+# 快捷方式文件超过该大小时不解析
+MAX_LINK_SIZE = 1024 * 1024
+
+# 解析结果：显示名称、目标、参数、工作目录、图标位置、图标序号、描述 (备注)、网址 (.url)
+ShortcutInfo = namedtuple("ShortcutInfo", ["name", "target", "arguments", "working_dir",
+                                           "icon_location", "icon_index", "description", "url"])
+
+
+class ShortcutError(Exception):
+    """快捷方式文件格式错误"""
+
+
+def ansi_encoding():
+    """非 Unicode 字符串使用的系统代码页"""
+    return "mbcs" if os.name == "nt" else (locale.getpreferredencoding(False) or "cp1252")
+
+
+def expand_path(path):
+    """展开 %ProgramFiles% 等环境变量"""
+    return os.path.expandvars(path) if path else path
+
+
+def read_c_string(data, offset, unicode=False):
+    """读取以 \\0 结尾的字符串 (ANSI 或 UTF-16LE)"""
+    if offset <= 0 or offset >= len(data):
+        return ""
+    if unicode:
+        end = offset
+        while end + 1 < len(data) and data[end:end + 2] != b"\0\0":
+            end += 2
+        return data[offset:end].decode("utf-16-le", "replace")
+    end = data.find(b"\0", offset)
+    if end < 0:
+        end = len(data)
+    return data[offset:end].decode(ansi_encoding(), "replace")
+
+
+def parse_id_list(data):
+    """
+    从 LinkTargetIDList 中尽量还原文件系统路径 (只在没有 LinkInfo 时使用)
+    只识别卷 (0x2X) 和文件/文件夹 (0x3X) 项，优先使用扩展块 0xBEEF0004 中的长文件名
+    """
+    parts = []
+    offset = 0
+    while offset + 2 <= len(data):
+        size = struct.unpack_from("<H", data, offset)[0]
+        if size == 0:
+            break
+        item = data[offset:offset + size]
+        offset += size
+        if len(item) < 3:
+            continue
+        item_type = item[2] & 0x70
+        if item_type == 0x20:
+            parts = [read_c_string(item, 3)]
+        elif item_type == 0x30 and len(item) > 14:
+            name = read_c_string(item, 14)
+            long_name = parse_beef0004(item)
+            parts.append(long_name or name)
+    if not parts or not parts[0]:
+        return ""
+    return os.path.join(*parts) if os.name == "nt" else "\\".join(part.rstrip("\\") for part in parts)
+
+
+def parse_beef0004(item):
+    """读取文件项扩展块中的 Unicode 长文件名"""
+    position = item.find(b"\x04\x00\xef\xbe")
+    # 扩展块头: 大小(2) 版本(2) 签名(4)，签名位于块开头偏移 4 处
+    if position < 4:
+        return ""
+    block = item[position - 4:]
+    if len(block) < 8:
+        return ""
+    version = struct.unpack_from("<H", block, 2)[0]
+    # 大小(2) 版本(2) 签名(4) 创建时间(4) 访问时间(4) 标识(2)，之后的字段随版本增加
+    name_offset = 18
+    if version >= 7:
+        name_offset += 18  # 未知(2) + NTFS 文件引用(8) + 未知(8)
+    if version >= 3:
+        name_offset += 2   # 长文件名大小
+    if version >= 9:
+        name_offset += 4
+    if version >= 8:
+        name_offset += 4
+    return read_c_string(block, name_offset, unicode=True)
+
+
+def parse_link_info(data):
+    """解析 LinkInfo 结构，返回目标路径"""
+    if len(data) < 0x1C:
+        return ""
+    header_size, flags, volume_id_offset, local_base_path_offset, network_offset, suffix_offset = \
+        struct.unpack_from("<6I", data, 4)
+    unicode_base = unicode_suffix = 0
+    if header_size >= 0x24 and len(data) >= 0x24:
+        unicode_base, unicode_suffix = struct.unpack_from("<2I", data, 0x1C)
+    if unicode_suffix:
+        suffix = read_c_string(data, unicode_suffix, unicode=True)
+    else:
+        suffix = read_c_string(data, suffix_offset)
+    if flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+        if unicode_base:
+            base = read_c_string(data, unicode_base, unicode=True)
+        else:
+            base = read_c_string(data, local_base_path_offset)
+        return base + suffix
+    if flags & COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX and network_offset + 0x14 <= len(data):
+        net_name_offset = struct.unpack_from("<I", data, network_offset + 8)[0]
+        if net_name_offset > 0x14 and network_offset + 0x1C <= len(data):
+            unicode_net_name_offset = struct.unpack_from("<I", data, network_offset + 0x14)[0]
+            net_name = read_c_string(data, network_offset + unicode_net_name_offset, unicode=True)
+        else:
+            net_name = read_c_string(data, network_offset + net_name_offset)
+        if net_name and suffix:
+            return net_name.rstrip("\\") + "\\" + suffix
+        return net_name
+    return ""
+
+
+def parse_lnk(data, name=""):
+    """解析 .lnk 文件内容，返回 ShortcutInfo；格式错误时抛出 ShortcutError"""
+    if len(data) < LINK_HEADER_SIZE or struct.unpack_from("<I", data, 0)[0] != LINK_HEADER_SIZE \
+            or data[4:20] != LINK_CLSID:
+        raise ShortcutError("不是有效的快捷方式文件")
+    flags = struct.unpack_from("<I", data, 0x14)[0]
+    icon_index = struct.unpack_from("<i", data, 0x38)[0]
+    offset = LINK_HEADER_SIZE
+    try:
+        id_list_target = ""
+        if flags & HAS_LINK_TARGET_ID_LIST:
+            id_list_size = struct.unpack_from("<H", data, offset)[0]
+            id_list_target = parse_id_list(data[offset + 2:offset + 2 + id_list_size])
+            offset += 2 + id_list_size
+        link_info_target = ""
+        if flags & HAS_LINK_INFO and not flags & FORCE_NO_LINK_INFO:
+            link_info_size = struct.unpack_from("<I", data, offset)[0]
+            link_info_target = parse_link_info(data[offset:offset + link_info_size])
+            offset += link_info_size
+
+        # StringData: 每个字符串前有 2 字节的字符数
+        unicode = bool(flags & IS_UNICODE)
+        strings = {}
+        for flag in (HAS_NAME, HAS_RELATIVE_PATH, HAS_WORKING_DIR, HAS_ARGUMENTS, HAS_ICON_LOCATION):
+            if not flags & flag:
+                continue
+            count = struct.unpack_from("<H", data, offset)[0]
+            offset += 2
+            length = count * 2 if unicode else count
+            raw = data[offset:offset + length]
+            strings[flag] = raw.decode("utf-16-le", "replace") if unicode else raw.decode(ansi_encoding(), "replace")
+            offset += length
+
+        # ExtraData: 只读取环境变量形式的目标和图标
+        env_target = env_icon = ""
+        while offset + 8 <= len(data):
+            block_size, signature = struct.unpack_from("<2I", data, offset)
+            if block_size < 8:
+                break
+            if signature in (ENVIRONMENT_VARIABLE_DATA_BLOCK, ICON_ENVIRONMENT_DATA_BLOCK) and block_size >= 0x314:
+                value = read_c_string(data, offset + 0x10C, unicode=True) or read_c_string(data, offset + 8)
+                if signature == ENVIRONMENT_VARIABLE_DATA_BLOCK:
+                    env_target = value
+                else:
+                    env_icon = value
+            offset += block_size
+    except struct.error as e:
+        raise ShortcutError(f"快捷方式文件不完整: {e}")
+
+    target = link_info_target or id_list_target
+    if (flags & HAS_EXP_STRING or not target) and env_target:
+        target = expand_path(env_target)
+    icon_location = strings.get(HAS_ICON_LOCATION, "")
+    if env_icon:
+        icon_location = env_icon
+    return ShortcutInfo(name=name, target=target, arguments=strings.get(HAS_ARGUMENTS, ""),
+                        working_dir=expand_path(strings.get(HAS_WORKING_DIR, "")),
+                        icon_location=expand_path(icon_location), icon_index=icon_index,
+                        description=strings.get(HAS_NAME, ""), url="")
+
+
+def parse_url(data, name=""):
+    """解析 .url 文件内容 ([InternetShortcut] 节)，返回 ShortcutInfo"""
+    for encoding in ("utf-8-sig", "utf-16", ansi_encoding()):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ShortcutError("无法识别 .url 文件的编码")
+    parser = configparser.ConfigParser(strict=False, interpolation=None)
+    try:
+        parser.read_string(text)
+    except configparser.Error as e:
+        raise ShortcutError(f".url 文件格式错误: {e}")
+    section = parser["InternetShortcut"] if parser.has_section("InternetShortcut") else {}
+    url = section.get("URL", "")
+    try:
+        icon_index = int(section.get("IconIndex", "0"))
+    except ValueError:
+        icon_index = 0
+    # file:/// 网址指向本地文件时，目标为对应的本地路径
+    target = url
+    if url.lower().startswith("file:///"):
+        from urllib.parse import unquote
+        target = unquote(url[8:]).replace("/", os.sep)
+    return ShortcutInfo(name=name, target=target, arguments="", working_dir=section.get("WorkingDirectory", ""),
+                        icon_location=expand_path(section.get("IconFile", "")), icon_index=icon_index,
+                        description="", url=url)
+
+
+def parse_shortcut(path):
+    """解析快捷方式文件，显示名称与资源管理器一致 (文件名去掉扩展名)；不是快捷方式或无法解析时返回 None"""
+    name, ext = os.path.splitext(os.path.basename(path))
+    ext = ext.lower()
+    if ext not in (".lnk", ".url"):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(MAX_LINK_SIZE + 1)
+        if len(data) > MAX_LINK_SIZE:
+            raise ShortcutError("文件过大")
+        return parse_lnk(data, name) if ext == ".lnk" else parse_url(data, name)
+    except (OSError, ShortcutError) as e:
+        logger.debug(f"无法解析快捷方式 '{path}': {e}")
+        return None
+
+
+class ShortcutCache:
+    """
+    快捷方式解析结果缓存：规范化路径 -> (修改时间, ShortcutInfo 或 None)，修改时间不变时不重新解析
+    无法解析的文件也记录为 None，避免每次都重新读取
+    persistent 为 False 时只缓存在内存中 (例如索引合成的根目录时)，不读写配置目录
+    """
+
+    def __init__(self, cache_file=None, persistent=True):
+        self.cache_file = cache_file or Settings.get_config_path("shortcut_cache.json")
+        self.persistent = persistent
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.persistent:
+            return
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != SHORTCUT_CACHE_VERSION:
+                return
+            self.entries = {key: (mtime, info and ShortcutInfo(*info))
+                            for key, (mtime, info) in data["entries"].items()}
+        except Exception as e:
+            logger.error(f"加载快捷方式缓存失败: {e}")
+            self.entries = {}
+
+    def save(self):
+        """有新的解析结果时写入磁盘"""
+        with self.lock:
+            if not self.dirty or not self.persistent:
+                return
+            data = {"version": SHORTCUT_CACHE_VERSION,
+                    "entries": {key: [mtime, info and list(info)] for key, (mtime, info) in self.entries.items()}}
+            self.dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"保存快捷方式缓存失败: {e}")
+
+    def resolve_many(self, items):
+        """
+        批量解析 [(路径, 修改时间)]，修改时间通常来自目录扫描，因此命中缓存时不访问磁盘
+        返回 {路径: ShortcutInfo}，无法解析的路径不在结果中
+        """
+        results = {}
+        for path, mtime in items:
+            key = os.path.normcase(path)
+            with self.lock:
+                cached = self.entries.get(key)
+            if cached is not None and cached[0] == mtime:
+                info = cached[1]
+            else:
+                info = parse_shortcut(path)
+                with self.lock:
+                    self.entries[key] = (mtime, info)
+                    self.dirty = True
+            if info is not None:
+                results[path] = info
+        return results
+
+    def prune(self, existing=()):
+        """删除快捷方式文件已不存在的条目；existing 中的路径 (刚扫描到的) 不再 stat"""
+        existing = {os.path.normcase(path) for path in existing}
+        with self.lock:
+            keys = list(self.entries)
+        removed = [key for key in keys if key not in existing and not os.path.exists(key)]
+        if removed:
+            with self.lock:
+                for key in removed:
+                    self.entries.pop(key, None)
+                self.dirty = True
+            logger.debug(f"快捷方式缓存删除了 {len(removed)} 个已不存在的条目")
+
+    def resolve_folder(self, directory):
+        """批量解析文件夹中的所有快捷方式 (不递归)"""
+        items = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.lower().endswith((".lnk", ".url")):
+                        try:
+                            items.append((entry.path, entry.stat().st_mtime))
+                        except OSError:
+                            continue
+        except OSError as e:
+            logger.debug(f"无法列举目录 '{directory}': {e}")
+        results = self.resolve_many(items)
+        self.save()
+        return results
+
+    def resolve(self, path):
+        """解析单个快捷方式"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        return self.resolve_many([(path, mtime)]).get(path)
+
+
+def launch(path):
+    """
+    打开文件；.lnk 快捷方式直接启动解析出的目标 (带参数和工作目录)，不再经过外壳解析
+    目标不存在 (例如 MSI 广告快捷方式) 时回退为打开快捷方式本身
+    """
+    if path.lower().endswith(".lnk"):
+        info = get_shortcut_cache().resolve(path)
+        if info and info.target and os.path.exists(info.target):
+            working_dir = info.working_dir if info.working_dir and os.path.isdir(info.working_dir) else None
+            os.startfile(info.target, "open", info.arguments or None, working_dir)
+            return
+    os.startfile(path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shortcut_cache():
+    """获取全局共用的快捷方式缓存实例"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ShortcutCache()
+        return _cache
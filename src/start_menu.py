@@ -7,10 +7,11 @@ BetterExplorer - 开始菜单模块
 """
 
 import os
+import time
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                             QScrollArea, QFrame, QGridLayout,
+                             QFrame, QListView,
                              QToolButton, QMenu, QAction, QApplication, QStackedLayout)
-from PyQt5.QtCore import Qt, QSize, QPoint
+from PyQt5.QtCore import Qt, QSize, QPoint, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QPixmap, QPainter, QCursor
 from PyQt5.QtSvg import QSvgRenderer
 from icons import file_manager_icon, settings_icon, power_icon, back_icon, uwp_icon
@@ -18,18 +19,65 @@ from PyQt5.QtWidgets import QFileIconProvider
 from log import get_logger
 
 logger = get_logger()
-from uwp_app_menu import UWPAppFetcher, launch_uwp_app
+from uwp_app_menu import UWPAppFetcher, UWPAppCache, launch_uwp_app
 from file_manager import FileManager
 from settings import Settings
 from search import SearchWindow
+from frecency import get_frecency_store
+from start_menu_catalog import StartMenuCatalog, ROOT_FOLDER
+from program_model import ProgramListModel
+from icon_service import IconService
+from shortcut import launch
+
+# 常用应用区域显示的最大数量
+FREQUENT_APP_COUNT = 5
+# 程序列表中每个格子的大小
+PROGRAM_GRID_SIZE = QSize(110, 90)
+# 程序图标的大小 (逻辑像素)
+PROGRAM_ICON_SIZE = 32
+# 程序列表每批布局的条目数 (略大于一屏可见的格子数)
+PROGRAM_LAYOUT_BATCH = 64
+# 启动后等待多久 (毫秒) 在空闲时预热开始菜单，让桌面和任务栏先完成绘制
+PREWARM_DELAY_MS = 2000
+# 预热后打开开始菜单到首次绘制完成的目标耗时 (毫秒，一帧)
+WARM_OPEN_TARGET_MS = 16
+# 常用应用按钮的共用样式，设置在按钮的父部件上，不再为每个按钮单独解析样式表
+PROGRAM_BUTTON_STYLE = (
+    "QToolButton {background-color: transparent; color: white; border: none; text-align: center;}"
+    "QToolButton:hover {background-color: #3E3E42; border-radius: 5px;}"
+    "QToolButton:pressed {background-color: #0078D7;}"
+)
+# 程序列表视图的样式，与常用应用按钮保持一致
+PROGRAM_VIEW_STYLE = (
+    "QListView {background-color: transparent; border: none; outline: none;}"
+    "QListView::item {color: white; border: none; border-radius: 5px;}"
+    "QListView::item:hover {background-color: #3E3E42;}"
+    "QListView::item:selected {background-color: #0078D7;}"
+    "QScrollBar:vertical {background-color: #2D2D30; width: 10px;}"
+    "QScrollBar::handle:vertical {background-color: #3E3E42; border-radius: 5px;}"
+    "QScrollBar::handle:vertical:hover {background-color: #505054;}"
+)
+
 
 class StartMenu(QWidget):
     """开始菜单类，提供开始菜单功能"""
     
+    # 每次刷新程序列表后发出: (条目数, 模型中重置、插入、删除或更新的行数, 耗时毫秒)
+    program_list_refreshed = pyqtSignal(int, int, float)
+    # 每次打开开始菜单首次绘制完成后发出: (从打开到首次绘制的耗时毫秒, 打开前是否已预热)
+    first_painted = pyqtSignal(float, bool)
+    
     def __init__(self, display_manager, parent=None):
         super().__init__(parent)
         self.display_manager = display_manager
         self.is_visible = False
+        # 程序列表和常用应用已在隐藏状态下刷新、布局并绘制过，下次打开时不需要再做
+        self.warm = False
+        # 预热完成时的界面状态，状态不变时隐藏后不需要重新预热 (见 warm_state)
+        self.warmed_state = None
+        # 首次绘制探针: 本次打开的开始时间和打开前是否已预热
+        self.open_started = None
+        self.open_was_warm = False
         self.taskbar = parent  # 保存任务栏引用
         
         # 初始化日志记录器
@@ -40,21 +88,33 @@ class StartMenu(QWidget):
         self.setWindowFlags(Qt.Popup | Qt.FramelessWindowHint | Qt.NoDropShadowWindowHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
         
-        # 初始化默认路径和当前路径
-        self.default_start_menu_path = os.path.join(os.environ.get('ProgramData', 'C:\ProgramData'),
-                                                  'Microsoft\Windows\Start Menu\Programs')
-        self.current_path = self.default_start_menu_path
+        # 开始菜单目录树：启动时加载快照，之后在后台按目录修改时间检查更新
+        self.catalog = StartMenuCatalog(parent=self)
+        self.catalog.changed.connect(self.on_catalog_changed)
+        self.catalog.load_and_revalidate()
+        # 当前显示的文件夹 (目录树中的键，根文件夹为 ROOT_FOLDER)
+        self.current_folder = ROOT_FOLDER
         self.is_showing_uwp_apps = False # 新增状态变量，表示当前是否正在显示UWP应用
         
         # 初始化UI
         # 创建搜索组件实例
         self.search_widget = SearchWindow(self)
         
-        # 初始化 UWP 应用获取器
+        # 初始化 UWP 应用获取器和缓存 (打开列表时先显示缓存，超过 TTL 才在后台重新获取)
+        self.uwp_app_cache = UWPAppCache()
         self.uwp_app_fetcher = UWPAppFetcher()
         self.uwp_app_fetcher.finished.connect(self.on_uwp_apps_fetched)
         self.uwp_app_fetcher.error.connect(self.on_uwp_apps_error)
 
+        # 所有程序按钮共用的图标提供器和图标
+        self.icon_provider = QFileIconProvider()
+        self.folder_icon = self.icon_provider.icon(QFileIconProvider.Folder)
+        self.file_icon = self.icon_provider.icon(QFileIconProvider.File)
+        self.svg_icons = {}
+        # 快捷方式和程序的真实图标在后台提取，提取完成前显示 file_icon
+        self.icon_service = IconService(parent=self)
+        self.icon_service.icon_ready.connect(self.on_icon_ready)
+
         self.init_ui()
         
     def init_ui(self):
@@ -117,28 +177,39 @@ class StartMenu(QWidget):
         self.top_button_layout = top_button_layout # 保存引用
         main_layout.addLayout(self.top_button_layout)
 
-        # 创建程序列表容器
-        self.program_widget = QWidget()
-
-        self.program_layout = QGridLayout(self.program_widget)
-        self.program_layout.setContentsMargins(0, 0, 0, 0)
-        self.program_layout.setSpacing(10)
-        
-        # 添加程序列表区域
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet(
-            "QScrollArea {border: none; background-color: transparent;}"
-            "QScrollBar:vertical {background-color: #2D2D30; width: 10px;}"
-            "QScrollBar::handle:vertical {background-color: #3E3E42; border-radius: 5px;}"
-            "QScrollBar::handle:vertical:hover {background-color: #505054;}"
-        )
-        
-        self.scroll_area.setWidget(self.program_widget)
+        # 常用应用区域 (根据启动记录显示最常启动的程序)
+        self.frequent_widget = QWidget()
+        self.frequent_widget.setStyleSheet(PROGRAM_BUTTON_STYLE)
+        self.frequent_layout = QHBoxLayout(self.frequent_widget)
+        self.frequent_layout.setContentsMargins(0, 0, 0, 0)
+        self.frequent_layout.setSpacing(10)
+        self.frequent_widget.setVisible(False)
+        main_layout.addWidget(self.frequent_widget)
+
+        # 程序列表 (图标模式的模型/视图，只绘制滚动到可见区域的格子)
+        self.program_model = ProgramListModel(self.program_icon, self)
+        self.program_view = QListView()
+        self.program_view.setModel(self.program_model)
+        self.program_view.setViewMode(QListView.IconMode)
+        self.program_view.setMovement(QListView.Static)
+        self.program_view.setResizeMode(QListView.Adjust)
+        self.program_view.setWrapping(True)
+        self.program_view.setUniformItemSizes(True)
+        # 分批布局：先排好第一屏，其余条目在事件循环空闲时继续排列
+        self.program_view.setLayoutMode(QListView.Batched)
+        self.program_view.setBatchSize(PROGRAM_LAYOUT_BATCH)
+        self.program_view.setGridSize(PROGRAM_GRID_SIZE)
+        self.program_view.setIconSize(QSize(PROGRAM_ICON_SIZE, PROGRAM_ICON_SIZE))
+        self.program_view.setWordWrap(True)
+        self.program_view.setEditTriggers(QListView.NoEditTriggers)
+        self.program_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.program_view.setStyleSheet(PROGRAM_VIEW_STYLE)
+        # 与原来的按钮一样单击即打开
+        self.program_view.clicked.connect(self.on_program_item_clicked)
         
         # 创建一个堆叠布局来管理程序列表和搜索结果列表
         self.stacked_layout = QStackedLayout()
-        self.stacked_layout.addWidget(self.scroll_area) # 索引 0: 程序列表
+        self.stacked_layout.addWidget(self.program_view) # 索引 0: 程序列表
         self.stacked_layout.addWidget(self.search_widget.result_list) # 索引 1: 搜索结果列表
         
         main_layout.addLayout(self.stacked_layout, 1) # 占据大部分空间
@@ -146,8 +217,7 @@ class StartMenu(QWidget):
         # 默认显示程序列表
         self.stacked_layout.setCurrentIndex(0)
 
-        # 连接搜索组件的输入框焦点事件
-        self.search_widget.search_input.textChanged.connect(self.search_widget.perform_search)
+        # 连接搜索组件的输入框焦点事件 (文本变化信号已由搜索组件自行防抖处理)
         self.search_widget.search_input.focusInEvent = lambda e, le=self.search_widget.search_input: self.handle_search_focus_in(le, e)
         self.search_widget.search_input.focusOutEvent = lambda e, le=self.search_widget.search_input: self.handle_search_focus_out(le, e)
 
@@ -238,40 +308,96 @@ class StartMenu(QWidget):
         self.bottom_layout = bottom_layout # 保存引用以便后续操作
         main_layout.addLayout(self.bottom_layout)
     
-    def add_program_button(self, layout, row, col, name, icon_type, item_path):
-        """添加程序按钮到网格布局"""
+    def create_program_button(self, name, icon_type, item_path):
+        """创建程序按钮 (用于常用应用区域)，样式由父部件的共用样式表提供"""
         button = QToolButton()
         button.setText(name)
         button.setToolButtonStyle(Qt.ToolButtonTextUnderIcon)
         button.setFixedSize(100, 80)
-        
-        # 创建文件图标提供器
-        icon_provider = QFileIconProvider()
-        
-        # 根据类型设置图标
+        button.setIcon(self.program_icon(name, icon_type, item_path))
+        if name in ("文件管理器", "设置"):
+            button.setIconSize(QSize(32, 32))
+        button.setProperty("item_name", name)
+        button.setProperty("item_type", icon_type)
+        button.setProperty("item_path", item_path)
+        button.clicked.connect(lambda checked, button=button: self.on_program_button_clicked(button))
+        return button
+
+    def program_icon(self, name, icon_type, item_path):
+        """返回程序列表条目的图标，真实图标尚未提取时返回共用的占位图标"""
         if icon_type == "folder":
-            button.setIcon(icon_provider.icon(QFileIconProvider.Folder))
+            return self.folder_icon
+        if icon_type == "uwp":
+            # TODO: 为UWP应用设置图标，可能需要额外的逻辑来获取UWP应用的图标
+            return QIcon()
+        # 特殊处理系统应用图标
+        if name == "文件管理器":
+            return self.svg_icon(file_manager_icon)
+        if name == "设置":
+            return self.svg_icon(settings_icon)
+        return self.icon_service.icon(item_path, PROGRAM_ICON_SIZE, self.devicePixelRatioF()) or self.file_icon
+
+    def on_icon_ready(self, path):
+        """图标提取完成后替换占位图标"""
+        self.program_model.update_icon(path)
+        for i in range(self.frequent_layout.count()):
+            button = self.frequent_layout.itemAt(i).widget()
+            if isinstance(button, QToolButton) and button.property("item_path") == path:
+                button.setIcon(self.program_icon(button.property("item_name"), button.property("item_type"), path))
+
+    def svg_icon(self, svg_content):
+        """渲染 SVG 图标，每个 SVG 只渲染一次"""
+        icon = self.svg_icons.get(svg_content)
+        if icon is None:
+            icon = self.svg_icons[svg_content] = QIcon(self.render_svg(svg_content))
+        return icon
+
+    def on_program_item_clicked(self, index):
+        """程序列表条目点击事件"""
+        item = index.data(Qt.UserRole)
+        if item:
+            self.activate_program_item(item["name"], item["type"], item["target"])
+
+    def on_program_button_clicked(self, button):
+        """常用应用按钮点击事件，目标从按钮属性中读取"""
+        self.activate_program_item(button.property("item_name"), button.property("item_type"),
+                                   button.property("item_path"))
+
+    def activate_program_item(self, name, icon_type, item_path):
+        """打开文件夹、启动 UWP 应用或程序"""
+        if icon_type == "folder":
+            self.open_folder(item_path)
+        elif icon_type == "uwp":
+            launch_uwp_app(item_path)
         else:
-            # 特殊处理系统应用图标
-            if name == "文件管理器":
-                self.set_svg_icon(button, file_manager_icon)
-            elif name == "设置":
-                self.set_svg_icon(button, settings_icon)
-            else:
-                button.setIcon(icon_provider.icon(QFileIconProvider.File))
-        
-        # 保持原有样式设置
-        button.setStyleSheet(
-            "QToolButton {background-color: transparent; color: white; border: none; text-align: center;}"
-            "QToolButton:hover {background-color: #3E3E42; border-radius: 5px;}"
-            "QToolButton:pressed {background-color: #0078D7;}"
+            self.on_program_clicked(name, item_path)
+
+    def refresh_frequent_apps(self):
+        """根据启动记录刷新常用应用区域"""
+        while self.frequent_layout.count():
+            item = self.frequent_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+
+        self.frequent_paths = get_frecency_store().top(FREQUENT_APP_COUNT)
+        if self.frequent_paths:
+            title = QLabel("常用")
+            title.setStyleSheet("border: none; font-size: 14px;")
+            self.frequent_layout.addWidget(title)
+            for path in self.frequent_paths:
+                name = os.path.splitext(os.path.basename(path))[0]
+                self.frequent_layout.addWidget(self.create_program_button(name, "program", path))
+            self.frequent_layout.addStretch(1)
+        self.update_frequent_visibility()
+
+    def update_frequent_visibility(self):
+        """只在开始菜单根目录且有启动记录时显示常用应用区域"""
+        self.frequent_widget.setVisible(
+            bool(getattr(self, 'frequent_paths', None))
+            and not self.is_showing_uwp_apps
+            and self.current_folder == ROOT_FOLDER
+            and self.stacked_layout.currentIndex() == 0
         )
-        
-        # 连接点击事件
-        button.clicked.connect(lambda checked, name=name, path=item_path: self.on_program_clicked(name, path))
-        
-        layout.addWidget(button, row, col)
-        return button
     
     def show_uwp_apps(self):
         """显示UWP应用列表或返回普通开始菜单"""
@@ -280,132 +406,113 @@ class StartMenu(QWidget):
             self.logger.info("返回普通开始菜单...")
             self.is_showing_uwp_apps = False
             self.refresh_program_list()
-            self.uwp_button.setText("UWP 应用")
-            self.uwp_button.clicked.disconnect()
-            self.uwp_button.clicked.connect(self.show_uwp_apps)
-            self.uwp_button.setEnabled(True)
+            self.reset_uwp_button()
         else:
             # 如果当前显示普通开始菜单，则显示UWP应用列表
-            self.logger.info("开始获取UWP应用列表...")
             self.is_showing_uwp_apps = True
-            # 启动异步获取
-            self.uwp_app_fetcher.start()
-            # 暂时禁用UWP按钮，防止重复点击
-            self.uwp_button.setEnabled(False)
-            self.uwp_button.setText("正在加载UWP应用...")
-
-    def on_uwp_apps_fetched(self, apps):
-        """处理UWP应用列表获取完成"""
-        self.logger.info(f"成功获取到 {len(apps)} 个UWP应用。")
+            self.update_frequent_visibility()
+            if self.uwp_app_cache.apps is not None:
+                # 立即显示上次获取的列表
+                self.show_uwp_app_list(self.uwp_app_cache.apps)
+            else:
+                # 暂时禁用UWP按钮，防止重复点击
+                self.uwp_button.setEnabled(False)
+                self.uwp_button.setText("正在加载UWP应用...")
+            if self.uwp_app_cache.is_stale() and not self.uwp_app_fetcher.isRunning():
+                # 启动异步获取
+                self.logger.info("开始获取UWP应用列表...")
+                self.uwp_app_fetcher.start()
+
+    def show_uwp_app_list(self, apps):
+        """显示UWP应用列表，并把按钮切换为关闭"""
         self.uwp_button.setEnabled(True)
         self.uwp_button.setText("关闭 UWP 应用菜单")
         # 确保点击事件连接到show_uwp_apps，以便下次点击时可以返回普通菜单
         self.uwp_button.clicked.disconnect()
         self.uwp_button.clicked.connect(self.show_uwp_apps)
         
-        # 确保滚动区域存在
-        if not self.scroll_area:
-            self.scroll_area = QScrollArea()
-            self.scroll_area.setWidgetResizable(True)
-            self.scroll_area.setStyleSheet(
-                "QScrollArea {border: none; background-color: transparent;}"
-                "QScrollBar:vertical {background-color: #2D2D30; width: 10px;}"
-                "QScrollBar::handle:vertical {background-color: #3E3E42; border-radius: 5px;}"
-                "QScrollBar::handle:vertical:hover {background-color: #505054;}"
-            )
-            
-        # 清除现有程序列表
-        self.clear_program_buttons()
-        
-        # 强制重新创建 program_widget 和 program_layout 以确保正确初始化
-        self.program_widget = QWidget()
-        self.program_layout = QGridLayout(self.program_widget)
-        self.program_layout.setContentsMargins(0, 0, 0, 0)
-        self.program_layout.setSpacing(10)
-        
-        # 将新的 program_widget 设置到滚动区域中
-        self.scroll_area.setWidget(self.program_widget)
-        
-        self.logger.info(f"UWP应用程序列表布局已重新初始化")
-        
         # 将UWP应用添加到程序列表
         self.add_uwp_apps_to_program_list(apps)
 
-    def clear_program_buttons(self):
-        """清除所有程序按钮"""
-        # 直接使用 self.program_layout 清除按钮
-        if self.program_layout:
-            while self.program_layout.count():
-                item = self.program_layout.takeAt(0)
-                if item.widget():
-                    item.widget().deleteLater()
+    def on_uwp_apps_fetched(self, apps):
+        """处理UWP应用列表获取完成：保存缓存，正在显示缓存的列表时只应用差异"""
+        self.logger.info(f"成功获取到 {len(apps)} 个UWP应用。")
+        shown_from_cache = self.uwp_app_cache.apps is not None
+        self.uwp_app_cache.save(apps)
+        # 使用去重后的列表，模型中的目标 (AppID) 必须唯一
+        apps = self.uwp_app_cache.apps
+        if not self.is_showing_uwp_apps:
+            return
+        if shown_from_cache:
+            start = time.perf_counter()
+            self.program_model.apply_items([(app['name'], "uwp", app['appid']) for app in apps])
+            self.report_program_list_refresh(len(apps), start)
+        else:
+            self.show_uwp_app_list(apps)
+
+    def report_program_list_refresh(self, count, start):
+        """记录一次程序列表刷新的条目数、变化的行数和耗时，并通过 program_list_refreshed 信号发出"""
+        elapsed = (time.perf_counter() - start) * 1000
+        changed = self.program_model.changed_rows
+        self.logger.debug(f"程序列表刷新: {count} 个条目, {changed} 行变化, 耗时 {elapsed:.1f} 毫秒")
+        self.program_list_refreshed.emit(count, changed, elapsed)
 
     def on_uwp_apps_error(self, error_message):
         """处理UWP应用列表获取错误"""
         self.logger.error(f"获取UWP应用失败: {error_message}")
+        if self.uwp_app_cache.apps is not None:
+            # 已经显示了缓存的列表，保持不变
+            return
+        if not self.is_showing_uwp_apps:
+            return
         self.is_showing_uwp_apps = False # 重置状态
-        self.uwp_button.setEnabled(True)
-        self.uwp_button.setText("UWP 应用") # 恢复文本
-        self.uwp_button.clicked.disconnect() # 断开旧连接
-        self.uwp_button.clicked.connect(self.show_uwp_apps) # 重新连接到show_uwp_apps
+        self.reset_uwp_button()
         # 刷新程序列表，确保显示的是普通开始菜单内容
         self.refresh_program_list()
 
+    def reset_uwp_button(self):
+        """把UWP按钮恢复为打开UWP应用列表"""
+        self.uwp_button.setEnabled(True)
+        self.uwp_button.setText("UWP 应用")
+        self.uwp_button.clicked.disconnect()
+        self.uwp_button.clicked.connect(self.show_uwp_apps)
+
     def add_uwp_apps_to_program_list(self, apps):
         """将UWP应用添加到程序列表"""
-        # 直接使用 self.program_layout
-        if self.program_layout is None:
-            self.logger.error("程序列表布局未初始化。")
-            return
-        
+        start = time.perf_counter()
         self.logger.info(f"开始添加 {len(apps)} 个UWP应用到程序列表")
-
-        # 初始化行和列
-        row = 0
-        col = 0
-        max_cols = 5  # 每行显示5个应用
-
-        for app in apps:
-            # 为每个UWP应用创建一个按钮
-            button = QToolButton()
-            button.setText(app['name'])
-            button.setToolButtonStyle(Qt.ToolButtonTextUnderIcon)
-            button.setFixedSize(100, 80)
-            # TODO: 为UWP应用设置图标，可能需要额外的逻辑来获取UWP应用的图标
-            # button.setIcon(QIcon("path/to/uwp_icon.png"))
-            button.setStyleSheet(
-                "QToolButton {background-color: transparent; color: white; border: none; text-align: center;}"
-                "QToolButton:hover {background-color: #3E3E42; border-radius: 5px;}"
-                "QToolButton:pressed {background-color: #0078D7;}"
-            )
-            button.setProperty('is_uwp_app', True)
-            button.clicked.connect(lambda checked, app_id=app['appid']: launch_uwp_app(app_id))
-
-            self.program_layout.addWidget(button, row, col)
-
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
-        
-        # 刷新布局以显示新添加的按钮
-        self.program_layout.update()
+        self.program_model.set_items([(app['name'], "uwp", app['appid']) for app in apps])
+        self.program_view.scrollToTop()
+        self.report_program_list_refresh(len(apps), start)
 
     def go_back(self):
         """返回上级目录"""
-        self.current_path = os.path.dirname(self.current_path)
+        self.current_folder = os.path.dirname(self.current_folder)
+        self.refresh_program_list()
+
+    def open_folder(self, folder):
+        """进入开始菜单中的文件夹"""
+        self.current_folder = folder
+        self.logger.debug(f"进入文件夹: {folder}")
         self.refresh_program_list()
 
+    def on_catalog_changed(self):
+        """后台扫描发现开始菜单有变化时刷新程序列表"""
+        # 快捷方式可能被替换，图标在下次显示时重新检查
+        self.icon_service.invalidate()
+        # 程序可能已被卸载，在后台重新检查常用应用是否存在 (有变化时下次预热或打开时刷新)
+        get_frecency_store().check_paths()
+        if not self.catalog.has_folder(self.current_folder):
+            self.current_folder = ROOT_FOLDER
+        self.warm = False
+        if not self.is_visible:
+            # 隐藏时重新预热，下次打开不需要重新布局
+            self.prewarm()
+        elif not self.is_showing_uwp_apps:
+            self.refresh_program_list()
+
     def on_program_clicked(self, program_name, item_path):
         """处理程序点击事件"""
-        # 判断是否是文件夹
-        if os.path.isdir(item_path):
-            # 更新当前路径并刷新界面
-            self.current_path = item_path
-            self.logger.debug(f"进入文件夹: {item_path}")
-            self.refresh_program_list()
-            return
-        
         self.logger.info(f"启动程序: {program_name}")
         
         # 根据程序名称执行不同操作
@@ -421,9 +528,15 @@ class StartMenu(QWidget):
             # 处理其他程序
             try:
                 if os.path.isfile(item_path):
-                    os.startfile(item_path)
+                    # 快捷方式直接启动解析出的目标
+                    launch(item_path)
+                    get_frecency_store().record_launch(item_path)
                 elif os.path.isdir(item_path):
                     os.startfile(item_path)
+                else:
+                    # 常用应用中的程序可能已被卸载，后台检查之前不会发现
+                    self.logger.warning(f"程序已不存在: {item_path}")
+                    get_frecency_store().mark_missing(item_path)
             except Exception as e:
                 self.logger.error(f"启动程序失败: {e}")
         
@@ -529,14 +642,12 @@ class StartMenu(QWidget):
     
     def go_back_in_start_menu(self):
         """在开始菜单程序列表中返回上一级目录"""
-        parent_path = os.path.dirname(self.current_path)
-        # 确保父路径有效且不低于默认起始路径
-        if parent_path and parent_path != self.current_path and parent_path.startswith(self.default_start_menu_path):
-            self.current_path = parent_path
-            self.logger.debug(f"返回到文件夹: {self.current_path}")
+        if self.current_folder != ROOT_FOLDER:
+            self.current_folder = os.path.dirname(self.current_folder)
+            self.logger.debug(f"返回到文件夹: {self.current_folder or '根目录'}")
             self.refresh_program_list()
         else:
-            self.logger.warning(f"无法返回上一级，当前路径: {self.current_path}, 父路径: {parent_path}")
+            self.logger.warning("已经在开始菜单根目录，无法返回上一级")
 
     def toggle_visibility(self, button_pos):
         """切换开始菜单的可见性"""
@@ -545,9 +656,10 @@ class StartMenu(QWidget):
             self.is_visible = False
             self.logger.debug("隐藏开始菜单")
         else:
-            # 重置当前路径为默认路径
-            self.current_path = self.default_start_menu_path
-            self.refresh_program_list()
+            self.open_started = time.perf_counter()
+            self.open_was_warm = self.is_warm()
+            if not self.open_was_warm:
+                self.reset_to_root()
             
             # 获取主屏幕
             primary_screen = self.display_manager.get_primary_screen()
@@ -565,16 +677,71 @@ class StartMenu(QWidget):
         """处理隐藏事件"""
         self.is_visible = False
         super().hideEvent(event)
+        # 回到事件循环空闲时为下次打开重新预热
+        QTimer.singleShot(0, self.prewarm)
 
+    def reset_to_root(self):
+        """重置为根文件夹并刷新程序列表和常用应用，程序列表只读取内存中的目录树"""
+        self.current_folder = ROOT_FOLDER
+        if self.is_showing_uwp_apps:
+            # 正在显示或加载UWP应用列表时一并退出，后台获取完成后只更新缓存
+            self.is_showing_uwp_apps = False
+            self.reset_uwp_button()
+        self.refresh_program_list()
+        self.refresh_frequent_apps()
+
+    def warm_state(self):
+        """
+        影响预热结果的界面状态: 启动记录的版本 (常用应用)、当前文件夹、是否显示UWP应用、
+        显示的是程序列表还是搜索结果以及列表滚动位置；目录树变化由 on_catalog_changed 清除 warm
+        """
+        return (get_frecency_store().revision, self.current_folder, self.is_showing_uwp_apps,
+                self.stacked_layout.currentIndex(), self.program_view.verticalScrollBar().value())
+
+    def is_warm(self):
+        """预热后目录树和启动记录都没有变化，用户也没有离开根文件夹的列表"""
+        return self.warm and self.warmed_state == self.warm_state()
+
+    def prewarm(self):
+        """
+        在隐藏状态下完成打开开始菜单所需的工作: 刷新列表、创建原生窗口、应用样式表、布局，
+        并在屏幕外绘制一次 (同时提交可见程序的图标提取)；打开时只需要移动和显示窗口
+        打开后没有改变任何状态就隐藏时跳过
+        """
+        if self.is_visible or self.is_warm():
+            return
+        start = time.perf_counter()
+        self.reset_to_root()
+        self.winId()
+        # grab() 会对未显示的部件执行 polish、激活布局并完整绘制一次
+        self.grab()
+        self.warm = True
+        self.warmed_state = self.warm_state()
+        self.logger.debug(f"开始菜单预热完成, 耗时 {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.open_started is not None and self.isVisible():
+            # 子部件在同一次绘制中随后绘制并刷新到屏幕，回到事件循环时首帧已完成
+            QTimer.singleShot(0, self.report_first_paint)
+
+    def report_first_paint(self):
+        """记录本次打开到首次绘制完成的耗时，并通过 first_painted 信号发出"""
+        if self.open_started is None:
+            return
+        elapsed = (time.perf_counter() - self.open_started) * 1000
+        self.open_started = None
+        state = "预热" if self.open_was_warm else "未预热"
+        if self.open_was_warm and elapsed > WARM_OPEN_TARGET_MS:
+            self.logger.warning(f"开始菜单首次绘制耗时 {elapsed:.1f} 毫秒 ({state}), 超过目标 {WARM_OPEN_TARGET_MS} 毫秒")
+        else:
+            self.logger.debug(f"开始菜单首次绘制耗时 {elapsed:.1f} 毫秒 ({state})")
+        self.first_painted.emit(elapsed, self.open_was_warm)
+        # 首帧完成后再在后台检查开始菜单是否有变化 (有变化时通过 changed 信号刷新)，扫描线程不与首帧争用 GIL
+        self.catalog.revalidate()
 
 
 
-    def find_program_list_scroll_area(self):
-        """查找程序列表的滚动区域"""
-        # 假设滚动区域是 main_layout 的第二个部件
-        # 这是一个比较脆弱的方法，如果布局结构改变，可能需要调整
-        # 更好的方法是在 init_ui 中保存 scroll_area 的引用
-        return self.scroll_area
 
     def handle_search_focus_in(self, search_edit, event):
         """处理搜索框获得焦点事件"""
@@ -590,6 +757,7 @@ class StartMenu(QWidget):
                 widget.setVisible(False)
         # 显示搜索结果列表
         self.stacked_layout.setCurrentIndex(1)
+        self.update_frequent_visibility()
         # 确保搜索组件的输入框获得焦点
         search_edit.setFocus()
         event.accept()
@@ -609,86 +777,57 @@ class StartMenu(QWidget):
                 widget = self.top_button_layout.itemAt(i).widget()
                 if widget:
                     widget.setVisible(True)
+            self.update_frequent_visibility()
         event.accept()
     
     def refresh_program_list(self):
-        """刷新程序列表"""
-        # 清除旧的程序列表
-        self.clear_program_buttons()
+        """刷新程序列表，只读取内存中的目录树"""
+        start = time.perf_counter()
 
         # 根据当前路径判断是否显示返回按钮
-        if self.current_path == self.default_start_menu_path:
+        if self.current_folder == ROOT_FOLDER:
             self.back_button.setVisible(False)
         else:
             self.back_button.setVisible(True)
 
-        # 确保 program_layout 已初始化
-        if not self.program_layout:
-            self.program_widget = QWidget()
-            self.program_layout = QGridLayout(self.program_widget)
-            self.program_widget.setLayout(self.program_layout)
-            self.program_layout.setContentsMargins(0, 0, 0, 0)
-            self.program_layout.setSpacing(10)
-            
-            # 找到程序列表区域，并设置其内容
-            scroll_area = self.find_program_list_scroll_area()
-            if scroll_area:
-                scroll_area.setWidget(self.program_widget)
-            else:
-                self.logger.error("未找到程序列表滚动区域。")
-
-        # 遍历当前目录
-        row = 0
-        col = 0
-        max_cols = 5 # Consistent with UWP app display
-
-        for item in os.listdir(self.current_path):
-            item_path = os.path.join(self.current_path, item)
-            name = os.path.splitext(item)[0]
-            
-            # 跳过名为 "UWP 应用" 的项，因为它已在顶部按钮栏
-            if name == "UWP 应用":
-                continue
-            
-            # 判断是文件夹还是程序
-            icon_type = "folder" if os.path.isdir(item_path) else "program"
-            
-            # 添加按钮
-            self.add_program_button(self.program_layout, row, col, name, icon_type, item_path)
-            
-            # 更新行列位置
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
+        # 跳过名为 "UWP 应用" 的项，因为它已在顶部按钮栏
+        items = [(name, "folder" if is_folder else "program", item_path)
+                 for name, is_folder, item_path in self.catalog.children(self.current_folder)
+                 if name != "UWP 应用"]
+        self.program_model.set_items(items)
+        self.program_view.scrollToTop()
+        self.report_program_list_refresh(len(items), start)
         
         # 确保显示程序列表
         self.stacked_layout.setCurrentIndex(0)
+        self.update_frequent_visibility()
+        
+    def render_svg(self, svg_content):
+        """把SVG渲染为32x32的高分辨率pixmap"""
+        # 将SVG内容转换为字节数据
+        svg_data = svg_content.encode('utf-8')
+        
+        # 创建SVG渲染器
+        renderer = QSvgRenderer(svg_data)
         
+        # 创建适配设备像素比的pixmap
+        pixmap = QPixmap(32, 32)
+        pixmap.fill(Qt.transparent)
+        
+        # 高质量抗锯齿渲染
+        painter = QPainter(pixmap)
+        painter.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
+        renderer.render(painter)
+        painter.end()
+        return pixmap
+
     def set_svg_icon(self, button, svg_content):
         """设置SVG图标并保持高分辨率渲染"""
         try:
-            # 将SVG内容转换为字节数据
-            svg_data = svg_content.encode('utf-8')
-            
-            # 创建SVG渲染器
-            renderer = QSvgRenderer(svg_data)
-            
-            # 创建适配设备像素比的pixmap
-            pixmap = QPixmap(32, 32)
-            pixmap.fill(Qt.transparent)
-            
-            # 高质量抗锯齿渲染
-            painter = QPainter(pixmap)
-            painter.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
-            renderer.render(painter)
-            painter.end()
-            
             # 创建图标并设置
-            icon = QIcon(pixmap)
-            button.setIcon(icon)
+            button.setIcon(self.svg_icon(svg_content))
             button.setIconSize(QSize(32, 32))
         except Exception as e:
             self.logger.error(f"SVG图标加载失败: {str(e)}")
             # 回退到系统图标
-            button.setIcon(QFileIconProvider().icon(QFileIconProvider.File))
\ No newline at end of file
+            button.setIcon(self.file_icon)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 开始菜单目录模块
+把公共和当前用户两个开始菜单根目录合并扫描为内存中的目录树并保存快照，
+打开开始菜单和进入文件夹只读取内存；后台线程通过目录修改时间判断是否需要重新扫描
+"""
+
+import os
+import json
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from scanner import RootScan, scan_roots, DEFAULT_ROOT_BUDGET
+from search_index import get_start_menu_paths
+
+CATALOG_VERSION = 1
+# 根文件夹的键
+ROOT_FOLDER = ""
+# 不在开始菜单中显示的文件
+HIDDEN_NAMES = {"desktop.ini"}
+
+
+def get_catalog_file():
+    return Settings.get_config_path("start_menu_catalog.json")
+
+
+class StartMenuCatalog(QObject):
+    """
+    开始菜单目录树
+    folders: 文件夹键 (相对于开始菜单根目录的路径，根文件夹为 "") -> [(名称, 是否文件夹, 目标)]，
+    文件夹的目标是子文件夹的键，程序的目标是快捷方式的完整路径；两个根目录中同名的文件夹合并显示
+    """
+
+    # 后台重新扫描后目录树发生变化 (在界面线程中接收)
+    changed = pyqtSignal()
+
+    def __init__(self, roots=None, catalog_file=None, parent=None):
+        super().__init__(parent)
+        self.roots = [root for root in (roots or get_start_menu_paths()) if root]
+        self.catalog_file = catalog_file or get_catalog_file()
+        self.folders = {ROOT_FOLDER: []}
+        self.dir_mtimes = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.revalidating = False
+
+    def children(self, folder=ROOT_FOLDER):
+        """返回文件夹的内容，只读取内存"""
+        return self.folders.get(folder, [])
+
+    def has_folder(self, folder):
+        return folder in self.folders
+
+    def scan(self):
+        """扫描所有根目录，返回 (folders, dir_mtimes)"""
+        scans = [RootScan(root, include_dirs=True) for root in self.roots]
+        scan_roots(scans, root_budget=Settings.get_setting("scan_root_budget", DEFAULT_ROOT_BUDGET))
+        children = {ROOT_FOLDER: {}}
+        dir_mtimes = {}
+        for scan in scans:
+            for name, path, is_dir, size, mtime in scan.entries:
+                if name.lower() in HIDDEN_NAMES:
+                    continue
+                parent = os.path.relpath(os.path.dirname(path), scan.path)
+                parent = ROOT_FOLDER if parent == os.curdir else parent
+                items = children.setdefault(parent, {})
+                if is_dir:
+                    key = os.path.join(parent, name) if parent else name
+                    children.setdefault(key, {})
+                    items[("folder", os.path.normcase(name))] = (name, True, key)
+                else:
+                    display_name = os.path.splitext(name)[0]
+                    items.setdefault(("program", os.path.normcase(name)), (display_name, False, path))
+            dir_mtimes.update(scan.dir_mtimes)
+            if scan.timed_out:
+                # 记录一个不可能的修改时间，下次检查时会重新扫描
+                dir_mtimes[scan.path] = -1
+        folders = {folder: sorted(items.values(), key=lambda item: (not item[1], item[0].casefold()))
+                   for folder, items in children.items()}
+        return folders, dir_mtimes
+
+    def build(self):
+        """重新扫描并保存快照，返回目录树是否发生变化"""
+        folders, dir_mtimes = self.scan()
+        changed = folders != self.folders
+        # 整体替换引用，界面线程读到的总是完整的目录树
+        self.folders = folders
+        self.dir_mtimes = dir_mtimes
+        self.loaded = True
+        self.save()
+        logger.info(f"开始菜单目录已重建: {len(folders)} 个文件夹, "
+                    f"{sum(len(items) for items in folders.values())} 个条目")
+        return changed
+
+    def is_stale(self):
+        """通过目录修改时间判断目录树是否过期，只 stat 目录而不重新列举"""
+        if not self.dir_mtimes:
+            return True
+        for directory, mtime in self.dir_mtimes.items():
+            try:
+                if os.path.getmtime(directory) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def load(self):
+        """从快照加载目录树，成功返回 True"""
+        try:
+            if not os.path.exists(self.catalog_file):
+                return False
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != CATALOG_VERSION or data.get("roots") != self.roots:
+                return False
+            self.folders = {folder: [tuple(item) for item in items] for folder, items in data["folders"].items()}
+            self.dir_mtimes = data["dir_mtimes"]
+            self.loaded = True
+            return True
+        except Exception as e:
+            logger.error(f"加载开始菜单目录失败: {e}")
+            return False
+
+    def save(self):
+        data = {
+            "version": CATALOG_VERSION,
+            "roots": self.roots,
+            "dir_mtimes": self.dir_mtimes,
+            "folders": self.folders,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.catalog_file), exist_ok=True)
+            tmp_file = self.catalog_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.catalog_file)
+        except Exception as e:
+            logger.error(f"保存开始菜单目录失败: {e}")
+
+    def revalidate(self):
+        """在后台线程中检查目录树是否过期，过期时重新扫描；已有检查在进行时直接返回"""
+        with self.lock:
+            if self.revalidating:
+                return
+            self.revalidating = True
+        threading.Thread(target=self._revalidate, name="start-menu-catalog", daemon=True).start()
+
+    def _revalidate(self):
+        try:
+            if (not self.loaded or self.is_stale()) and self.build():
+                self.changed.emit()
+        except Exception as e:
+            logger.error(f"刷新开始菜单目录失败: {e}")
+        finally:
+            with self.lock:
+                self.revalidating = False
+
+    def load_and_revalidate(self):
+        """加载快照后立即可用，再在后台检查是否过期 (没有快照时后台扫描完成后发出 changed)"""
+        self.load()
+        self.revalidate()
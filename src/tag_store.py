@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 标签存储模块
+用本地 SQLite 数据库保存文件的标签和自定义属性，按路径和文件编号(inode/file-id)定位文件，
+文件被重命名或移动后仍能找回原来的标签；搜索中的 tag: 和 meta: 过滤词只查询数据库索引
+"""
+
+import os
+import stat
+import sqlite3
+import threading
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from search_query import register_filter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path_key TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    file_key TEXT,
+    is_dir INTEGER,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS files_file_key ON files(file_key);
+CREATE TABLE IF NOT EXISTS tags (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (file_id, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags(tag COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS metadata (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    key TEXT NOT NULL COLLATE NOCASE,
+    value TEXT NOT NULL,
+    PRIMARY KEY (file_id, key)
+);
+CREATE INDEX IF NOT EXISTS metadata_key_value ON metadata(key COLLATE NOCASE, value);
+"""
+
+
+def path_key(path):
+    """统一路径写法，作为数据库中的查找键"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def file_stat(path):
+    """返回 os.stat 结果，无法访问时返回 None"""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def file_key(info):
+    """
+    由 os.stat 结果返回文件的唯一编号 "卷序列号:文件编号"，Windows 上对应 NTFS 的 file-id，
+    在同一卷内重命名或移动后保持不变；无法取得时返回 None
+    """
+    if info is None or not info.st_ino:
+        return None
+    return f"{info.st_dev}:{info.st_ino}"
+
+
+class TagStore:
+    """标签和自定义属性存储，所有方法都可以在任意线程调用"""
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or Settings.get_config_path("tags.db")
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        # 旧版本数据库没有这些列，旧记录的值为 NULL，下次写入标签或属性时补上
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(files)")}
+        for column, column_type in (("is_dir", "INTEGER"), ("size", "INTEGER"), ("mtime", "REAL")):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+        self.connection.commit()
+
+    def _find_file(self, path):
+        """
+        查找文件记录，返回 (记录编号或 None, 是否按文件编号找到, os.stat 结果或 None)，不修改数据库
+        先按路径查找；找不到时按文件编号查找 (文件在程序外被重命名过)，但只有记录的路径已不存在、
+        且大小和修改时间都与记录一致时才认为是同一个文件，避免新文件复用已删除文件的编号后继承其标签
+        """
+        row = self.connection.execute("SELECT id FROM files WHERE path_key = ?", (path_key(path),)).fetchone()
+        if row:
+            return row[0], False, None
+        info = file_stat(path)
+        identity = file_key(info)
+        if identity:
+            rows = self.connection.execute("SELECT id, path, size, mtime FROM files WHERE file_key = ?", (identity,))
+            for file_id, old_path, size, mtime in rows.fetchall():
+                if size == info.st_size and mtime == info.st_mtime and not os.path.exists(old_path):
+                    return file_id, True, info
+        return None, False, info
+
+    def _file_id(self, path, create=False):
+        """
+        写入前查找文件记录，按文件编号找到时把记录的路径更新为新路径
+        create 为 True 时 (写入标签或属性) 为新文件创建记录，并记录是否为目录、文件编号、大小和修改时间，
+        搜索时不需要再访问文件系统
+        """
+        file_id, moved, info = self._find_file(path)
+        if moved:
+            self.connection.execute("UPDATE files SET path_key = ?, path = ? WHERE id = ?",
+                                    (path_key(path), path, file_id))
+            logger.info(f"标签记录已跟随重命名: {path}")
+        if not create:
+            return file_id
+        if info is None:
+            info = file_stat(path)
+        is_dir = info is not None and stat.S_ISDIR(info.st_mode)
+        size = info.st_size if info is not None else None
+        mtime = info.st_mtime if info is not None else None
+        if file_id is not None:
+            self.connection.execute("UPDATE files SET file_key = ?, is_dir = ?, size = ?, mtime = ? WHERE id = ?",
+                                    (file_key(info), is_dir, size, mtime, file_id))
+            return file_id
+        cursor = self.connection.execute(
+            "INSERT INTO files (path_key, path, file_key, is_dir, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            (path_key(path), path, file_key(info), is_dir, size, mtime))
+        return cursor.lastrowid
+
+    def add_tag(self, path, tag):
+        tag = tag.strip()
+        if not tag:
+            return
+        with self.lock, self.connection:
+            file_id = self._file_id(path, create=True)
+            self.connection.execute("INSERT OR IGNORE INTO tags (file_id, tag) VALUES (?, ?)", (file_id, tag))
+
+    def remove_tag(self, path, tag):
+        with self.lock, self.connection:
+            file_id = self._file_id(path)
+            if file_id is not None:
+                self.connection.execute("DELETE FROM tags WHERE file_id = ? AND tag = ?", (file_id, tag))
+
+    def get_tags(self, path):
+        """返回文件的标签列表"""
+        with self.lock:
+            file_id = self._find_file(path)[0]
+            if file_id is None:
+                return []
+            rows = self.connection.execute("SELECT tag FROM tags WHERE file_id = ? ORDER BY tag", (file_id,))
+            return [row[0] for row in rows]
+
+    def all_tags(self):
+        """返回 [(标签, 文件数)]，按使用次数从多到少排列"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT tag, COUNT(*) FROM tags GROUP BY tag COLLATE NOCASE ORDER BY COUNT(*) DESC, tag")
+            return rows.fetchall()
+
+    def set_metadata(self, path, key, value):
+        """设置自定义属性，value 为空时删除该属性"""
+        key = key.strip()
+        if not key:
+            return
+        with self.lock, self.connection:
+            file_id = self._file_id(path, create=bool(value))
+            if file_id is None:
+                return
+            if value:
+                self.connection.execute("INSERT OR REPLACE INTO metadata (file_id, key, value) VALUES (?, ?, ?)",
+                                        (file_id, key, value))
+            else:
+                self.connection.execute("DELETE FROM metadata WHERE file_id = ? AND key = ?", (file_id, key))
+
+    def get_metadata(self, path):
+        """返回文件的自定义属性字典"""
+        with self.lock:
+            file_id = self._find_file(path)[0]
+            if file_id is None:
+                return {}
+            rows = self.connection.execute("SELECT key, value FROM metadata WHERE file_id = ? ORDER BY key",
+                                           (file_id,))
+            return dict(rows.fetchall())
+
+    def move_path(self, old_path, new_path):
+        """文件在程序内被重命名或移动时更新记录 (目录下所有文件的记录一并更新)"""
+        old_key = path_key(old_path)
+        new_key = path_key(new_path)
+        with self.lock, self.connection:
+            rows = self.connection.execute(
+                "SELECT id, path_key, path FROM files WHERE path_key = ? OR path_key LIKE ? ESCAPE '\\'",
+                (old_key, escape_like(old_key + os.sep) + "%")).fetchall()
+            for file_id, key, path in rows:
+                self.connection.execute("UPDATE files SET path_key = ?, path = ? WHERE id = ?",
+                                        (new_key + key[len(old_key):], new_path + path[len(old_path):], file_id))
+
+    def remove_path(self, path):
+        """文件被删除时移除其记录 (外键级联删除标签和属性)"""
+        key = path_key(path)
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM files WHERE path_key = ? OR path_key LIKE ? ESCAPE '\\'",
+                                    (key, escape_like(key + os.sep) + "%"))
+
+    def paths_with_tags(self, tags):
+        """返回带有任一标签的文件 [(路径, 是否目录)]，只查询 tags 表的索引"""
+        tags = [tag.strip() for tag in tags if tag.strip()]
+        if not tags:
+            return []
+        placeholders = ", ".join("?" * len(tags))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT DISTINCT files.path, files.is_dir FROM tags JOIN files ON files.id = tags.file_id "
+                f"WHERE tags.tag IN ({placeholders})", tags)
+            return [(path, bool(is_dir)) for path, is_dir in rows]
+
+    def paths_with_metadata(self, key, value=None):
+        """返回具有某个属性 (以及指定值) 的文件 [(路径, 是否目录)]"""
+        with self.lock:
+            if value is None:
+                rows = self.connection.execute(
+                    "SELECT files.path, files.is_dir FROM metadata JOIN files ON files.id = metadata.file_id "
+                    "WHERE metadata.key = ?", (key,))
+            else:
+                rows = self.connection.execute(
+                    "SELECT files.path, files.is_dir FROM metadata JOIN files ON files.id = metadata.file_id "
+                    "WHERE metadata.key = ? AND metadata.value = ?", (key, value))
+            return [(path, bool(is_dir)) for path, is_dir in rows]
+
+
+def escape_like(text):
+    """转义 LIKE 模式中的通配符"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_tag_store():
+    """获取全局共用的标签存储实例"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TagStore()
+        return _store
+
+
+# 由本模块注册的过滤词
+TAG_FILTERS = ("tag", "meta")
+
+
+def tagged_paths(name, value):
+    """返回 tag:/meta: 过滤词对应的文件 [(路径, 是否目录)]"""
+    store = get_tag_store()
+    if name == "tag":
+        # tag:a,b 表示带有 a 或 b 标签
+        return store.paths_with_tags(value.split(","))
+    key, sep, meta_value = value.partition("=")
+    return store.paths_with_metadata(key, meta_value if sep else None)
+
+
+def compile_tag_filter(index, value, name="tag"):
+    """编译 tag: 过滤词：先从数据库取出带标签的路径，再按索引中的路径列判断"""
+    try:
+        paths = {path_key(path) for path, is_dir in tagged_paths(name, value)}
+    except Exception as e:
+        logger.error(f"查询标签失败: {e}")
+        paths = set()
+    column = index.paths
+    return lambda i: path_key(column[i]) in paths
+
+
+def compile_meta_filter(index, value):
+    """编译 meta:键=值 (或 meta:键) 过滤词"""
+    return compile_tag_filter(index, value, "meta")
+
+
+register_filter("tag", compile_tag_filter)
+register_filter("meta", compile_meta_filter)
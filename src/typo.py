@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 容错搜索模块
+参照 SymSpell 为索引中的单词建立删除字典，在精确和模糊匹配结果太少时按编辑距离纠正拼写错误
+"""
+
+import re
+import time
+from log import get_logger
+
+logger = get_logger()
+
+# 单词切分：按非字母数字字符分隔
+WORD_PATTERN = re.compile(r'\w+')
+# 参与纠错的最短单词长度
+MIN_WORD_LENGTH = 3
+# 超过该长度的单词不生成删除变体，只能精确命中
+MAX_WORD_LENGTH = 24
+
+
+def max_distance_for(word):
+    """短单词只允许 1 处错误，较长的单词允许 2 处"""
+    return 1 if len(word) <= 4 else 2
+
+
+def deletes(word, distance):
+    """生成删除 1..distance 个字符得到的所有变体"""
+    result = set()
+    frontier = {word}
+    for _ in range(distance):
+        next_frontier = set()
+        for variant in frontier:
+            if len(variant) <= 1:
+                continue
+            for i in range(len(variant)):
+                next_frontier.add(variant[:i] + variant[i + 1:])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(a, b, limit):
+    """
+    计算限定的 Damerau-Levenshtein (OSA) 距离，相邻字符交换算一次编辑
+    距离超过 limit 时提前返回 limit + 1
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TypoIndex:
+    """
+    单词级的删除字典
+    索引侧只保存删除 1 个字符的变体，查询侧生成删除至多 2 个字符的变体，
+    两侧变体相同即为候选，最后用编辑距离确认；这样可以覆盖替换、插入、删除和相邻交换
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.revision = None
+        self.words = {}     # 单词 -> 包含该单词的条目编号列表
+        self.deletes = {}   # 删除 1 个字符的变体 -> 原单词列表
+
+    def build(self):
+        """从搜索索引的匹配键(以及拼音全拼)中收集单词并建立删除字典"""
+        start = time.perf_counter()
+        index = self.index
+        words = {}
+        for entry_id, key in enumerate(index.keys):
+            entry_words = set(WORD_PATTERN.findall(key))
+            alternatives = index.alt_keys[entry_id]
+            if alternatives:
+                # 拼音全拼也参与纠错，例如 "weixn" -> "weixin"
+                entry_words.update(WORD_PATTERN.findall(alternatives[1][0][0]))
+            for word in entry_words:
+                if len(word) >= MIN_WORD_LENGTH:
+                    words.setdefault(word, []).append(entry_id)
+        delete_map = {}
+        for word in words:
+            if len(word) > MAX_WORD_LENGTH:
+                continue
+            for variant in deletes(word, 1):
+                delete_map.setdefault(variant, []).append(word)
+        self.words = words
+        self.deletes = delete_map
+        self.revision = index.revision
+        logger.debug(f"容错索引已建立: {len(words)} 个单词, {len(delete_map)} 个删除变体, "
+                     f"耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def ensure_built(self):
+        """索引内容变化后重建"""
+        if self.revision != self.index.revision:
+            self.build()
+
+    def lookup(self, word, deadline):
+        """返回与 word 编辑距离在允许范围内的单词: {单词: 距离}"""
+        limit = max_distance_for(word)
+        candidates = set()
+        for variant in deletes(word, limit) | {word}:
+            if variant in self.words:
+                candidates.add(variant)
+            candidates.update(self.deletes.get(variant, ()))
+            if time.perf_counter() > deadline:
+                break
+        result = {}
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                result[candidate] = distance
+            if time.perf_counter() > deadline:
+                break
+        return result
+
+    def search(self, text, limit, deadline, predicate=None):
+        """
+        按单词纠错查找条目，每个查询单词都必须在条目中找到近似单词
+        返回按 (总距离, 类型优先级) 排序的条目编号，超过截止时间时返回已有结果
+        """
+        query_words = [word for word in WORD_PATTERN.findall(text) if len(word) >= MIN_WORD_LENGTH]
+        if not query_words:
+            return []
+        self.ensure_built()
+
+        distances = None  # 条目编号 -> 累计距离
+        for word in query_words:
+            matches = self.lookup(word, deadline)
+            word_distances = {}
+            for candidate, distance in matches.items():
+                for entry_id in self.words[candidate]:
+                    if distance < word_distances.get(entry_id, distance + 1):
+                        word_distances[entry_id] = distance
+            if distances is None:
+                distances = word_distances
+            else:
+                distances = {entry_id: distances[entry_id] + distance
+                             for entry_id, distance in word_distances.items() if entry_id in distances}
+            if not distances or time.perf_counter() > deadline:
+                break
+        if not distances:
+            return []
+
+        types = self.index.types
+        entry_ids = [entry_id for entry_id in distances if predicate is None or predicate(entry_id)]
+        entry_ids.sort(key=lambda entry_id: (distances[entry_id], types[entry_id] != "app", entry_id))
+        return entry_ids[:limit]
@@ -1,3 +1,5 @@
+import os
+import time
 import subprocess
 import asyncio
 from PyQt5.QtCore import QThread, pyqtSignal
@@ -5,27 +7,64 @@ import json
 from log import get_logger
 
 logger = get_logger()
+from settings import Settings
 
-async def get_uwp_apps_async():
+# 获取 UWP 应用列表的默认命令，可以用设置 uwp_list_command 替换 (命令需输出含 Name 和 AppID 的 JSON)
+DEFAULT_UWP_COMMAND = ('powershell -NoProfile -Command '
+                       '"[Console]::OutputEncoding = [Text.Encoding]::UTF8; Get-StartApps | ConvertTo-Json"')
+# UWP 应用列表缓存文件格式版本
+UWP_CACHE_VERSION = 1
+# 缓存超过该时间(秒)后，打开 UWP 应用列表时在后台重新获取，可以用设置 uwp_cache_ttl 修改
+DEFAULT_UWP_CACHE_TTL = 6 * 3600
+
+
+def unique_apps(apps):
+    """按 AppID 去重 (Get-StartApps 可能返回重复的 AppID)，保留第一次出现的顺序"""
+    seen = set()
+    result = []
+    for app in apps:
+        if app['appid'] not in seen:
+            seen.add(app['appid'])
+            result.append(app)
+    return result
+
+
+def get_uwp_ttl():
+    """读取缓存 TTL (秒)，设置值无效时使用默认值"""
+    try:
+        return float(Settings.get_setting("uwp_cache_ttl", DEFAULT_UWP_CACHE_TTL))
+    except (TypeError, ValueError):
+        logger.warning("设置 uwp_cache_ttl 无效，使用默认值")
+        return DEFAULT_UWP_CACHE_TTL
+
+
+def get_uwp_command():
+    return Settings.get_setting("uwp_list_command", DEFAULT_UWP_COMMAND) or DEFAULT_UWP_COMMAND
+
+
+async def get_uwp_apps_async(command=None):
     """
     异步获取所有UWP应用列表
-    Returns: list of dict {name: 应用名称, appid: 应用ID}
+    Returns: list of dict {name: 应用名称, appid: 应用ID}，失败时返回 None
     """
     try:
-        cmd = 'Get-StartApps | ConvertTo-Json'
+        cmd = command or get_uwp_command()
         # 使用 asyncio.create_subprocess_shell 替代 subprocess.run 实现异步执行
         proc = await asyncio.create_subprocess_shell(
-            f'powershell -Command "{cmd}"',
+            cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
         stdout, stderr = await proc.communicate()
         
         if proc.returncode != 0:
-            logger.error(f"获取UWP应用失败: {stderr.decode().strip()}")
-            return []
+            logger.error(f"获取UWP应用失败: {stderr.decode(errors='ignore').strip()}")
+            return None
 
-        output = stdout.decode('gbk', errors='ignore').strip()
+        try:
+            output = stdout.decode('utf-8-sig').strip()
+        except UnicodeDecodeError:
+            output = stdout.decode('gbk', errors='ignore').strip()
         # 过滤空行和重复项
         filtered_output = [line for line in output.split('\n') if line.strip() and not line.startswith('---')]
         
@@ -37,23 +76,81 @@ async def get_uwp_apps_async():
             apps = json.loads('\n'.join(filtered_output))
         except json.JSONDecodeError as e:
             logger.error(f"解析UWP应用JSON失败: {e}\n原始输出:\n{output}")
-            return []
+            return None
 
-        return [{'name': app['Name'], 'appid': app['AppID']} for app in apps]
+        # 只有一个应用时 ConvertTo-Json 输出的是对象而不是数组
+        if isinstance(apps, dict):
+            apps = [apps]
+        return unique_apps([{'name': app['Name'], 'appid': app['AppID']} for app in apps])
     except Exception as e:
         logger.error(f"获取UWP应用失败: {str(e)}")
-        return []
+        return None
+
+
+class UWPAppCache:
+    """UWP 应用列表缓存，打开列表时立即显示上次获取的结果，超过 TTL 后才在后台重新获取"""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file or Settings.get_config_path("uwp_apps.json")
+        self.apps = None  # 没有缓存时为 None
+        self.fetched_at = 0
+        self.load()
+
+    def load(self):
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != UWP_CACHE_VERSION:
+                return
+            self.apps = unique_apps(data["apps"])
+            self.fetched_at = data["fetched_at"]
+        except Exception as e:
+            logger.error(f"加载UWP应用缓存失败: {e}")
+
+    def save(self, apps):
+        """保存新获取的列表"""
+        apps = unique_apps(apps)
+        self.apps = apps
+        self.fetched_at = time.time()
+        data = {"version": UWP_CACHE_VERSION, "fetched_at": self.fetched_at, "apps": apps}
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"保存UWP应用缓存失败: {e}")
+
+    def is_stale(self, now=None):
+        """没有缓存或缓存超过 TTL 时需要重新获取"""
+        if self.apps is None:
+            return True
+        ttl = get_uwp_ttl()
+        return (now or time.time()) - self.fetched_at > ttl
+
 
 class UWPAppFetcher(QThread):
     finished = pyqtSignal(list)
     error = pyqtSignal(str)
 
+    def __init__(self, command=None, parent=None):
+        super().__init__(parent)
+        # 为 None 时使用设置中的命令，测试时可以传入输出假数据的命令
+        self.command = command
+
     def run(self):
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            apps = loop.run_until_complete(get_uwp_apps_async())
-            self.finished.emit(apps)
+            apps = loop.run_until_complete(get_uwp_apps_async(self.command))
+            loop.close()
+            if apps is None:
+                self.error.emit("获取UWP应用列表失败")
+            else:
+                self.finished.emit(apps)
         except Exception as e:
             self.error.emit(str(e))
 
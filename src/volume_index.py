@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 全盘文件索引模块
+可选地为整个磁盘或指定目录建立紧凑的列式文件名索引 (类似 Everything)：
+所有名称保存在一个 UTF-8 字节块中，另有偏移、父目录编号、大小和修改时间数组
+"""
+
+import os
+import json
+import time
+import struct
+import bisect
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from log import get_logger
+
+logger = get_logger()
+from settings import Settings
+from fuzzy_match import normalize_key
+
+# 索引文件格式
+VOLUME_INDEX_MAGIC = b"BXVI"
+VOLUME_INDEX_VERSION = 2
+# 父目录编号的特殊值：根目录没有父目录，已删除的条目等待压缩
+NO_PARENT = -1
+DELETED = -2
+# 目录在大小列中记为 -1
+DIRECTORY_SIZE = -1
+# 并行扫描的线程数
+SCAN_WORKERS = 8
+# 核对目录修改时间时每个任务处理的目录数
+STAT_CHUNK_SIZE = 256
+# 已删除条目超过该比例时保存前压缩
+COMPACT_RATIO = 0.1
+
+
+def default_roots():
+    """未指定目录时索引所有本地固定磁盘"""
+    try:
+        import psutil
+        roots = [partition.mountpoint for partition in psutil.disk_partitions(all=False)
+                 if os.name != 'nt' or 'fixed' in partition.opts]
+        if roots:
+            return roots
+    except Exception as e:
+        logger.error(f"获取磁盘列表失败: {e}")
+    return [os.path.abspath(os.sep)]
+
+
+def get_volume_roots():
+    """从设置读取需要索引的目录，多个目录用分号分隔"""
+    roots = Settings.get_setting("volume_index_roots", "")
+    if isinstance(roots, str):
+        roots = [root.strip() for root in roots.split(";")]
+    roots = [root for root in roots if root]
+    return roots or default_roots()
+
+
+def scan_directory(path):
+    """
+    在工作线程中列举一个目录的直接子项
+    返回 (目录修改时间, [(名称, 是否目录, 大小, 修改时间, 是否进入)])，目录无法访问时返回 None
+    """
+    try:
+        # 先取目录的修改时间再列举，列举期间发生的变化会在下次核对时发现
+        dir_mtime = os.stat(path).st_mtime
+        children = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                # 符号链接和目录联接只记录本身，不进入，避免重复索引或循环
+                recurse = is_dir and not entry.is_symlink() and not getattr(entry, 'is_junction', bool)()
+                children.append((entry.name, is_dir, DIRECTORY_SIZE if is_dir else stat.st_size,
+                                 stat.st_mtime, recurse))
+        return dir_mtime, children
+    except OSError as e:
+        logger.debug(f"跳过无法访问的目录 '{path}': {e}")
+        return None
+
+
+def stat_mtimes(paths):
+    """返回每个路径的修改时间，无法访问的路径返回 None"""
+    result = []
+    for path in paths:
+        try:
+            result.append(os.stat(path).st_mtime)
+        except OSError:
+            result.append(None)
+    return result
+
+
+class VolumeIndex:
+    """
+    列式文件名索引
+    条目 i 的名称位于 name_blob[offsets[i]:offsets[i + 1] - 1]，每个名称后有一个 \\0 分隔符；
+    key_blob 保存 normalize_key 处理后的名称用于子串查找，与主搜索索引使用相同的匹配键；
+    规范化可能改变字节长度 (全角转半角、ß 转 ss 等)，因此 key_blob 使用单独的 key_offsets；
+    完整路径沿 parents 数组向上拼接得到，父目录的编号总是小于子项
+    """
+
+    def __init__(self, roots=None, index_file=None):
+        self.roots = list(roots) if roots is not None else get_volume_roots()
+        self.index_file = index_file or Settings.get_config_path("volume_index.bin")
+        self._cancelled = threading.Event()
+        self.clear()
+
+    def clear(self):
+        """清空索引内容"""
+        self.name_blob = bytearray()
+        self.key_blob = bytearray()
+        self.offsets = array('I', [0])
+        self.key_offsets = array('I', [0])
+        self.parents = array('i')
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.deleted_count = 0
+
+    def __len__(self):
+        return len(self.parents)
+
+    def cancel(self):
+        """通知正在进行的扫描尽快停止"""
+        self._cancelled.set()
+
+    def append(self, name, parent, size, mtime):
+        """追加一个条目，返回条目编号"""
+        self.name_blob += name.encode('utf-8', 'surrogatepass')
+        self.name_blob.append(0)
+        self.key_blob += normalize_key(name).encode('utf-8', 'surrogatepass')
+        self.key_blob.append(0)
+        self.offsets.append(len(self.name_blob))
+        self.key_offsets.append(len(self.key_blob))
+        self.parents.append(parent)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        return len(self.parents) - 1
+
+    def name(self, entry_id):
+        """返回条目名称 (根目录的名称就是其完整路径)"""
+        return self.name_blob[self.offsets[entry_id]:self.offsets[entry_id + 1] - 1].decode('utf-8', 'surrogatepass')
+
+    def path(self, entry_id):
+        """沿父目录编号拼接完整路径"""
+        parts = []
+        while entry_id >= 0:
+            parts.append(self.name(entry_id))
+            entry_id = self.parents[entry_id]
+        return os.path.join(*reversed(parts))
+
+    def is_dir(self, entry_id):
+        return self.sizes[entry_id] == DIRECTORY_SIZE
+
+    def build(self):
+        """并行扫描所有根目录，重建索引"""
+        start = time.perf_counter()
+        self.clear()
+        directories = []
+        for root in self.roots:
+            try:
+                root_mtime = os.stat(root).st_mtime
+            except OSError as e:
+                logger.warning(f"无法访问索引目录 '{root}': {e}")
+                continue
+            directories.append((self.append(root, NO_PARENT, DIRECTORY_SIZE, root_mtime), root))
+        self.scan_tree(directories)
+        logger.info(f"全盘文件索引已重建: {len(self)} 个条目, 名称 {len(self.name_blob) / 1024 / 1024:.1f} MB, "
+                    f"耗时 {time.perf_counter() - start:.1f} 秒")
+
+    def scan_tree(self, directories):
+        """
+        以线程池并行列举目录树，directories 为 [(目录编号, 路径)]
+        结果在当前线程中按完成顺序追加，子目录继续提交给线程池
+        """
+        if not directories:
+            return
+        executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="volume-scan")
+        try:
+            pending = {executor.submit(scan_directory, path): (dir_id, path) for dir_id, path in directories}
+            while pending:
+                if self._cancelled.is_set():
+                    logger.info("全盘文件索引扫描已取消")
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_id, path = pending.pop(future)
+                    result = future.result()
+                    if result is None:
+                        continue
+                    dir_mtime, children = result
+                    self.mtimes[dir_id] = dir_mtime
+                    for name, is_dir, size, mtime, recurse in children:
+                        child_id = self.append(name, dir_id, size, mtime)
+                        if recurse:
+                            child_path = os.path.join(path, name)
+                            pending[executor.submit(scan_directory, child_path)] = (child_id, child_path)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def directory_paths(self):
+        """返回 {目录编号: 完整路径}，父目录编号较小，因此一次顺序遍历即可"""
+        parents = self.parents
+        sizes = self.sizes
+        paths = {}
+        for entry_id in range(len(parents)):
+            if sizes[entry_id] != DIRECTORY_SIZE:
+                continue
+            parent = parents[entry_id]
+            if parent == NO_PARENT:
+                paths[entry_id] = self.name(entry_id)
+            elif parent in paths:
+                paths[entry_id] = os.path.join(paths[parent], self.name(entry_id))
+        return paths
+
+    def reconcile(self):
+        """
+        启动时与磁盘核对：并行 stat 所有目录，只重新列举修改时间变化的目录
+        返回发生变化的目录数量
+        """
+        start = time.perf_counter()
+        dir_paths = self.directory_paths()
+        dir_ids = list(dir_paths)
+        chunks = [[dir_paths[dir_id] for dir_id in dir_ids[i:i + STAT_CHUNK_SIZE]]
+                  for i in range(0, len(dir_ids), STAT_CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="volume-stat") as executor:
+            current = [mtime for chunk in executor.map(stat_mtimes, chunks) for mtime in chunk]
+        # 已经不存在的目录由其父目录的重新列举处理
+        changed = [dir_id for dir_id, mtime in zip(dir_ids, current)
+                   if mtime is not None and mtime != self.mtimes[dir_id]]
+        if not changed:
+            logger.info(f"全盘文件索引与磁盘一致: 核对 {len(dir_ids)} 个目录, "
+                        f"耗时 {time.perf_counter() - start:.1f} 秒")
+            return 0
+
+        children = {}
+        parents = self.parents
+        for entry_id in range(len(parents)):
+            if parents[entry_id] >= 0:
+                children.setdefault(parents[entry_id], []).append(entry_id)
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="volume-scan") as executor:
+            results = list(executor.map(scan_directory, [dir_paths[dir_id] for dir_id in changed]))
+
+        new_directories = []
+        for dir_id, result in zip(changed, results):
+            # 按编号从小到大处理，父目录先处理；所在子树已被删除的目录直接跳过
+            if result is None or parents[dir_id] == DELETED:
+                continue
+            dir_mtime, listing = result
+            existing = {self.name(child_id): child_id for child_id in children.get(dir_id, ())
+                        if parents[child_id] != DELETED}
+            for name, is_dir, size, mtime, recurse in listing:
+                child_id = existing.pop(name, None)
+                if child_id is not None and self.is_dir(child_id) == is_dir:
+                    if not is_dir:
+                        self.sizes[child_id] = size
+                        self.mtimes[child_id] = mtime
+                    continue
+                if child_id is not None:
+                    self.delete_subtree(child_id, children)
+                child_id = self.append(name, dir_id, size, mtime)
+                if recurse:
+                    new_directories.append((child_id, os.path.join(dir_paths[dir_id], name)))
+            for child_id in existing.values():
+                self.delete_subtree(child_id, children)
+            self.mtimes[dir_id] = dir_mtime
+        self.scan_tree(new_directories)
+        logger.info(f"全盘文件索引已更新: {len(changed)} 个目录发生变化, "
+                    f"耗时 {time.perf_counter() - start:.1f} 秒")
+        return len(changed)
+
+    def delete_subtree(self, entry_id, children):
+        """把条目及其所有子项标记为已删除，保存前压缩时真正移除"""
+        stack = [entry_id]
+        while stack:
+            current = stack.pop()
+            if self.parents[current] == DELETED:
+                continue
+            self.parents[current] = DELETED
+            self.deleted_count += 1
+            stack.extend(children.get(current, ()))
+
+    def compact(self):
+        """移除已删除的条目并重新编号"""
+        if not self.deleted_count:
+            return
+        old = (self.name_blob, self.key_blob, self.offsets, self.key_offsets, self.parents, self.sizes, self.mtimes)
+        name_blob, key_blob, offsets, key_offsets, parents, sizes, mtimes = old
+        self.clear()
+        new_ids = {}
+        for entry_id in range(len(parents)):
+            parent = parents[entry_id]
+            if parent == DELETED or (parent != NO_PARENT and parent not in new_ids):
+                continue
+            self.name_blob += name_blob[offsets[entry_id]:offsets[entry_id + 1]]
+            self.key_blob += key_blob[key_offsets[entry_id]:key_offsets[entry_id + 1]]
+            self.offsets.append(len(self.name_blob))
+            self.key_offsets.append(len(self.key_blob))
+            self.parents.append(new_ids[parent] if parent != NO_PARENT else NO_PARENT)
+            self.sizes.append(sizes[entry_id])
+            self.mtimes.append(mtimes[entry_id])
+            new_ids[entry_id] = len(self.parents) - 1
+
+    def query(self, text, limit):
+        """
+        返回名称包含 text 中所有词(不区分大小写和全角半角)的条目编号，最多 limit 个
+        用 bytearray.find 在匹配键字节块中查找最长的词，命中位置通过 key_offsets 二分定位到条目
+        """
+        words = sorted({word.encode('utf-8', 'surrogatepass') for word in normalize_key(text).split()},
+                       key=len, reverse=True)
+        if not words or limit <= 0:
+            return []
+        needle, others = words[0], words[1:]
+        blob = self.key_blob
+        offsets = self.key_offsets
+        parents = self.parents
+        result = []
+        position = 0
+        while len(result) < limit:
+            position = blob.find(needle, position)
+            if position < 0:
+                break
+            entry_id = bisect.bisect_right(offsets, position) - 1
+            end = offsets[entry_id + 1]
+            if parents[entry_id] != DELETED and (
+                    not others or all(word in blob[offsets[entry_id]:end] for word in others)):
+                result.append(entry_id)
+            # 同一条目只命中一次，从下一个名称继续查找
+            position = end
+        return result
+
+    def save(self):
+        """压缩后以二进制格式保存：魔数、头部 JSON 长度、头部 JSON、各列原始字节"""
+        if self.deleted_count > len(self) * COMPACT_RATIO:
+            self.compact()
+        columns = [self.name_blob, self.key_blob, self.offsets.tobytes(), self.key_offsets.tobytes(),
+                   self.parents.tobytes(), self.sizes.tobytes(), self.mtimes.tobytes()]
+        header = json.dumps({
+            "version": VOLUME_INDEX_VERSION,
+            "roots": self.roots,
+            "lengths": [len(column) for column in columns],
+            "deleted": self.deleted_count,
+        }).encode('utf-8')
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(VOLUME_INDEX_MAGIC)
+                f.write(struct.pack('<I', len(header)))
+                f.write(header)
+                for column in columns:
+                    f.write(column)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            logger.error(f"保存全盘文件索引失败: {e}")
+
+    def load(self):
+        """从磁盘加载索引，成功返回 True"""
+        try:
+            if not os.path.exists(self.index_file):
+                return False
+            with open(self.index_file, 'rb') as f:
+                if f.read(4) != VOLUME_INDEX_MAGIC:
+                    return False
+                header_length, = struct.unpack('<I', f.read(4))
+                header = json.loads(f.read(header_length).decode('utf-8'))
+                if header.get("version") != VOLUME_INDEX_VERSION or header.get("roots") != self.roots:
+                    logger.info("全盘文件索引版本或目录已变化，需要重建")
+                    return False
+                columns = [f.read(length) for length in header["lengths"]]
+            if any(len(column) != length for column, length in zip(columns, header["lengths"])):
+                logger.warning("全盘文件索引文件不完整，需要重建")
+                return False
+            self.clear()
+            self.name_blob = bytearray(columns[0])
+            self.key_blob = bytearray(columns[1])
+            self.offsets = array('I')
+            self.offsets.frombytes(columns[2])
+            self.key_offsets = array('I')
+            self.key_offsets.frombytes(columns[3])
+            self.parents.frombytes(columns[4])
+            self.sizes.frombytes(columns[5])
+            self.mtimes.frombytes(columns[6])
+            self.deleted_count = header.get("deleted", 0)
+            logger.info(f"已加载全盘文件索引: {len(self)} 个条目")
+            return True
+        except Exception as e:
+            logger.error(f"加载全盘文件索引失败: {e}")
+            self.clear()
+            return False
+
+    def load_or_build(self):
+        """加载磁盘上的索引并与磁盘核对，没有可用的索引时全量扫描"""
+        if self.load():
+            if self.reconcile() and not self._cancelled.is_set():
+                self.save()
+        else:
+            self.build()
+            if not self._cancelled.is_set():
+                self.save()
+        return self
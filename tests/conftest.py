@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 测试公共设置
+把 src 加入导入路径；配置和日志目录指向临时目录，测试不会写入仓库中的 Config/ 和 logs/
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+RUNTIME_DIR = tempfile.mkdtemp(prefix="betterexplorer_test_")
+os.environ.setdefault("BETTEREXPLORER_CONFIG_DIR", os.path.join(RUNTIME_DIR, "Config"))
+os.environ.setdefault("BETTEREXPLORER_LOG_DIR", os.path.join(RUNTIME_DIR, "logs"))
+# 没有显示器的环境 (CI、Linux) 下也能创建 Qt 对象
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """测试共用的 QApplication (工作线程的信号需要事件循环才能送达)"""
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
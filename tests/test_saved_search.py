@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 虚拟文件夹测试
+"""
+
+import os
+import time
+import threading
+
+import pytest
+
+from search_query import QueryError
+from saved_search import LiveFolder, add_saved_search, load_saved_searches, validate_query, write_search_file
+
+
+@pytest.mark.parametrize("query", ["tag:工作", "meta:作者=张三 ext:docx", "report content:TODO"])
+def test_rejects_filters_live_folders_cannot_apply(query, tmp_path):
+    with pytest.raises(QueryError):
+        validate_query(query)
+    with pytest.raises(QueryError):
+        write_search_file(str(tmp_path), "x", query)
+    with pytest.raises(QueryError):
+        LiveFolder("x", query)
+
+
+def test_saves_supported_query(tmp_path, monkeypatch):
+    monkeypatch.setenv("BETTEREXPLORER_CONFIG_DIR", str(tmp_path))
+    query = 'under:"C:\\Program Files" ext:log modified:<1d'
+    add_saved_search("logs", query)
+    assert load_saved_searches() == [{"name": "logs", "query": query}]
+    with pytest.raises(QueryError):
+        add_saved_search("tagged", "tag:a")
+    assert [search["name"] for search in load_saved_searches()] == ["logs"]
+
+
+def wait_until(qapp, condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        qapp.processEvents()
+        time.sleep(0.01)
+
+
+def test_new_directory_is_scanned_in_background(qapp, tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.txt").write_text("")
+    folder = LiveFolder("logs", f'under:"{root}" ext:txt')
+    walked = []
+    walk_tree = folder.walk_tree
+
+    def record_walk(directory):
+        walked.append((directory, threading.current_thread() is threading.main_thread()))
+        return walk_tree(directory)
+    folder.walk_tree = record_walk
+    folder.start()
+    wait_until(qapp, lambda: folder.matched)
+
+    nested = root / "new" / "deep"
+    nested.mkdir(parents=True)
+    (nested / "b.txt").write_text("")
+    folder.on_directory_changed(str(root))
+    assert str(root / "new") in folder.pending_scans
+    wait_until(qapp, lambda: not folder.pending_scans)
+
+    assert folder.matched == {str(root / "a.txt"), str(nested / "b.txt")}
+    assert (str(root / "new"), False) in walked
+    assert not any(on_main_thread for directory, on_main_thread in walked)
+    folder.stop()
+
+
+def test_subtree_result_dropped_after_directory_removed(qapp, tmp_path):
+    root = tmp_path / "root"
+    (root / "new").mkdir(parents=True)
+    (root / "new" / "b.txt").write_text("")
+    folder = LiveFolder("logs", f'under:"{root}" ext:txt')
+    folder.entries[str(root / "new")] = ("new", True, 0, 0)
+    folder.scan_subtree(str(root / "new"))
+    folder.remove_tree(str(root / "new"))
+    qapp.processEvents()
+    time.sleep(0.2)
+    qapp.processEvents()
+    assert folder.matched == set()
+    folder.stop()
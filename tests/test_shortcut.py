@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 快捷方式解析测试
+用手工构造的 .lnk/.url 字节测试纯 Python 解析器和解析结果缓存，不需要 Windows
+"""
+
+import os
+import struct
+
+import pytest
+
+from shortcut import (LINK_CLSID, LINK_HEADER_SIZE, HAS_LINK_TARGET_ID_LIST, HAS_LINK_INFO, HAS_NAME,
+                      HAS_RELATIVE_PATH, HAS_WORKING_DIR, HAS_ARGUMENTS, HAS_ICON_LOCATION, IS_UNICODE,
+                      HAS_EXP_STRING, ENVIRONMENT_VARIABLE_DATA_BLOCK, ICON_ENVIRONMENT_DATA_BLOCK,
+                      ShortcutCache, ShortcutError, parse_lnk, parse_url, parse_shortcut)
+
+
+def make_header(flags, icon_index=0):
+    header = bytearray(LINK_HEADER_SIZE)
+    struct.pack_into("<I", header, 0, LINK_HEADER_SIZE)
+    header[4:20] = LINK_CLSID
+    struct.pack_into("<I", header, 0x14, flags)
+    struct.pack_into("<i", header, 0x38, icon_index)
+    return bytes(header)
+
+
+def make_id_list(items):
+    """LinkTargetIDList: 总大小(2) + 每项 (大小(2) + 内容) + 结束标记(2)"""
+    body = b"".join(struct.pack("<H", len(item) + 2) + item for item in items) + b"\0\0"
+    return struct.pack("<H", len(body)) + body
+
+
+def volume_item(drive):
+    return b"\x2f" + drive.encode("ascii") + b"\0" * 20
+
+
+def file_item(name):
+    # 类型(1) 保留(1) 文件大小(4) 修改时间(4) 属性(2)，之后是 8.3 短文件名
+    return b"\x32\0" + b"\0" * 10 + name.encode("ascii") + b"\0"
+
+
+def make_local_link_info(base, suffix=""):
+    """LinkInfo: 卷信息 + 本地基础路径 (ANSI)"""
+    header_size = 0x1C
+    volume_id = struct.pack("<4I", 0x10, 3, 0, 0x10)
+    base_offset = header_size + len(volume_id)
+    base_bytes = base.encode("ascii") + b"\0"
+    suffix_offset = base_offset + len(base_bytes)
+    suffix_bytes = suffix.encode("ascii") + b"\0"
+    size = suffix_offset + len(suffix_bytes)
+    header = struct.pack("<7I", size, header_size, 0x1, header_size, base_offset, 0, suffix_offset)
+    return header + volume_id + base_bytes + suffix_bytes
+
+
+def make_unicode_link_info(base):
+    """LinkInfo 头为 0x24 字节时带有 Unicode 基础路径"""
+    header_size = 0x24
+    volume_id = struct.pack("<4I", 0x10, 3, 0, 0x10)
+    ansi_offset = header_size + len(volume_id)
+    ansi_bytes = b"?\0"
+    suffix_offset = ansi_offset + len(ansi_bytes)
+    unicode_offset = suffix_offset + 1
+    unicode_bytes = base.encode("utf-16-le") + b"\0\0"
+    unicode_suffix_offset = unicode_offset + len(unicode_bytes)
+    size = unicode_suffix_offset + 2
+    header = struct.pack("<9I", size, header_size, 0x1, header_size, ansi_offset, 0, suffix_offset,
+                         unicode_offset, unicode_suffix_offset)
+    return header + volume_id + ansi_bytes + b"\0" + unicode_bytes + b"\0\0"
+
+
+def make_network_link_info(net_name, suffix):
+    """LinkInfo: CommonNetworkRelativeLink + 路径后缀"""
+    header_size = 0x1C
+    network = struct.pack("<5I", 0x14 + len(net_name) + 1, 0, 0x14, 0, 0x00020000) + net_name.encode("ascii") + b"\0"
+    network_offset = header_size
+    suffix_offset = network_offset + len(network)
+    suffix_bytes = suffix.encode("ascii") + b"\0"
+    size = suffix_offset + len(suffix_bytes)
+    header = struct.pack("<7I", size, header_size, 0x2, 0, 0, network_offset, suffix_offset)
+    return header + network + suffix_bytes
+
+
+def make_strings(values, unicode):
+    """StringData: 每个字符串前有 2 字节的字符数"""
+    data = b""
+    for value in values:
+        raw = value.encode("utf-16-le" if unicode else "ascii")
+        data += struct.pack("<H", len(value)) + raw
+    return data
+
+
+def make_env_block(signature, value):
+    """EnvironmentVariableDataBlock / IconEnvironmentDataBlock: 大小(4) 签名(4) ANSI(260) Unicode(520)"""
+    ansi = value.encode("ascii").ljust(260, b"\0")
+    wide = value.encode("utf-16-le").ljust(520, b"\0")
+    return struct.pack("<2I", 0x314, signature) + ansi + wide
+
+
+TERMINAL_BLOCK = b"\0\0\0\0"
+
+
+def env_reference(name):
+    """当前平台 os.path.expandvars 能展开的环境变量写法"""
+    return f"%{name}%" if os.name == "nt" else f"${name}"
+
+
+def test_rejects_invalid_header():
+    with pytest.raises(ShortcutError):
+        parse_lnk(b"\0" * LINK_HEADER_SIZE)
+    with pytest.raises(ShortcutError):
+        parse_lnk(make_header(0)[:0x40])
+
+
+def test_truncated_link_raises():
+    data = make_header(HAS_LINK_INFO) + b"\x01"
+    with pytest.raises(ShortcutError):
+        parse_lnk(data)
+
+
+def test_skips_id_list_before_link_info():
+    id_list = make_id_list([volume_item("D:\\"), file_item("OTHER")])
+    data = make_header(HAS_LINK_TARGET_ID_LIST | HAS_LINK_INFO) + id_list \
+        + make_local_link_info("C:\\Tools\\app.exe") + TERMINAL_BLOCK
+    info = parse_lnk(data, "App")
+    assert info.name == "App"
+    # LinkInfo 优先于 IDList
+    assert info.target == "C:\\Tools\\app.exe"
+
+
+def test_id_list_target_without_link_info():
+    id_list = make_id_list([volume_item("C:\\"), file_item("Windows"), file_item("notepad.exe")])
+    info = parse_lnk(make_header(HAS_LINK_TARGET_ID_LIST) + id_list + TERMINAL_BLOCK)
+    assert info.target.replace(os.sep, "\\") == "C:\\Windows\\notepad.exe"
+
+
+def test_local_link_info_with_suffix():
+    data = make_header(HAS_LINK_INFO) + make_local_link_info("C:\\Program Files\\", "App\\app.exe")
+    assert parse_lnk(data + TERMINAL_BLOCK).target == "C:\\Program Files\\App\\app.exe"
+
+
+def test_unicode_local_link_info():
+    data = make_header(HAS_LINK_INFO) + make_unicode_link_info("C:\\程序\\应用.exe") + TERMINAL_BLOCK
+    assert parse_lnk(data).target == "C:\\程序\\应用.exe"
+
+
+def test_network_link_info():
+    data = make_header(HAS_LINK_INFO) + make_network_link_info("\\\\server\\share", "docs\\report.docx")
+    assert parse_lnk(data + TERMINAL_BLOCK).target == "\\\\server\\share\\docs\\report.docx"
+
+
+def test_unicode_string_data():
+    flags = HAS_LINK_INFO | HAS_NAME | HAS_RELATIVE_PATH | HAS_WORKING_DIR | HAS_ARGUMENTS \
+        | HAS_ICON_LOCATION | IS_UNICODE
+    strings = make_strings(["打开编辑器", "..\\app.exe", "C:\\工作", "--new-window", "C:\\icons\\app.ico"],
+                           unicode=True)
+    data = make_header(flags, icon_index=2) + make_local_link_info("C:\\app.exe") + strings + TERMINAL_BLOCK
+    info = parse_lnk(data)
+    assert info.description == "打开编辑器"
+    assert info.working_dir == "C:\\工作"
+    assert info.arguments == "--new-window"
+    assert info.icon_location == "C:\\icons\\app.ico"
+    assert info.icon_index == 2
+
+
+def test_ansi_string_data():
+    flags = HAS_LINK_INFO | HAS_NAME | HAS_ARGUMENTS
+    strings = make_strings(["Editor", "-n file.txt"], unicode=False)
+    data = make_header(flags) + make_local_link_info("C:\\edit.exe") + strings + TERMINAL_BLOCK
+    info = parse_lnk(data)
+    assert info.description == "Editor"
+    assert info.arguments == "-n file.txt"
+    assert info.working_dir == ""
+    assert info.icon_location == ""
+
+
+def test_environment_blocks_and_icon_index(monkeypatch):
+    monkeypatch.setenv("BE_TEST_ROOT", "C:\\Apps")
+    flags = HAS_EXP_STRING | HAS_ICON_LOCATION | IS_UNICODE
+    strings = make_strings(["C:\\ignored.ico"], unicode=True)
+    data = make_header(flags, icon_index=-101) + strings \
+        + make_env_block(ENVIRONMENT_VARIABLE_DATA_BLOCK, env_reference("BE_TEST_ROOT") + "\\tool.exe") \
+        + make_env_block(ICON_ENVIRONMENT_DATA_BLOCK, env_reference("BE_TEST_ROOT") + "\\tool.ico") \
+        + TERMINAL_BLOCK
+    info = parse_lnk(data)
+    assert info.target == "C:\\Apps\\tool.exe"
+    # 环境变量形式的图标优先于 StringData 中的图标位置
+    assert info.icon_location == "C:\\Apps\\tool.ico"
+    assert info.icon_index == -101
+
+
+def test_link_info_wins_over_environment_block_without_exp_string():
+    data = make_header(HAS_LINK_INFO) + make_local_link_info("C:\\real.exe") \
+        + make_env_block(ENVIRONMENT_VARIABLE_DATA_BLOCK, "C:\\other.exe") + TERMINAL_BLOCK
+    assert parse_lnk(data).target == "C:\\real.exe"
+
+
+def test_parse_url():
+    data = ("[InternetShortcut]\r\nURL=https://example.com/?a=1%20b\r\n"
+            "IconFile=C:\\icons\\web.ico\r\nIconIndex=3\r\n").encode("utf-8-sig")
+    info = parse_url(data, "Example")
+    assert info.name == "Example"
+    assert info.url == "https://example.com/?a=1%20b"
+    assert info.target == info.url
+    assert info.icon_location == "C:\\icons\\web.ico"
+    assert info.icon_index == 3
+
+
+def test_parse_url_utf16_and_bad_icon_index():
+    data = "[InternetShortcut]\nURL=https://例子.com/\nIconIndex=abc\n".encode("utf-16")
+    info = parse_url(data)
+    assert info.url == "https://例子.com/"
+    assert info.icon_index == 0
+
+
+def test_parse_url_file_target():
+    data = b"[InternetShortcut]\nURL=file:///C:/My%20Docs/a.txt\n"
+    assert parse_url(data).target == "C:/My Docs/a.txt".replace("/", os.sep)
+
+
+def test_parse_url_without_section():
+    info = parse_url(b"[Other]\nURL=https://example.com/\n")
+    assert info.url == ""
+
+
+def write_url(path, url, mtime):
+    path.write_bytes(f"[InternetShortcut]\nURL={url}\n".encode("utf-8"))
+    os.utime(path, (mtime, mtime))
+
+
+def test_parse_shortcut_uses_file_name(tmp_path):
+    path = tmp_path / "My Site.url"
+    write_url(path, "https://example.com/", 1000)
+    assert parse_shortcut(str(path)).name == "My Site"
+    assert parse_shortcut(str(tmp_path / "notes.txt")) is None
+
+
+def test_cache_reparses_when_mtime_changes(tmp_path):
+    path = tmp_path / "site.url"
+    write_url(path, "https://one.example/", 1000)
+    cache = ShortcutCache(cache_file=str(tmp_path / "cache.json"))
+    assert cache.resolve(str(path)).url == "https://one.example/"
+
+    # 修改时间不变时直接使用缓存，不重新读取文件
+    write_url(path, "https://two.example/", 1000)
+    assert cache.resolve(str(path)).url == "https://one.example/"
+
+    write_url(path, "https://two.example/", 2000)
+    assert cache.resolve(str(path)).url == "https://two.example/"
+
+
+def test_cache_save_load_and_prune(tmp_path):
+    path = tmp_path / "site.url"
+    write_url(path, "https://example.com/", 1000)
+    cache_file = str(tmp_path / "cache.json")
+    cache = ShortcutCache(cache_file=cache_file)
+    cache.resolve_folder(str(tmp_path))
+    assert os.path.exists(cache_file)
+
+    loaded = ShortcutCache(cache_file=cache_file)
+    assert loaded.entries[os.path.normcase(str(path))][1].url == "https://example.com/"
+
+    path.unlink()
+    loaded.prune()
+    assert loaded.entries == {}
+
+
+def test_memory_only_cache_does_not_write(tmp_path):
+    path = tmp_path / "site.url"
+    write_url(path, "https://example.com/", 1000)
+    cache_file = str(tmp_path / "cache.json")
+    cache = ShortcutCache(cache_file=cache_file, persistent=False)
+    assert cache.resolve_folder(str(tmp_path))[str(path)].url == "https://example.com/"
+    assert not os.path.exists(cache_file)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - 标签存储测试
+"""
+
+import os
+
+import pytest
+
+from tag_store import TagStore, file_key, file_stat
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TagStore(str(tmp_path / "tags.db"))
+
+
+def make_file(path, content=b"data", mtime=1000):
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def stored_paths(store):
+    return [row[0] for row in store.connection.execute("SELECT path FROM files")]
+
+
+def test_tags_and_metadata(store, tmp_path):
+    path = make_file(tmp_path / "a.txt")
+    store.add_tag(path, "工作")
+    store.add_tag(path, "urgent")
+    store.set_metadata(path, "作者", "张三")
+    assert store.get_tags(path) == sorted(["工作", "urgent"])
+    assert store.get_metadata(path) == {"作者": "张三"}
+    assert store.paths_with_tags(["URGENT"]) == [(path, False)]
+    assert store.paths_with_metadata("作者", "张三") == [(path, False)]
+    store.remove_tag(path, "urgent")
+    store.set_metadata(path, "作者", "")
+    assert store.get_tags(path) == ["工作"]
+    assert store.get_metadata(path) == {}
+
+
+def test_directory_flag_is_stored(store, tmp_path):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    store.add_tag(str(folder), "项目")
+    assert store.paths_with_tags(["项目"]) == [(str(folder), True)]
+
+
+@pytest.mark.skipif(not file_key(file_stat(__file__)), reason="文件系统不提供文件编号")
+def test_external_rename_is_followed_on_write_only(store, tmp_path):
+    old_path = make_file(tmp_path / "old.txt")
+    store.add_tag(old_path, "tag")
+    new_path = str(tmp_path / "new.txt")
+    os.rename(old_path, new_path)
+
+    # 读取可以按文件编号找到标签，但不修改记录
+    assert store.get_tags(new_path) == ["tag"]
+    assert stored_paths(store) == [old_path]
+
+    store.add_tag(new_path, "second")
+    assert stored_paths(store) == [new_path]
+    assert store.get_tags(new_path) == ["second", "tag"]
+
+
+@pytest.mark.skipif(not file_key(file_stat(__file__)), reason="文件系统不提供文件编号")
+def test_reused_file_id_does_not_inherit_tags(store, tmp_path):
+    old_path = make_file(tmp_path / "old.txt")
+    store.add_tag(old_path, "secret")
+    new_path = make_file(tmp_path / "new.txt", b"other content", mtime=2000)
+    os.remove(old_path)
+    # 模拟新文件复用了已删除文件的编号
+    store.connection.execute("UPDATE files SET file_key = ?", (file_key(file_stat(new_path)),))
+
+    assert store.get_tags(new_path) == []
+    store.add_tag(new_path, "public")
+    assert store.get_tags(new_path) == ["public"]
+    assert sorted(stored_paths(store)) == sorted([old_path, new_path])
+
+
+@pytest.mark.skipif(not file_key(file_stat(__file__)), reason="文件系统不提供文件编号")
+def test_file_id_not_followed_while_old_path_exists(store, tmp_path):
+    old_path = make_file(tmp_path / "old.txt")
+    store.add_tag(old_path, "tag")
+    link_path = str(tmp_path / "hardlink.txt")
+    try:
+        os.link(old_path, link_path)
+    except OSError:
+        pytest.skip("文件系统不支持硬链接")
+    assert store.get_tags(link_path) == []
+
+
+def test_move_and_remove_path(store, tmp_path):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    path = make_file(folder / "a.txt")
+    store.add_tag(path, "tag")
+    moved = str(tmp_path / "moved")
+    store.move_path(str(folder), moved)
+    assert stored_paths(store) == [os.path.join(moved, "a.txt")]
+    store.remove_path(moved)
+    assert stored_paths(store) == []
+
+
+def test_migrates_old_schema(tmp_path):
+    import sqlite3
+    db_file = str(tmp_path / "tags.db")
+    connection = sqlite3.connect(db_file)
+    connection.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, path_key TEXT NOT NULL UNIQUE, "
+                       "path TEXT NOT NULL, file_key TEXT)")
+    connection.commit()
+    connection.close()
+    store = TagStore(db_file)
+    columns = {row[1] for row in store.connection.execute("PRAGMA table_info(files)")}
+    assert {"is_dir", "size", "mtime"} <= columns
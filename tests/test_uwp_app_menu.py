@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BetterExplorer - UWP 应用列表测试
+用输出假数据的命令代替 Get-StartApps，测试解析、去重、缓存 TTL 和列表模型的增量更新
+"""
+
+import sys
+import json
+import time
+import asyncio
+
+import pytest
+
+from uwp_app_menu import (DEFAULT_UWP_CACHE_TTL, UWP_CACHE_VERSION, UWPAppCache, UWPAppFetcher,
+                          get_uwp_apps_async, get_uwp_ttl, unique_apps)
+from program_model import ProgramListModel
+
+
+def fake_command(tmp_path, stdout="", exit_code=0, encoding="utf-8"):
+    """生成一个输出指定内容并以 exit_code 退出的命令"""
+    script = tmp_path / "fake_start_apps.py"
+    script.write_text(
+        "import sys\n"
+        f"sys.stdout.buffer.write({stdout.encode(encoding)!r})\n"
+        "sys.stderr.write('fake error')\n"
+        f"sys.exit({exit_code})\n", encoding="utf-8")
+    return f'"{sys.executable}" "{script}"'
+
+
+def fetch(command):
+    return asyncio.run(get_uwp_apps_async(command))
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """使用单独的配置目录，返回写入 Config.json 的函数"""
+    directory = tmp_path / "Config"
+    directory.mkdir()
+    monkeypatch.setenv("BETTEREXPLORER_CONFIG_DIR", str(directory))
+
+    def write_settings(**settings):
+        (directory / "Config.json").write_text(json.dumps(settings), encoding="utf-8")
+    return write_settings
+
+
+def test_fetch_parses_and_dedupes_app_ids(tmp_path):
+    apps = [{"Name": "计算器", "AppID": "Microsoft.WindowsCalculator_8wekyb3d8bbwe!App"},
+            {"Name": "Photos", "AppID": "Microsoft.Windows.Photos_8wekyb3d8bbwe!App"},
+            {"Name": "计算器 (重复)", "AppID": "Microsoft.WindowsCalculator_8wekyb3d8bbwe!App"}]
+    result = fetch(fake_command(tmp_path, "\ufeff" + json.dumps(apps, ensure_ascii=False)))
+    assert result == [{"name": "计算器", "appid": "Microsoft.WindowsCalculator_8wekyb3d8bbwe!App"},
+                      {"name": "Photos", "appid": "Microsoft.Windows.Photos_8wekyb3d8bbwe!App"}]
+
+
+def test_fetch_single_object(tmp_path):
+    # 只有一个应用时 ConvertTo-Json 输出对象而不是数组
+    result = fetch(fake_command(tmp_path, json.dumps({"Name": "Mail", "AppID": "mail!App"})))
+    assert result == [{"name": "Mail", "appid": "mail!App"}]
+
+
+def test_fetch_empty_output(tmp_path):
+    assert fetch(fake_command(tmp_path, "\r\n")) == []
+
+
+def test_fetch_failures_return_none(tmp_path):
+    assert fetch(fake_command(tmp_path, "[]", exit_code=1)) is None
+    assert fetch(fake_command(tmp_path, "not json")) is None
+    # 缺少字段
+    assert fetch(fake_command(tmp_path, json.dumps([{"Name": "x"}]))) is None
+
+
+def test_fetch_uses_command_setting(tmp_path, config_dir):
+    config_dir(uwp_list_command=fake_command(tmp_path, json.dumps([{"Name": "A", "AppID": "a"}])))
+    assert fetch(None) == [{"name": "A", "appid": "a"}]
+
+
+def run_fetcher(qapp, command):
+    """在工作线程中运行 UWPAppFetcher，返回 (finished 结果, error 消息)"""
+    fetcher = UWPAppFetcher(command)
+    results, errors = [], []
+    fetcher.finished.connect(results.append)
+    fetcher.error.connect(errors.append)
+    fetcher.start()
+    assert fetcher.wait(30000)
+    qapp.processEvents()
+    return results, errors
+
+
+def test_fetcher_signals(qapp, tmp_path):
+    command = fake_command(tmp_path, json.dumps([{"Name": "A", "AppID": "a"}, {"Name": "A2", "AppID": "a"}]))
+    assert run_fetcher(qapp, command) == ([[{"name": "A", "appid": "a"}]], [])
+
+    results, errors = run_fetcher(qapp, fake_command(tmp_path, "", exit_code=2))
+    assert results == [] and len(errors) == 1
+
+
+def test_unique_apps_keeps_first():
+    apps = [{"name": "a", "appid": "1"}, {"name": "b", "appid": "2"}, {"name": "c", "appid": "1"}]
+    assert unique_apps(apps) == [{"name": "a", "appid": "1"}, {"name": "b", "appid": "2"}]
+
+
+def test_cache_save_and_load_dedupe(tmp_path):
+    cache_file = str(tmp_path / "uwp_apps.json")
+    cache = UWPAppCache(cache_file)
+    assert cache.apps is None
+    cache.save([{"name": "a", "appid": "1"}, {"name": "a again", "appid": "1"}])
+    assert cache.apps == [{"name": "a", "appid": "1"}]
+
+    # 旧版本写入的重复条目在加载时去重
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump({"version": UWP_CACHE_VERSION, "fetched_at": 5,
+                   "apps": [{"name": "x", "appid": "9"}, {"name": "y", "appid": "9"}]}, f)
+    loaded = UWPAppCache(cache_file)
+    assert loaded.apps == [{"name": "x", "appid": "9"}]
+    assert loaded.fetched_at == 5
+
+
+def test_cache_ignores_other_versions(tmp_path):
+    cache_file = tmp_path / "uwp_apps.json"
+    cache_file.write_text(json.dumps({"version": UWP_CACHE_VERSION + 1, "fetched_at": 1, "apps": []}))
+    assert UWPAppCache(str(cache_file)).apps is None
+
+
+def test_cache_staleness(tmp_path, config_dir):
+    config_dir(uwp_cache_ttl=60)
+    cache = UWPAppCache(str(tmp_path / "uwp_apps.json"))
+    assert cache.is_stale()
+    cache.save([])
+    now = cache.fetched_at
+    assert not cache.is_stale(now + 30)
+    assert cache.is_stale(now + 61)
+
+
+def test_ttl_setting_validation(config_dir):
+    config_dir(uwp_cache_ttl="120")
+    assert get_uwp_ttl() == 120.0
+    config_dir(uwp_cache_ttl="six hours")
+    assert get_uwp_ttl() == DEFAULT_UWP_CACHE_TTL
+    config_dir(uwp_cache_ttl=[1])
+    assert get_uwp_ttl() == DEFAULT_UWP_CACHE_TTL
+
+
+def test_stale_check_with_bad_ttl(tmp_path, config_dir):
+    config_dir(uwp_cache_ttl=None)
+    cache = UWPAppCache(str(tmp_path / "uwp_apps.json"))
+    cache.save([])
+    assert not cache.is_stale(time.time() + 60)
+    assert cache.is_stale(time.time() + DEFAULT_UWP_CACHE_TTL + 60)
+
+
+class ModelRecorder:
+    """记录模型发出的结构变化信号"""
+
+    def __init__(self, model):
+        self.events = []
+        model.rowsInserted.connect(lambda parent, first, last: self.events.append(("insert", first, last)))
+        model.rowsRemoved.connect(lambda parent, first, last: self.events.append(("remove", first, last)))
+        model.dataChanged.connect(lambda first, last, roles=None: self.events.append(("change", first.row())))
+        model.modelReset.connect(lambda: self.events.append(("reset",)))
+
+
+def make_model(items):
+    model = ProgramListModel(lambda name, item_type, target: None)
+    model.set_items(items)
+    return model
+
+
+def test_apply_items_changes_only_differing_rows(qapp):
+    model = make_model([("A", "uwp", "a"), ("B", "uwp", "b"), ("C", "uwp", "c")])
+    recorder = ModelRecorder(model)
+    model.apply_items([("A", "uwp", "a"), ("B renamed", "uwp", "b"), ("D", "uwp", "d")])
+    assert recorder.events == [("remove", 2, 2), ("change", 1), ("insert", 2, 2)]
+    assert model.changed_rows == 3
+    assert model.names == ["A", "B renamed", "D"]
+    assert model.rows == {"a": 0, "b": 1, "d": 2}
+
+
+def test_apply_items_unchanged(qapp):
+    items = [("A", "uwp", "a"), ("B", "uwp", "b")]
+    model = make_model(items)
+    recorder = ModelRecorder(model)
+    model.apply_items(list(items))
+    assert recorder.events == []
+    assert model.changed_rows == 0
+
+
+def test_apply_items_reorder_and_duplicates_reset(qapp):
+    model = make_model([("A", "uwp", "a"), ("B", "uwp", "b")])
+    recorder = ModelRecorder(model)
+    model.apply_items([("B", "uwp", "b"), ("A", "uwp", "a")])
+    assert recorder.events == [("reset",)]
+    assert model.targets == ["b", "a"]
+
+    recorder.events.clear()
+    model.apply_items([("A", "uwp", "a"), ("A", "uwp", "a")])
+    assert recorder.events == [("reset",)]
+    assert model.changed_rows == 2